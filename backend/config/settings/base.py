@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.sites",
+    "django.contrib.postgres",
     # Third-party apps
     "rest_framework",
     "rest_framework.authtoken",
@@ -93,6 +94,11 @@ DATABASES = {
     "default": env.dj_db_url("DATABASE_URL", default="postgres://postgres@db/postgres")
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/ref/settings/#caches
+
+CACHES = {"default": env.dj_cache_url("CACHE_URL", default="locmem://")}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -148,5 +154,67 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
 OMDB_KEY = env.str("OMDB_KEY")
+# Maximum number of keep-alive connections to OMDb held open by each process
+OMDB_POOL_SIZE = env.int("OMDB_POOL_SIZE", default=10)
+# Timeouts (in seconds) for connecting to, and then waiting for a response from OMDb
+OMDB_CONNECT_TIMEOUT = env.float("OMDB_CONNECT_TIMEOUT", default=3.05)
+OMDB_READ_TIMEOUT = env.float("OMDB_READ_TIMEOUT", default=10)
+# Requests that fail with a 429 or 5xx are retried, waiting OMDB_RETRY_BACKOFF * 2^n seconds between attempts
+OMDB_MAX_RETRIES = env.int("OMDB_MAX_RETRIES", default=3)
+OMDB_RETRY_BACKOFF = env.float("OMDB_RETRY_BACKOFF", default=0.5)
+# Number of search result pages fetched concurrently after the first one, 1 fetches them one after another
+OMDB_SEARCH_WORKERS = env.int("OMDB_SEARCH_WORKERS", default=4)
+# Number of movie details fetched concurrently by OmdbClient.get_many
+OMDB_DETAIL_WORKERS = env.int("OMDB_DETAIL_WORKERS", default=8)
+# SQLite file where OMDb responses are cached, shared by all processes and kept across restarts. Unset to disable.
+OMDB_CACHE_PATH = env.str("OMDB_CACHE_PATH", default=None)
+# How long (in seconds) cached search result pages and movie details are used for
+OMDB_CACHE_SEARCH_TTL = env.int("OMDB_CACHE_SEARCH_TTL", default=60 * 60 * 24)
+OMDB_CACHE_DETAIL_TTL = env.int("OMDB_CACHE_DETAIL_TTL", default=60 * 60 * 24 * 30)
+# Least recently used responses are evicted once the cache holds more than this many
+OMDB_CACHE_MAX_ENTRIES = env.int("OMDB_CACHE_MAX_ENTRIES", default=100000)
+# SQLite file holding the OMDb rate limiter's state, shared by all processes on the machine. Unset to disable.
+OMDB_RATE_LIMIT_PATH = env.str("OMDB_RATE_LIMIT_PATH", default=None)
+# Sustained requests per second, and how many can be made in a burst
+OMDB_RATE_LIMIT_PER_SECOND = env.float("OMDB_RATE_LIMIT_PER_SECOND", default=5)
+OMDB_RATE_LIMIT_BURST = env.int("OMDB_RATE_LIMIT_BURST", default=10)
+# Requests allowed per (UTC) day by the API key
+OMDB_DAILY_LIMIT = env.int("OMDB_DAILY_LIMIT", default=1000)
+# Fraction of the burst and daily budget that background requests leave for interactive ones
+OMDB_BACKGROUND_RESERVE = env.float("OMDB_BACKGROUND_RESERVE", default=0.2)
+# Longest time (in seconds) a request waits on the rate limiter, or for a Retry-After from OMDb, before giving up
+OMDB_RATE_LIMIT_MAX_WAIT = env.float("OMDB_RATE_LIMIT_MAX_WAIT", default=10)
+# Serve /api/movies/search/ from an async view, so under ASGI a slow OMDb search doesn't hold a worker thread
+OMDB_ASYNC_SEARCH = env.bool("OMDB_ASYNC_SEARCH", default=False)
+# How long (in seconds) a search's results are used without searching OMDb again. For OMDB_SEARCH_STALE_FOR after that
+# they're still served, but the search is refreshed in the background. Both can be overridden per SearchTerm.
+OMDB_SEARCH_FRESH_FOR = env.int("OMDB_SEARCH_FRESH_FOR", default=60 * 60 * 24)
+OMDB_SEARCH_STALE_FOR = env.int("OMDB_SEARCH_STALE_FOR", default=60 * 60 * 24 * 6)
+# Fetch the details of partial records with the enrichment_worker command, instead of while a user waits on the API
+OMDB_BACKGROUND_ENRICHMENT = env.bool("OMDB_BACKGROUND_ENRICHMENT", default=False)
+# With background enrichment, the details of this many of the top results of each search are queued to be fetched
+OMDB_ENRICH_SEARCH_RESULTS = env.int("OMDB_ENRICH_SEARCH_RESULTS", default=5)
+# How often (in seconds) each process rebuilds its in-memory index of titles for /api/movies/autocomplete/ from the DB,
+# to pick up movies saved by other processes, or 0 to only build it once
+AUTOCOMPLETE_REBUILD_INTERVAL = env.int("AUTOCOMPLETE_REBUILD_INTERVAL", default=0)
+# Raise instead of logging a warning when a view makes more queries than its budget (see movies.querybudget)
+QUERY_BUDGET_STRICT = env.bool("QUERY_BUDGET_STRICT", default=False)
+# Number of results per page of the API's lists, clients can ask for up to API_MAX_PAGE_SIZE with ?page_size=
+API_PAGE_SIZE = env.int("API_PAGE_SIZE", default=50)
+API_MAX_PAGE_SIZE = env.int("API_MAX_PAGE_SIZE", default=200)
+# Serialize the hot list endpoints from values() rows rather than model instances (see movies.api.fastserializers)
+API_FAST_SERIALIZERS = env.bool("API_FAST_SERIALIZERS", default=False)
+# Most movie nights that can be created in one request to the bulk endpoint
+API_MAX_BULK_SIZE = env.int("API_MAX_BULK_SIZE", default=500)
+# Number of rows read from the database at a time by the exports
+EXPORT_CHUNK_SIZE = env.int("EXPORT_CHUNK_SIZE", default=2000)
+# Seconds before a sync the next one starts from, so changes committed late aren't missed (see movies.api.changes)
+CHANGES_SAFETY_LAG = env.int("CHANGES_SAFETY_LAG", default=60)
+# Days deletions are kept for clients to sync, clients that last synced before then have to reload everything
+CHANGES_RETENTION_DAYS = env.int("CHANGES_RETENTION_DAYS", default=30)
+# Most movies, movie nights and deletions each page of /api/movies/changes/ has of each, clients ask again while has_more
+CHANGES_PAGE_SIZE = env.int("CHANGES_PAGE_SIZE", default=500)
+# How long (in seconds) movie detail and search responses are cached, they're also invalidated when the movies change
+MOVIES_RESPONSE_CACHE_TIMEOUT = env.int("MOVIES_RESPONSE_CACHE_TIMEOUT", default=60 * 5)
 
 SITE_ID = 1
@@ -37,3 +37,6 @@ EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
 if "test" in sys.argv or "test_coverage" in sys.argv:
     LOGGING = {}
+    QUERY_BUDGET_STRICT = True
+    # Responses cached by one test would otherwise be served to the next
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
@@ -1,9 +1,11 @@
 from django.contrib import admin
 
-from .models import Movie, Genre, SearchTerm, MovieNight
+from .models import Movie, Genre, SearchTerm, MovieNight, EnrichmentJob, Tombstone
 
 
 admin.site.register(Movie)
 admin.site.register(Genre)
 admin.site.register(SearchTerm)
 admin.site.register(MovieNight)
+admin.site.register(EnrichmentJob)
+admin.site.register(Tombstone)
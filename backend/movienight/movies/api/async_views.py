@@ -0,0 +1,54 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .. import responsecache
+from ..omdb_integration import asearch_and_save
+from .fastserializers import FastMovieSerializer
+from .pagination import KeysetPagination
+from .serializers import MovieSearchSerializer
+from .views import get_search_cache_key, get_search_page
+from movienight.omdb.ratelimit import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+
+async def movie_search(request):
+    """
+    Async equivalent of `MovieViewSet.search`. When served through ASGI the OMDb round trip doesn't hold a worker
+    thread, so one process can have many slow searches in flight. Enabled with the `OMDB_ASYNC_SEARCH` setting.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+
+    search_serializer = MovieSearchSerializer(data=request.GET)
+    if not search_serializer.is_valid():
+        return HttpResponse(status=400)
+    term = search_serializer.data["term"]
+    request = Request(request)
+
+    # Cached the same way as `MovieViewSet.search`, taking the key before searching for the same reason
+    cache_key = await sync_to_async(get_search_cache_key)(request, term)
+    data = await sync_to_async(responsecache.get_cached_response)(cache_key)
+    if data is None:
+        is_complete = True
+        try:
+            await asearch_and_save(term, background_refresh=True)
+        except RateLimitExceeded as e:
+            logger.warning("Not searching OMDb for '%s': %s", term, e)
+            is_complete = False
+
+        fast_serializer = (
+            FastMovieSerializer() if settings.API_FAST_SERIALIZERS else None
+        )
+        data = await sync_to_async(get_search_page)(
+            request, term, KeysetPagination(), fast_serializer
+        )
+        if is_complete:
+            await sync_to_async(responsecache.cache_response)(cache_key, data)
+
+    return HttpResponse(JSONRenderer().render(data), content_type="application/json")
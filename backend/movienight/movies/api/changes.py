@@ -0,0 +1,148 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Greatest
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from ..models import Movie, MovieNight, Tombstone
+from .fastserializers import FastMovieNightSerializer, FastMovieSerializer
+
+# The changes are read from three streams, each ordered by `(time, pk)`, and a token holds the position in each
+STREAMS = ("movies", "movie_nights", "deleted")
+
+
+class ChangesExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Changes from this long ago aren't kept any more, reload everything and sync from a new token."
+    default_code = "changes_expired"
+
+
+def encode_token(positions):
+    """A token for `positions`, a `(time, pk)` pair for each of `STREAMS`."""
+    data = {stream: [time.isoformat(), pk] for stream, (time, pk) in positions.items()}
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def make_token(time):
+    """A token for the changes made from `time` on."""
+    return encode_token({stream: (time, 0) for stream in STREAMS})
+
+
+def parse_token(token):
+    """The `(time, pk)` position in each of `STREAMS` of a token."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token))
+        positions = {}
+        for stream in STREAMS:
+            time, pk = data[stream]
+            time = datetime.datetime.fromisoformat(time)
+            if time.tzinfo is None or not isinstance(pk, int):
+                raise ValueError()
+            positions[stream] = (time, pk)
+    except (TypeError, ValueError, KeyError):
+        raise ValidationError({"since": "Invalid token."})
+    return positions
+
+
+def get_restart_time():
+    """
+    Where a stream that's been read to the end starts from next time, now less `CHANGES_SAFETY_LAG`. Rows get their
+    `updated_at` before their transaction commits, so a change can become visible after a sync that should have
+    included it. Going back a bit means the next sync sends the last few seconds of changes again, including any that
+    were committed late.
+    """
+    return now() - datetime.timedelta(seconds=settings.CHANGES_SAFETY_LAG)
+
+
+def get_next_token():
+    """A token for changes made from now on, less `CHANGES_SAFETY_LAG`."""
+    return make_token(get_restart_time())
+
+
+def filter_after(queryset, time_name, position):
+    """The rows of `queryset` after `position` in `(time_name, pk)` order, which the queryset is put in."""
+    time, pk = position
+    return queryset.filter(
+        Q(**{f"{time_name}__gt": time}) | Q(**{time_name: time, "pk__gt": pk})
+    ).order_by(time_name, "pk")
+
+
+def read_page(rows, time_name, restart_position):
+    """
+    A page of at most `CHANGES_PAGE_SIZE` of `rows`, with the position to read the stream from next and whether there
+    are more rows after the page.
+    """
+    rows = list(rows[: settings.CHANGES_PAGE_SIZE + 1])
+    has_more = len(rows) > settings.CHANGES_PAGE_SIZE
+    rows = rows[: settings.CHANGES_PAGE_SIZE]
+    if has_more:
+        return rows, (rows[-1][time_name], rows[-1]["id"]), True
+    return rows, restart_position, False
+
+
+def get_changes(token):
+    """
+    A page of the movies and movie nights created, updated or deleted since `token`, with the token to get the changes
+    after these and whether there are more. Each of `STREAMS` is read in `(time, pk)` order, up to `CHANGES_PAGE_SIZE`
+    rows, and its position in the token is the last row read, until it's been read to the end, when it starts again a
+    little before now. A movie night is changed when its movie is, as it includes the movie.
+    """
+    positions = parse_token(token)
+    restart_position = (get_restart_time(), 0)
+    expired_before = now() - datetime.timedelta(days=settings.CHANGES_RETENTION_DAYS)
+    if min(time for time, pk in positions.values()) < expired_before:
+        raise ChangesExpired()
+
+    movie_serializer = FastMovieSerializer()
+    movie_rows, movies_position, more_movies = read_page(
+        movie_serializer.get_rows(
+            filter_after(Movie.objects.all(), "updated_at", positions["movies"]),
+            "updated_at",
+        ),
+        "updated_at",
+        restart_position,
+    )
+
+    movie_night_serializer = FastMovieNightSerializer()
+    since = positions["movie_nights"][0]
+    changed_movie_nights = MovieNight.objects.filter(
+        Q(updated_at__gte=since) | Q(movie__updated_at__gte=since)
+    ).annotate(changed_at=Greatest("updated_at", "movie__updated_at"))
+    movie_night_rows, movie_nights_position, more_movie_nights = read_page(
+        movie_night_serializer.get_rows(
+            filter_after(changed_movie_nights, "changed_at", positions["movie_nights"])
+        ),
+        "changed_at",
+        restart_position,
+    )
+
+    tombstones, deleted_position, more_deleted = read_page(
+        filter_after(
+            Tombstone.objects.all(), "deleted_at", positions["deleted"]
+        ).values("id", "model", "object_id", "deleted_at"),
+        "deleted_at",
+        restart_position,
+    )
+    deleted = {model: [] for model in Tombstone.ModelName.values}
+    for tombstone in tombstones:
+        deleted[tombstone["model"]].append(tombstone["object_id"])
+
+    return {
+        "movies": movie_serializer.serialize(movie_rows),
+        "movie_nights": movie_night_serializer.serialize(movie_night_rows),
+        "deleted_movies": deleted[Tombstone.ModelName.MOVIE],
+        "deleted_movie_nights": deleted[Tombstone.ModelName.MOVIE_NIGHT],
+        "next": encode_token(
+            {
+                "movies": movies_position,
+                "movie_nights": movie_nights_position,
+                "deleted": deleted_position,
+            }
+        ),
+        "has_more": more_movies or more_movie_nights or more_deleted,
+    }
@@ -0,0 +1,119 @@
+import hashlib
+from operator import attrgetter
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """A strong ETag that changes whenever any of `parts` does."""
+    return quote_etag(hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    For viewsets, makes `retrieve` and `list` send an `ETag`, and `retrieve` a `Last-Modified`, then answer
+    `If-None-Match`/`If-Modified-Since` requests with a 304 before anything is serialized.
+
+    The ETag is built from the `etag_fields` of each object, by default its id and `updated_at`, so viewsets whose
+    serializers include related objects should add those objects' `updated_at` too. An object's Last-Modified is the
+    latest of its `last_modified_fields`, which should be the same timestamps. A list's Last-Modified could go backwards
+    when a row is deleted, so lists only have an ETag.
+
+    With `API_FAST_SERIALIZERS` on, lists of viewsets with a `fast_serializer_class` are serialized from `values()`
+    rows instead of instances, see `fastserializers`.
+    """
+
+    etag_fields = ("id", "updated_at")
+    last_modified_fields = ("updated_at",)
+    fast_serializer_class = None
+
+    def get_etag_parts(self, instance):
+        """The `etag_fields` of an instance, or of a row from `values()`."""
+        if isinstance(instance, dict):
+            return tuple(instance[name] for name in self.etag_fields)
+        return tuple(
+            attrgetter(name.replace("__", "."))(instance) for name in self.etag_fields
+        )
+
+    def get_last_modified(self, instance):
+        return max(
+            attrgetter(name.replace("__", "."))(instance)
+            for name in self.last_modified_fields
+        )
+
+    def get_fast_serializer(self):
+        if not settings.API_FAST_SERIALIZERS or self.fast_serializer_class is None:
+            return None
+        return self.fast_serializer_class()
+
+    def get_conditional_response(self, request, etag, last_modified=None):
+        """The response to send, if the client's copy is current, otherwise `None`."""
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=(
+                int(last_modified.timestamp()) if last_modified is not None else None
+            ),
+        )
+        if response is not None:
+            self.set_validators(response, etag, last_modified)
+        return response
+
+    def set_validators(self, response, etag, last_modified=None):
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        return response
+
+    def get_object_etag(self, instance):
+        return make_etag(
+            self.get_serializer_class().__name__, self.get_etag_parts(instance)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.get_object_etag(instance)
+        last_modified = self.get_last_modified(instance)
+
+        response = self.get_conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        serializer = self.get_serializer(instance)
+        return self.set_validators(Response(serializer.data), etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        fast_serializer = self.get_fast_serializer()
+        if fast_serializer is not None:
+            queryset = fast_serializer.get_rows(queryset, *self.etag_fields)
+        page = self.paginate_queryset(queryset)
+        objects = page if page is not None else list(queryset)
+
+        links = (
+            (self.paginator.get_next_link(), self.paginator.get_previous_link())
+            if page is not None
+            else None
+        )
+        etag = make_etag(
+            self.get_serializer_class().__name__,
+            links,
+            [self.get_etag_parts(instance) for instance in objects],
+        )
+
+        response = self.get_conditional_response(request, etag)
+        if response is not None:
+            return response
+
+        if fast_serializer is not None:
+            data = fast_serializer.serialize(objects)
+        else:
+            data = self.get_serializer(objects, many=True).data
+        if page is not None:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response(data)
+        return self.set_validators(response, etag)
@@ -0,0 +1,106 @@
+from collections import defaultdict
+
+from movienight.accounts.api.serializers import UserSerializer
+from ..models import Movie
+from .serializers import MovieNightSerializer, MovieSerializer
+
+
+class FastSerializer:
+    """
+    Serializes rows from `values()` into exactly what `serializer_class` would make of the instances, without building
+    instances or serializers for each of them. Fields are looked up on the serializer once, and their
+    `to_representation` used for the values, so formatting like that of dates stays the same.
+
+    Related objects are serialized by `nested_classes`, from the same rows, and subclasses handle anything that
+    isn't a column, like many to many fields, in `load_related`.
+    """
+
+    serializer_class = None
+    nested_classes = {}
+
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        serializer_fields = self.serializer_class().fields
+        self.fields = []
+        for name in self.serializer_class.Meta.fields:
+            if name in self.nested_classes:
+                field = self.nested_classes[name](prefix=f"{prefix}{name}__")
+            else:
+                field = serializer_fields[name]
+            self.fields.append((name, field))
+
+    def get_value_names(self):
+        """The names to pass to `values()`."""
+        names = []
+        for name, field in self.fields:
+            if isinstance(field, FastSerializer):
+                names.extend(field.get_value_names())
+            elif not self.is_related(name):
+                names.append(self.prefix + name)
+        return names
+
+    def is_related(self, name):
+        """
+        Whether the field is serialized from what `load_related` loaded rather than the row. Subclasses that have any
+        also define `get_related(row, name)`, to get the value of one.
+        """
+        return False
+
+    def get_rows(self, queryset, *extra_names):
+        # Prefetching doesn't work on rows, and isn't needed. Annotations are kept, as they may be in the ordering.
+        return queryset.prefetch_related(None).values(
+            *self.get_value_names(), *extra_names, *queryset.query.annotations
+        )
+
+    def load_related(self, rows):
+        for name, field in self.fields:
+            if isinstance(field, FastSerializer):
+                field.load_related(rows)
+
+    def to_representation(self, row):
+        data = {}
+        for name, field in self.fields:
+            if isinstance(field, FastSerializer):
+                data[name] = field.to_representation(row)
+            elif self.is_related(name):
+                data[name] = self.get_related(row, name)
+            else:
+                value = row[self.prefix + name]
+                data[name] = None if value is None else field.to_representation(value)
+        return data
+
+    def serialize(self, rows):
+        rows = list(rows)
+        self.load_related(rows)
+        return [self.to_representation(row) for row in rows]
+
+
+class FastUserSerializer(FastSerializer):
+    serializer_class = UserSerializer
+
+
+class FastMovieSerializer(FastSerializer):
+    serializer_class = MovieSerializer
+
+    def is_related(self, name):
+        return name == "genres"
+
+    def load_related(self, rows):
+        """Look up the genres of every movie in one query, ordered by name as `Genre` is."""
+        self.genre_names = defaultdict(list)
+        movie_pks = {row[f"{self.prefix}id"] for row in rows}
+        genres = (
+            Movie.genres.through.objects.filter(movie_id__in=movie_pks)
+            .order_by("genre__name")
+            .values_list("movie_id", "genre__name")
+        )
+        for movie_pk, name in genres:
+            self.genre_names[movie_pk].append(name)
+
+    def get_related(self, row, name):
+        return list(self.genre_names.get(row[f"{self.prefix}id"], []))
+
+
+class FastMovieNightSerializer(FastSerializer):
+    serializer_class = MovieNightSerializer
+    nested_classes = {"movie": FastMovieSerializer, "creator": FastUserSerializer}
@@ -0,0 +1,25 @@
+from django.utils.timezone import now
+from rest_framework.filters import BaseFilterBackend
+
+from ..models import ends_after
+from .serializers import MovieNightTimeFilterSerializer
+
+
+class MovieNightTimeFilter(BaseFilterBackend):
+    """
+    Filters movie nights to those overlapping the period from `?overlaps_from=` up to `?overlaps_to=`, either of which
+    can be left out for an open ended period, and with `?upcoming=true` to those that haven't ended yet.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        serializer = MovieNightTimeFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        if "overlaps_from" in params:
+            queryset = queryset.filter(ends_after(params["overlaps_from"]))
+        if "overlaps_to" in params:
+            queryset = queryset.filter(start_time__lt=params["overlaps_to"])
+        if params.get("upcoming"):
+            queryset = queryset.filter(ends_after(now()))
+        return queryset
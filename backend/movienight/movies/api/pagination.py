@@ -0,0 +1,260 @@
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import FloatField, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """`DjangoJSONEncoder` rounds times to milliseconds, but a cursor has to match the row it came from exactly."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over any ordering, including composite ones like `title, year`. DRF's `CursorPagination` only
+    keys on the first field of the ordering, so this keys on all of them, with the primary key appended to make the
+    position of every row unique. Each page is then a filter on the last row of the one before, which can use an index
+    on the ordering and isn't thrown off by rows inserted or deleted between requests.
+
+    The ordering is the queryset's, so applies the model's default ordering, an `OrderingFilter` or an explicit
+    `order_by`. Ordering can only be on the model's own fields or annotations, and they mustn't be null. Querysets of
+    `values()` rows can be paginated too.
+
+    Floats, like the rank of a full-text search, can't be compared exactly with a value from a cursor, so rows next to
+    it could be skipped or repeated. Orderings on them are paginated by offset instead, with the offset in the cursor.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        page_size = settings.API_PAGE_SIZE
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        if requested <= 0:
+            return page_size
+        return min(requested, settings.API_MAX_PAGE_SIZE)
+
+    def get_ordering(self, queryset):
+        """The queryset's ordering as `(name, descending)` pairs, ending with the primary key."""
+        model = queryset.model
+        ordering = []
+        for name in queryset.query.order_by or model._meta.ordering:
+            descending = name.startswith("-")
+            name = name.lstrip("-")
+            if name in queryset.query.annotations:
+                ordering.append((name, descending))
+                continue
+            if name == "pk":
+                name = model._meta.pk.name
+            # A relation orders by its key, so compare with that
+            ordering.append((model._meta.get_field(name).attname, descending))
+
+        pk_name = model._meta.pk.attname
+        if pk_name not in [name for name, descending in ordering]:
+            ordering.append((pk_name, False))
+        return ordering
+
+    def is_exact(self, queryset, name):
+        """Whether rows can be compared exactly with the value of `name` from a cursor, which they can't for floats."""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return not isinstance(annotation.output_field, FloatField)
+        for field in queryset.model._meta.concrete_fields:
+            if field.attname == name:
+                return not isinstance(field, FloatField)
+        return True
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps({"p": position, "r": reverse}, cls=CursorEncoder)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def encode_offset_cursor(self, offset):
+        data = json.dumps({"o": offset})
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def load_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(data, dict):
+            raise NotFound(self.invalid_cursor_message)
+        return data
+
+    def decode_cursor(self, request):
+        data = self.load_cursor(request)
+        if data is None:
+            return None, False
+        try:
+            position, reverse = data["p"], bool(data["r"])
+        except KeyError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def decode_offset_cursor(self, request):
+        data = self.load_cursor(request)
+        if data is None:
+            return 0
+        offset = data.get("o")
+        if not isinstance(offset, int) or offset < 0:
+            raise NotFound(self.invalid_cursor_message)
+        return offset
+
+    def to_python(self, queryset, name, value):
+        """Convert a value from the cursor back to the type of its field or annotation."""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field.to_python(value)
+        for field in queryset.model._meta.concrete_fields:
+            if field.attname == name:
+                if field.is_relation:
+                    field = field.target_field
+                return field.to_python(value)
+        return value
+
+    def get_position(self, instance):
+        if isinstance(instance, dict):
+            return [instance[name] for name, descending in self.ordering]
+        return [getattr(instance, name) for name, descending in self.ordering]
+
+    def filter_after(self, queryset, position, reverse):
+        """Rows that come after `position` in the ordering, or before it if `reverse`."""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.ordering, position):
+            value = self.to_python(queryset, name, value)
+            lookup = "lt" if descending != reverse else "gt"
+            condition |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return queryset.filter(condition)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.offset = None
+        if not all(self.is_exact(queryset, name) for name, _ in self.ordering):
+            return self.paginate_by_offset(queryset, request)
+        position, reverse = self.decode_cursor(request)
+
+        if queryset._fields:
+            # Rows from `values()` need the ordering's values too, for the cursors
+            missing = [
+                name
+                for name, descending in self.ordering
+                if name not in queryset._fields
+            ]
+            if missing:
+                queryset = queryset.values(*queryset._fields, *missing)
+
+        order_by = [
+            f"-{name}" if descending != reverse else name
+            for name, descending in self.ordering
+        ]
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            try:
+                queryset = self.filter_after(queryset, position, reverse)
+            except (ValidationError, ValueError, TypeError):
+                # A tampered cursor, with values that aren't of the ordering's types
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+
+        self.page = results
+        return results
+
+    def paginate_by_offset(self, queryset, request):
+        self.offset = self.decode_offset_cursor(request)
+        queryset = queryset.order_by(
+            *[f"-{name}" if descending else name for name, descending in self.ordering]
+        )
+        results = list(queryset[self.offset : self.offset + self.page_size + 1])
+        self.has_previous = self.offset > 0
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        if self.offset is not None:
+            return replace_query_param(
+                self.request.build_absolute_uri(),
+                self.cursor_query_param,
+                self.encode_offset_cursor(self.offset + self.page_size),
+            )
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.get_position(self.page[-1]), reverse=False),
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.offset is not None and self.offset > self.page_size:
+            return replace_query_param(
+                self.request.build_absolute_uri(),
+                self.cursor_query_param,
+                self.encode_offset_cursor(self.offset - self.page_size),
+            )
+        if self.offset is not None or not self.page:
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param
+            )
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.get_position(self.page[0]), reverse=True),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
@@ -1,15 +1,21 @@
-from rest_framework import serializers
+from urllib import parse
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.urls import Resolver404, get_script_prefix, resolve
 from django.utils import timezone
+from rest_framework import serializers
 
 
 from movienight.accounts.api.serializers import UserSerializer
-from ..models import Movie, MovieNight
+from movienight.accounts.models import User
+from ..models import Genre, Movie, MovieNight
 
 
 class GenreField(serializers.SlugRelatedField):
     def to_internal_value(self, data):
         try:
-            return self.get_queryset().get_or_create(name=data)[0]
+            return Genre.objects.get_or_create_many([data])[data]
         except (TypeError, ValueError):
             self.fail(f"Tag value {data} is invalid")
 
@@ -22,22 +28,118 @@ class MovieSerializer(serializers.ModelSerializer):
         fields = "genres", "id", "imdb_id", "plot", "runtime_minutes", "title", "year"
 
 
+class MovieDetailSerializer(MovieSerializer):
+    # Set by the view when the movie is a partial record whose full details are queued to be fetched
+    enrichment_pending = serializers.BooleanField(read_only=True, default=False)
+
+    class Meta(MovieSerializer.Meta):
+        fields = MovieSerializer.Meta.fields + ("enrichment_pending",)
+
+
 class MovieSearchSerializer(serializers.Serializer):
     term = serializers.CharField()
 
 
+class MovieAutocompleteSerializer(serializers.Serializer):
+    q = serializers.CharField()
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
 class MovieNightSerializer(serializers.ModelSerializer):
     movie = MovieSerializer()
     creator = UserSerializer()
 
     class Meta:
         model = MovieNight
-        fields = "id", "movie", "start_time", "creator"
+        fields = "id", "movie", "start_time", "end_time", "creator"
+
+
+class MovieNightTimeFilterSerializer(serializers.Serializer):
+    overlaps_from = serializers.DateTimeField(required=False)
+    overlaps_to = serializers.DateTimeField(required=False)
+    upcoming = serializers.BooleanField(required=False)
+
+    def validate(self, data):
+        if (
+            "overlaps_from" in data
+            and "overlaps_to" in data
+            and data["overlaps_from"] >= data["overlaps_to"]
+        ):
+            raise serializers.ValidationError(
+                "overlaps_from must be before overlaps_to."
+            )
+        return data
+
+
+class PreloadedHyperlinkedRelatedField(serializers.HyperlinkedRelatedField):
+    """
+    A hyperlinked field that looks objects up in a dict by pk in the serializer's context, under `preloaded_key`, when
+    it's there, rather than making a query for each of them. A list serializer can load the objects all the pks from
+    `get_lookup_value` link to in one query, before its items are validated.
+    """
+
+    def __init__(self, preloaded_key, **kwargs):
+        self.preloaded_key = preloaded_key
+        super().__init__(**kwargs)
+
+    def get_lookup_value(self, data):
+        """The lookup value `data` links to, or `None` if it isn't a link to `view_name`."""
+        try:
+            if data.startswith(("http:", "https:")):
+                data = parse.urlparse(data).path
+                prefix = get_script_prefix()
+                if data.startswith(prefix):
+                    data = "/" + data[len(prefix) :]
+            match = resolve(parse.unquote(data))
+        except (AttributeError, Resolver404):
+            return None
+        if match.view_name != self.view_name:
+            return None
+        return match.kwargs.get(self.lookup_url_kwarg)
+
+    def get_object(self, view_name, view_args, view_kwargs):
+        preloaded = self.context.get(self.preloaded_key)
+        if preloaded is None:
+            return super().get_object(view_name, view_args, view_kwargs)
+        try:
+            return preloaded[int(view_kwargs[self.lookup_url_kwarg])]
+        except (KeyError, ValueError):
+            raise ObjectDoesNotExist()
+
+
+class MovieNightBulkSerializer(serializers.ListSerializer):
+    """
+    Creates many movie nights at once. The movies they link to are loaded in one query, and the nights are inserted
+    with one `bulk_create`, so either they're all created, or none are and there are errors for each invalid night.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            movie_field = self.child.fields["movie"]
+            movie_pks = set()
+            for item in data:
+                try:
+                    movie_pks.add(int(movie_field.get_lookup_value(item.get("movie"))))
+                except (AttributeError, TypeError, ValueError):
+                    # Invalid nights get their errors from the child serializer
+                    continue
+            self.context[movie_field.preloaded_key] = Movie.objects.in_bulk(movie_pks)
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        movie_nights = [MovieNight(**item) for item in validated_data]
+        for movie_night in movie_nights:
+            # bulk_create doesn't call save()
+            movie_night.update_end_time()
+        with transaction.atomic():
+            return MovieNight.objects.bulk_create(movie_nights)
 
 
 class MovieNightWriteSerializer(serializers.ModelSerializer):
-    movie = serializers.HyperlinkedRelatedField(
-        view_name="movie-detail", queryset=Movie.objects.all()
+    movie = PreloadedHyperlinkedRelatedField(
+        preloaded_key="movies_by_pk",
+        view_name="movie-detail",
+        queryset=Movie.objects.all(),
     )
     creator = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
@@ -45,6 +147,7 @@ class MovieNightWriteSerializer(serializers.ModelSerializer):
         model = MovieNight
         fields = "id", "movie", "start_time", "creator"
         read_only_fields = ("id",)
+        list_serializer_class = MovieNightBulkSerializer
 
     def validate_start_time(self, value):
         """
@@ -53,3 +156,38 @@ class MovieNightWriteSerializer(serializers.ModelSerializer):
         if value < timezone.now():
             raise serializers.ValidationError("Start time must be in the future.")
         return value
+
+
+class FreeSlotSearchSerializer(serializers.Serializer):
+    users = serializers.ListField(child=serializers.EmailField(), allow_empty=False)
+    movie = serializers.PrimaryKeyRelatedField(queryset=Movie.objects.all())
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+    def validate_users(self, value):
+        """Looks up all the users in one query, rather than one per email."""
+        emails = set(value)
+        users = list(User.objects.filter(email__in=emails))
+        unknown = emails - {user.email for user in users}
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown users: {', '.join(sorted(unknown))}"
+            )
+        return users
+
+    def validate_movie(self, value):
+        if not value.runtime_minutes:
+            raise serializers.ValidationError(
+                "The movie's runtime isn't known, so slots can't be found for it."
+            )
+        return value
+
+    def validate(self, data):
+        if data["start"] >= data["end"]:
+            raise serializers.ValidationError("Start must be before end.")
+        return data
+
+
+class FreeSlotSerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
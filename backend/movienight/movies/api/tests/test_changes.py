@@ -0,0 +1,172 @@
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from movienight.accounts.models import User
+from movienight.movies.api.changes import make_token
+from movienight.movies.models import Movie, MovieNight, Tombstone
+from movienight.movies.tests.factories import MovieFactory, MovieNightFactory
+
+
+@override_settings(CHANGES_SAFETY_LAG=0)
+class TestChanges(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        self.url = reverse("changes")
+        self.movie = MovieFactory.create()
+        self.movie_night = MovieNightFactory.create()
+        self.token = self.client.get(self.url).data["next"]
+
+    def test_no_changes(self):
+        response = self.client.get(self.url, {"since": self.token})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            {name: value for name, value in response.data.items() if name != "next"},
+            {
+                "movies": [],
+                "movie_nights": [],
+                "deleted_movies": [],
+                "deleted_movie_nights": [],
+                "has_more": False,
+            },
+        )
+
+    def test_created_and_updated(self):
+        new_movie = MovieFactory.create()
+        self.movie.title = "Changed"
+        self.movie.save()
+        movie_night = MovieNightFactory.create(movie=self.movie)
+
+        response = self.client.get(self.url, {"since": self.token})
+
+        # In the order they were changed
+        self.assertEqual(
+            [movie["id"] for movie in response.data["movies"]],
+            [new_movie.pk, self.movie.pk],
+        )
+        self.assertEqual(response.data["movies"][1]["title"], "Changed")
+        self.assertEqual(
+            [night["id"] for night in response.data["movie_nights"]],
+            [movie_night.pk],
+        )
+
+    def test_movie_night_changed_with_movie(self):
+        movie = self.movie_night.movie
+        movie.title = "Changed"
+        movie.save()
+
+        response = self.client.get(self.url, {"since": self.token})
+
+        self.assertEqual(
+            [night["movie"]["title"] for night in response.data["movie_nights"]],
+            ["Changed"],
+        )
+
+    def test_deleted(self):
+        movie_pk, movie_night_pk = self.movie.pk, self.movie_night.pk
+        self.movie.delete()
+        self.movie_night.delete()
+
+        response = self.client.get(self.url, {"since": self.token})
+
+        self.assertEqual(response.data["deleted_movies"], [movie_pk])
+        self.assertEqual(response.data["deleted_movie_nights"], [movie_night_pk])
+
+    def test_next_token(self):
+        response = self.client.get(self.url, {"since": self.token})
+        MovieFactory.create()
+
+        response = self.client.get(self.url, {"since": response.data["next"]})
+
+        self.assertEqual(len(response.data["movies"]), 1)
+
+    @override_settings(CHANGES_PAGE_SIZE=2)
+    def test_pages(self):
+        movies = MovieFactory.create_batch(3)
+        for object_id in [101, 102, 103]:
+            Tombstone.objects.create(model="movienight", object_id=object_id)
+
+        first = self.client.get(self.url, {"since": self.token}).data
+        second = self.client.get(self.url, {"since": first["next"]}).data
+
+        self.assertTrue(first["has_more"])
+        self.assertEqual(
+            [movie["id"] for movie in first["movies"]], [m.pk for m in movies[:2]]
+        )
+        self.assertEqual(first["deleted_movie_nights"], [101, 102])
+        self.assertFalse(second["has_more"])
+        self.assertEqual([movie["id"] for movie in second["movies"]], [movies[2].pk])
+        self.assertEqual(second["deleted_movie_nights"], [103])
+
+    def test_movie_night_pages_ordered_by_change(self):
+        movie_night = MovieNightFactory.create()
+        self.movie_night.movie.save()
+
+        with override_settings(CHANGES_PAGE_SIZE=1):
+            first = self.client.get(self.url, {"since": self.token}).data
+            second = self.client.get(self.url, {"since": first["next"]}).data
+
+        self.assertEqual(
+            [night["id"] for night in first["movie_nights"] + second["movie_nights"]],
+            [movie_night.pk, self.movie_night.pk],
+        )
+
+    @override_settings(CHANGES_SAFETY_LAG=60)
+    def test_safety_lag(self):
+        a_day_ago = timezone.now() - timedelta(days=1)
+        Movie.objects.update(updated_at=a_day_ago)
+        MovieNight.objects.update(updated_at=a_day_ago)
+        token = self.client.get(self.url).data["next"]
+        # A change with an updated_at from before the token, committed after it was given out
+        Movie.objects.filter(pk=self.movie.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=30)
+        )
+
+        response = self.client.get(self.url, {"since": token})
+
+        self.assertEqual(
+            [movie["id"] for movie in response.data["movies"]], [self.movie.pk]
+        )
+
+    def test_invalid_token(self):
+        response = self.client.get(self.url, {"since": "nonsense"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(CHANGES_RETENTION_DAYS=1)
+    def test_expired_token(self):
+        token = make_token(timezone.now() - timedelta(days=2))
+
+        response = self.client.get(self.url, {"since": token})
+
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_not_a_movie(self):
+        response = self.client.get(reverse("movie-list") + "changes/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("next", response.data)
+
+
+class TestPurgeTombstones(TestCase):
+    @override_settings(CHANGES_RETENTION_DAYS=30)
+    def test_purge(self):
+        old = Tombstone.objects.create(model="movie", object_id=1)
+        Tombstone.objects.filter(pk=old.pk).update(
+            deleted_at=timezone.now() - timedelta(days=31)
+        )
+        recent = Tombstone.objects.create(model="movie", object_id=2)
+
+        call_command("purge_tombstones", stdout=io.StringIO())
+
+        self.assertEqual(list(Tombstone.objects.all()), [recent])
@@ -0,0 +1,138 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from movienight.accounts.models import User
+from movienight.movies.models import EnrichmentJob, Genre, Movie, MovieNight
+from movienight.movies.tests.factories import MovieFactory, MovieNightFactory
+
+
+class TestMovieConditionalGet(APITestCase):
+    def setUp(self):
+        self.movie = MovieFactory.create(is_full_record=True)
+        self.url = reverse("movie-detail", kwargs={"pk": self.movie.pk})
+
+    def test_detail_validators(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertEqual(
+            response["Last-Modified"], http_date(self.movie.updated_at.timestamp())
+        )
+
+    def test_detail_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with patch(
+            "movienight.movies.api.views.MovieViewSet.get_serializer"
+        ) as mock_get_serializer:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+        mock_get_serializer.assert_not_called()
+
+    def test_detail_if_modified_since(self):
+        last_modified = self.client.get(self.url)["Last-Modified"]
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.movie.title = "Changed"
+        self.movie.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["title"], "Changed")
+
+    def test_detail_modified_when_genre_renamed(self):
+        genre = Genre.objects.create(name="Sci-Fi")
+        self.movie.genres.add(genre)
+        etag = self.client.get(self.url)["ETag"]
+
+        genre.name = "Science Fiction"
+        genre.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["genres"], ["Science Fiction"])
+
+    @override_settings(OMDB_BACKGROUND_ENRICHMENT=True)
+    def test_detail_modified_when_enrichment_fails(self):
+        movie = MovieFactory.create(is_full_record=False)
+        url = reverse("movie-detail", kwargs={"pk": movie.pk})
+        pending = self.client.get(url)
+        EnrichmentJob.objects.update(status=EnrichmentJob.Status.FAILED)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=pending["ETag"])
+
+        self.assertTrue(pending.data["enrichment_pending"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["enrichment_pending"])
+
+    def test_list_not_modified(self):
+        MovieFactory.create_batch(3)
+        url = reverse("movie-list")
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Movie.objects.first().delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TestMovieNightConditionalGet(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_modified_when_movie_changes(self):
+        movie_night = MovieNightFactory.create()
+        url = reverse("movienight-detail", kwargs={"pk": movie_night.pk})
+        etag = self.client.get(url)["ETag"]
+
+        movie_night.movie.title = "Changed"
+        movie_night.movie.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["movie"]["title"], "Changed")
+
+    def test_not_modified_since_until_movie_changes(self):
+        movie_night = MovieNightFactory.create()
+        url = reverse("movienight-detail", kwargs={"pk": movie_night.pk})
+        last_modified = self.client.get(url)["Last-Modified"]
+        MovieNight.objects.filter(pk=movie_night.pk).update(
+            updated_at=timezone.now() - timedelta(days=1)
+        )
+        Movie.objects.filter(pk=movie_night.movie.pk).update(
+            updated_at=timezone.now() + timedelta(seconds=5)
+        )
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response["Last-Modified"],
+            http_date(
+                Movie.objects.get(pk=movie_night.movie.pk).updated_at.timestamp()
+            ),
+        )
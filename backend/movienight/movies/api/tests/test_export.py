@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from movienight.accounts.models import User
+from movienight.movies.api.export import iter_records
+from movienight.movies.api.fastserializers import FastMovieSerializer
+from movienight.movies.api.serializers import MovieSerializer
+from movienight.movies.models import Movie
+from movienight.movies.tests.factories import (
+    GenreFactory,
+    MovieFactory,
+    MovieNightFactory,
+)
+
+
+class TestExport(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="password"
+        )
+        self.client.force_authenticate(self.user)
+        genres = [GenreFactory.create(name=name) for name in ["Action", "Drama"]]
+        self.movies = MovieFactory.create_batch(5)
+        self.movies[0].genres.set(genres)
+        self.movie_nights = [
+            MovieNightFactory.create(movie=movie) for movie in self.movies[:2]
+        ]
+
+    def get_content(self, response):
+        return b"".join(response.streaming_content).decode()
+
+    def test_movies_ndjson(self):
+        response = self.client.get(reverse("movie-export"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = [json.loads(line) for line in self.get_content(response).splitlines()]
+        self.assertEqual(
+            records,
+            json.loads(
+                JSONRenderer().render(
+                    MovieSerializer(
+                        Movie.objects.order_by("pk").prefetch_related("genres"),
+                        many=True,
+                    ).data
+                )
+            ),
+        )
+        self.assertEqual(records[0]["genres"], ["Action", "Drama"])
+
+    def test_movie_nights_csv(self):
+        response = self.client.get(reverse("movienight-export"), {"as": "csv"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("movienight.csv", response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(self.get_content(response))))
+        self.assertEqual(
+            [int(row["id"]) for row in rows],
+            [movie_night.pk for movie_night in self.movie_nights],
+        )
+        self.assertEqual(rows[0]["movie.title"], self.movies[0].title)
+        self.assertEqual(rows[0]["movie.genres"], "Action|Drama")
+        self.assertEqual(rows[0]["creator.email"], self.movie_nights[0].creator.email)
+
+    def test_filtered(self):
+        response = self.client.get(
+            reverse("movienight-export"),
+            {"overlaps_to": self.movie_nights[0].start_time.isoformat()},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                json.loads(line)["id"]
+                for line in self.get_content(response).splitlines()
+            ],
+            [
+                movie_night.pk
+                for movie_night in self.movie_nights
+                if movie_night.start_time < self.movie_nights[0].start_time
+            ],
+        )
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse("movie-export"), {"as": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestIterRecords(TestCase):
+    def test_chunks(self):
+        MovieFactory.create_batch(5)
+
+        # The rows are read from one cursor, then the genres are looked up for each chunk of them
+        with self.assertNumQueries(4):
+            records = list(
+                iter_records(Movie.objects.order_by("pk"), FastMovieSerializer, 2)
+            )
+
+        self.assertEqual(
+            [record["id"] for record in records],
+            list(Movie.objects.order_by("pk").values_list("pk", flat=True)),
+        )
+
+
+class TestExportCommand(TestCase):
+    def test_export_movies(self):
+        movies = MovieFactory.create_batch(3)
+        output = io.StringIO()
+
+        call_command("export", "movies", "--as", "csv", stdout=output)
+
+        rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+        self.assertEqual(
+            [row["title"] for row in rows], [movie.title for movie in movies]
+        )
@@ -0,0 +1,123 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from movienight.accounts.models import User
+from movienight.movies.api.fastserializers import (
+    FastMovieNightSerializer,
+    FastMovieSerializer,
+)
+from movienight.movies.api.serializers import MovieNightSerializer, MovieSerializer
+from movienight.movies.models import Movie, MovieNight, SearchResult, SearchTerm
+from movienight.movies.tests.factories import (
+    GenreFactory,
+    MovieFactory,
+    MovieNightFactory,
+)
+
+
+class TestFastSerializers(TestCase):
+    def setUp(self):
+        drama, comedy, action = GenreFactory.create_batch(3)
+        self.movies = [
+            MovieFactory.create(plot=None, runtime_minutes=None),
+            MovieFactory.create(title="Ünïcode"),
+            MovieFactory.create(),
+        ]
+        self.movies[1].genres.set([drama, comedy, action])
+        self.movies[2].genres.set([action])
+        MovieNightFactory.create(movie=self.movies[1])
+        MovieNightFactory.create(movie=self.movies[0], creator__first_name="")
+
+    def assertRenderEqual(self, fast_data, data):
+        self.assertEqual(JSONRenderer().render(fast_data), JSONRenderer().render(data))
+
+    def test_movies(self):
+        queryset = Movie.objects.order_by("id")
+        fast_serializer = FastMovieSerializer()
+
+        with self.assertNumQueries(2):
+            fast_data = fast_serializer.serialize(fast_serializer.get_rows(queryset))
+
+        self.assertRenderEqual(
+            fast_data,
+            MovieSerializer(queryset.prefetch_related("genres"), many=True).data,
+        )
+
+    def test_movie_nights(self):
+        queryset = MovieNight.objects.select_related("movie", "creator").order_by("id")
+        fast_serializer = FastMovieNightSerializer()
+
+        with self.assertNumQueries(2):
+            fast_data = fast_serializer.serialize(fast_serializer.get_rows(queryset))
+
+        self.assertRenderEqual(
+            fast_data, MovieNightSerializer(queryset, many=True).data
+        )
+
+    def test_no_rows(self):
+        fast_serializer = FastMovieSerializer()
+
+        self.assertEqual(
+            fast_serializer.serialize(fast_serializer.get_rows(Movie.objects.none())),
+            [],
+        )
+
+
+class TestFastSerializerViews(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(email="test@example.com", password="password")
+        self.client.force_authenticate(user)
+        genres = GenreFactory.create_batch(2)
+        for movie_night in MovieNightFactory.create_batch(5):
+            movie_night.movie.genres.set(genres)
+
+    def get_with_and_without(self, url, params=None):
+        responses = []
+        for fast in [False, True]:
+            with self.settings(API_FAST_SERIALIZERS=fast, API_PAGE_SIZE=2):
+                response = self.client.get(url, params)
+                pages = [response]
+                while response.data["next"] is not None:
+                    response = self.client.get(response.data["next"])
+                    pages.append(response)
+                responses.append(pages)
+        return responses
+
+    def assertSameResponses(self, responses, fast_responses):
+        self.assertEqual(len(fast_responses), len(responses))
+        for response, fast_response in zip(responses, fast_responses):
+            self.assertEqual(fast_response.content, response.content)
+            self.assertEqual(fast_response.get("ETag"), response.get("ETag"))
+
+    def test_movie_list(self):
+        self.assertSameResponses(*self.get_with_and_without(reverse("movie-list")))
+
+    def test_movie_night_list(self):
+        self.assertSameResponses(
+            *self.get_with_and_without(
+                reverse("movienight-list"), {"ordering": "-start_time"}
+            )
+        )
+
+    @patch("movienight.movies.api.views.search_and_save")
+    def test_search(self, search_and_save_mock):
+        search_term = SearchTerm.objects.create(term="test")
+        for rank, movie in enumerate(Movie.objects.order_by("-id"), start=1):
+            SearchResult.objects.create(search_term=search_term, movie=movie, rank=rank)
+
+        self.assertSameResponses(
+            *self.get_with_and_without(reverse("movie-search"), {"term": "test"})
+        )
+
+    @override_settings(API_FAST_SERIALIZERS=True)
+    def test_list_not_modified(self):
+        url = reverse("movienight-list")
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
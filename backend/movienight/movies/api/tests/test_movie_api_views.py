@@ -1,10 +1,19 @@
+import json
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 from unittest.mock import patch, MagicMock
 
-from movienight.movies.models import Movie
+from movienight.movies.api.async_views import movie_search
+from movienight.movies.api.fastserializers import FastMovieSerializer
+from movienight.movies.autocomplete import title_index
+from movienight.movies.models import EnrichmentJob, Movie, SearchResult, SearchTerm
 from movienight.movies.tests.factories import MovieFactory, GenreFactory
+from movienight.omdb.ratelimit import RateLimitExceeded
 
 
 class TestMovieViewSet(APITestCase):
@@ -20,7 +29,16 @@ class TestMovieViewSet(APITestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 20)
+        self.assertEqual(len(response.data["results"]), 20)
+
+    def test_list_movie_queries(self):
+        url = reverse("movie-list")
+
+        # The movies, then all of their genres
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.data["results"][0]["genres"]), 1)
 
     @patch("movienight.movies.api.views.fill_movie_details")
     def test_get_movie(self, mock_fill_movie_details):
@@ -49,6 +67,55 @@ class TestMovieViewSet(APITestCase):
 
         mock_fill_movie_details.assert_called_once()
 
+    @patch("movienight.movies.api.views.fill_movie_details")
+    def test_get_movie_rate_limited(self, mock_fill_movie_details):
+        movie = Movie.objects.first()
+        mock_fill_movie_details.side_effect = RateLimitExceeded("Budget used up.")
+
+        url = reverse("movie-detail", kwargs={"pk": movie.id})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["title"], movie.title)
+
+    @override_settings(OMDB_BACKGROUND_ENRICHMENT=True)
+    @patch("movienight.movies.api.views.fill_movie_details")
+    def test_get_movie_background_enrichment(self, mock_fill_movie_details):
+        movie = MovieFactory.create(is_full_record=False)
+
+        url = reverse("movie-detail", kwargs={"pk": movie.id})
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["title"], movie.title)
+        self.assertTrue(response.data["enrichment_pending"])
+        mock_fill_movie_details.assert_not_called()
+        self.assertTrue(EnrichmentJob.objects.filter(movie=movie).exists())
+
+    @override_settings(OMDB_BACKGROUND_ENRICHMENT=True)
+    def test_get_movie_failed_background_enrichment(self):
+        movie = MovieFactory.create(is_full_record=False)
+        EnrichmentJob.objects.create(
+            movie=movie,
+            status=EnrichmentJob.Status.FAILED,
+            attempts=EnrichmentJob.MAX_ATTEMPTS,
+            claimed_at=timezone.now(),
+        )
+
+        response = self.client.get(reverse("movie-detail", kwargs={"pk": movie.pk}))
+
+        self.assertFalse(response.data["enrichment_pending"])
+
+    @override_settings(OMDB_BACKGROUND_ENRICHMENT=True)
+    def test_get_full_movie_background_enrichment(self):
+        movie = MovieFactory.create(is_full_record=True)
+
+        url = reverse("movie-detail", kwargs={"pk": movie.id})
+        response = self.client.get(url)
+
+        self.assertFalse(response.data["enrichment_pending"])
+        self.assertFalse(EnrichmentJob.objects.exists())
+
     def test_get_movie_not_found(self):
         url = reverse("movie-detail", kwargs={"pk": 99999})
         response = self.client.get(url)
@@ -88,9 +155,39 @@ class TestMovieViewSet(APITestCase):
         response = self.client.get(url, {"term": "test"})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 5)
+        self.assertEqual(len(response.data["results"]), 5)
         for i in range(5):
-            self.assertEqual(response.data[i]["title"], f"test {i}")
+            self.assertEqual(response.data["results"][i]["title"], f"test {i}")
+
+    @patch("movienight.movies.api.views.search_and_save")
+    def test_search_movie_stored_results(self, search_and_save_mock):
+        search_term = SearchTerm.objects.create(term="test")
+        for rank, title in enumerate(["Zest", "A Test"], start=1):
+            SearchResult.objects.create(
+                search_term=search_term,
+                movie=MovieFactory.create(title=title),
+                rank=rank,
+            )
+        MovieFactory.create(title="test not from OMDb")
+
+        url = reverse("movie-search")
+        response = self.client.get(url, {"term": " Test"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [movie["title"] for movie in response.data["results"]], ["Zest", "A Test"]
+        )
+
+    @patch("movienight.movies.api.views.search_and_save")
+    def test_search_movie_rate_limited(self, search_and_save_mock):
+        search_and_save_mock.side_effect = RateLimitExceeded("Budget used up.")
+        MovieFactory.create(title="test")
+
+        url = reverse("movie-search")
+        response = self.client.get(url, {"term": "test"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
 
     @patch("movienight.movies.api.views.search_and_save")
     def test_search_movie_no_results(self, search_and_save_mock):
@@ -98,4 +195,91 @@ class TestMovieViewSet(APITestCase):
         response = self.client.get(url, {"term": "test"})
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data["results"]), 0)
+
+    @patch("movienight.movies.api.views.search_and_save")
+    def test_autocomplete(self, search_and_save_mock):
+        title_index.reset()
+        self.addCleanup(title_index.reset)
+        movie = MovieFactory.create(title="The Matrix", year=1999)
+        title_index.build()
+
+        url = reverse("movie-autocomplete")
+        response = self.client.get(url, {"q": "matr"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data, [{"id": movie.pk, "title": "The Matrix", "year": 1999}]
+        )
+        search_and_save_mock.assert_not_called()
+
+    def test_autocomplete_invalid_query(self):
+        url = reverse("movie-autocomplete")
+        response = self.client.get(url, {"limit": 1000})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestAsyncMovieSearch(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    @patch("movienight.movies.api.async_views.asearch_and_save")
+    async def test_search_movie(self, mock_asearch_and_save):
+        for i in range(3):
+            await Movie.objects.acreate(title=f"test {i}", year=2000, imdb_id=f"tt{i}")
+        await Movie.objects.acreate(title="other", year=2000, imdb_id="tt9")
+
+        response = await movie_search(self.factory.get("/", {"term": "test"}))
+
+        mock_asearch_and_save.assert_awaited_once_with("test", background_refresh=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [movie["title"] for movie in json.loads(response.content)["results"]],
+            ["test 0", "test 1", "test 2"],
+        )
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "test-async-search-cache",
+            }
+        }
+    )
+    @patch("movienight.movies.api.async_views.asearch_and_save")
+    async def test_search_movie_cached(self, mock_asearch_and_save):
+        await sync_to_async(cache.clear)()
+        self.addCleanup(cache.clear)
+        await Movie.objects.acreate(title="test", year=2000, imdb_id="tt0")
+
+        first = await movie_search(self.factory.get("/", {"term": "test"}))
+        second = await movie_search(self.factory.get("/", {"term": " TEST "}))
+
+        self.assertEqual(second.content, first.content)
+        mock_asearch_and_save.assert_awaited_once_with("test", background_refresh=True)
+
+    @override_settings(API_FAST_SERIALIZERS=True)
+    @patch("movienight.movies.api.async_views.asearch_and_save")
+    async def test_search_movie_fast_serializer(self, mock_asearch_and_save):
+        await Movie.objects.acreate(title="test", year=2000, imdb_id="tt0")
+
+        with patch(
+            "movienight.movies.api.async_views.FastMovieSerializer.serialize",
+            autospec=True,
+            side_effect=FastMovieSerializer.serialize,
+        ) as mock_serialize:
+            response = await movie_search(self.factory.get("/", {"term": "test"}))
+
+        mock_serialize.assert_called_once()
+        self.assertEqual(
+            [movie["title"] for movie in json.loads(response.content)["results"]],
+            ["test"],
+        )
+
+    @patch("movienight.movies.api.async_views.asearch_and_save")
+    async def test_search_movie_invalid_search_term(self, mock_asearch_and_save):
+        response = await movie_search(self.factory.get("/"))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_asearch_and_save.assert_not_called()
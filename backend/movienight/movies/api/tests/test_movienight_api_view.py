@@ -4,14 +4,15 @@ from django.urls import reverse
 from django.utils import timezone
 
 from movienight.accounts.models import User
-from movienight.movies.models import Movie, MovieNight
+from movienight.movies.models import Genre, Movie, MovieNight
+from movienight.movies.querybudget import QueryBudgetTestMixin
 from movienight.movies.tests.factories import (
     MovieFactory,
     MovieNightFactory,
 )
 
 
-class MovieNightListAPITest(APITestCase):
+class MovieNightListAPITest(QueryBudgetTestMixin, APITestCase):
     def setUp(self):
         self.movie_nights = MovieNightFactory.create_batch(5)
 
@@ -20,50 +21,66 @@ class MovieNightListAPITest(APITestCase):
         )
         self.client.force_authenticate(self.user)
 
+    def test_list_queries_dont_grow_with_movie_nights(self):
+        genres = [Genre.objects.create(name=name) for name in ["Action", "Drama"]]
+        for movie_night in MovieNightFactory.create_batch(50):
+            movie_night.movie.genres.set(genres)
+
+        url = reverse("movienight-list")
+        with self.assertMaxQueries(2):
+            response = self.client.get(url)
+
+        results = response.data["results"]
+        self.assertEqual(len(results), 50)
+        self.assertEqual(set(results[-1]["movie"]["genres"]), {"Action", "Drama"})
+
     def test_list(self):
         url = reverse("movienight-list")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), len(self.movie_nights))
+        results = response.data["results"]
+        self.assertEqual(len(results), len(self.movie_nights))
         for i in range(len(self.movie_nights)):
-            self.assertEqual(len(response.data[i].keys()), 4)
-            self.assertEqual(response.data[i]["id"], self.movie_nights[i].id)
-            self.assertEqual(
-                response.data[i]["movie"]["id"], self.movie_nights[i].movie.id
-            )
+            self.assertEqual(len(results[i].keys()), 5)
+            self.assertEqual(results[i]["id"], self.movie_nights[i].id)
+            self.assertEqual(results[i]["movie"]["id"], self.movie_nights[i].movie.id)
             self.assertEqual(
-                response.data[i]["movie"]["title"], self.movie_nights[i].movie.title
+                results[i]["movie"]["title"], self.movie_nights[i].movie.title
             )
             self.assertEqual(
-                response.data[i]["movie"]["imdb_id"], self.movie_nights[i].movie.imdb_id
+                results[i]["movie"]["imdb_id"], self.movie_nights[i].movie.imdb_id
             )
             self.assertEqual(
-                response.data[i]["movie"]["year"], self.movie_nights[i].movie.year
+                results[i]["movie"]["year"], self.movie_nights[i].movie.year
             )
             self.assertEqual(
-                response.data[i]["movie"]["runtime_minutes"],
+                results[i]["movie"]["runtime_minutes"],
                 self.movie_nights[i].movie.runtime_minutes,
             )
             self.assertEqual(
-                response.data[i]["movie"]["plot"], self.movie_nights[i].movie.plot
+                results[i]["movie"]["plot"], self.movie_nights[i].movie.plot
             )
-            self.assertEqual(len(response.data[i]["movie"].keys()), 7)
+            self.assertEqual(len(results[i]["movie"].keys()), 7)
             self.assertEqual(
-                response.data[i]["start_time"],
+                results[i]["start_time"],
                 self.movie_nights[i].start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
             )
             self.assertEqual(
-                response.data[i]["creator"]["email"], self.movie_nights[i].creator.email
+                results[i]["end_time"],
+                self.movie_nights[i].end_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
             )
             self.assertEqual(
-                response.data[i]["creator"]["first_name"],
+                results[i]["creator"]["email"], self.movie_nights[i].creator.email
+            )
+            self.assertEqual(
+                results[i]["creator"]["first_name"],
                 self.movie_nights[i].creator.first_name,
             )
             self.assertEqual(
-                response.data[i]["creator"]["last_name"],
+                results[i]["creator"]["last_name"],
                 self.movie_nights[i].creator.last_name,
             )
-            self.assertEqual(len(response.data[i]["creator"].keys()), 3)
+            self.assertEqual(len(results[i]["creator"].keys()), 3)
 
     def test_list_sorted_by_start_time(self):
         url = f"{reverse('movienight-list')}?ordering=start_time"
@@ -74,7 +91,7 @@ class MovieNightListAPITest(APITestCase):
         sorted_start_times = sorted(start_times)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        for i, movie_night_data in enumerate(response.data):
+        for i, movie_night_data in enumerate(response.data["results"]):
             self.assertEqual(
                 movie_night_data["start_time"],
                 sorted_start_times[i].strftime("%Y-%m-%dT%H:%M:%SZ"),
@@ -88,6 +105,157 @@ class MovieNightListAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class MovieNightTimeFilterAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.now = timezone.now().replace(microsecond=0)
+        movie = MovieFactory.create(runtime_minutes=120)
+        no_runtime_movie = MovieFactory.create(runtime_minutes=None)
+        # Ends as the period starts
+        self.ended = MovieNightFactory.create(
+            movie=movie, start_time=self.now - timezone.timedelta(hours=2)
+        )
+        # Started before the period, ends during it
+        self.running = MovieNightFactory.create(
+            movie=movie, start_time=self.now - timezone.timedelta(hours=1)
+        )
+        self.no_runtime = MovieNightFactory.create(
+            movie=no_runtime_movie, start_time=self.now + timezone.timedelta(hours=1)
+        )
+        # Starts as the period ends
+        self.later = MovieNightFactory.create(
+            movie=movie, start_time=self.now + timezone.timedelta(hours=3)
+        )
+
+    def get_ids(self, params):
+        response = self.client.get(reverse("movienight-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {movie_night["id"] for movie_night in response.data["results"]}
+
+    def test_overlapping(self):
+        ids = self.get_ids(
+            {
+                "overlaps_from": self.now.isoformat(),
+                "overlaps_to": (self.now + timezone.timedelta(hours=3)).isoformat(),
+            }
+        )
+
+        self.assertEqual(ids, {self.running.id, self.no_runtime.id})
+
+    def test_open_ended_overlapping(self):
+        ids = self.get_ids({"overlaps_to": self.now.isoformat()})
+
+        self.assertEqual(ids, {self.ended.id, self.running.id})
+
+    def test_upcoming(self):
+        ids = self.get_ids({"upcoming": "true"})
+
+        self.assertEqual(ids, {self.running.id, self.no_runtime.id, self.later.id})
+
+    def test_no_runtime_lasts_unknown_runtime(self):
+        # Started an hour ago, and is taken to last UNKNOWN_RUNTIME, the same as when scheduling
+        started = MovieNightFactory.create(
+            movie=self.no_runtime.movie,
+            start_time=self.now - timezone.timedelta(hours=1),
+        )
+
+        self.assertIn(started.id, self.get_ids({"upcoming": "true"}))
+        self.assertIn(started.id, self.get_ids({"overlaps_from": self.now.isoformat()}))
+
+    def test_invalid_period(self):
+        response = self.client.get(
+            reverse("movienight-list"),
+            {"overlaps_from": self.now.isoformat(), "overlaps_to": "yesterday"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(
+            reverse("movienight-list"),
+            {
+                "overlaps_from": self.now.isoformat(),
+                "overlaps_to": self.now.isoformat(),
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MovieNightFreeSlotsAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="testpassword"
+        )
+        self.other_user = User.objects.create_user(
+            email="other@example.com", password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.start = timezone.now().replace(microsecond=0)
+        self.movie = MovieFactory.create(runtime_minutes=120)
+
+    def get_free_slots(self, **params):
+        return self.client.get(
+            reverse("movienight-free-slots"),
+            {
+                "users": [self.user.email, self.other_user.email],
+                "movie": self.movie.pk,
+                "start": self.start.isoformat(),
+                "end": (self.start + timezone.timedelta(hours=10)).isoformat(),
+                **params,
+            },
+        )
+
+    def test_free_slots(self):
+        MovieNightFactory.create(
+            creator=self.user,
+            movie=self.movie,
+            start_time=self.start + timezone.timedelta(hours=1),
+        )
+        MovieNightFactory.create(
+            creator=self.other_user,
+            movie=self.movie,
+            start_time=self.start + timezone.timedelta(hours=4),
+        )
+
+        response = self.get_free_slots()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            [
+                {
+                    "start": (self.start + timezone.timedelta(hours=6)).strftime(
+                        "%Y-%m-%dT%H:%M:%SZ"
+                    ),
+                    "end": (self.start + timezone.timedelta(hours=10)).strftime(
+                        "%Y-%m-%dT%H:%M:%SZ"
+                    ),
+                }
+            ],
+        )
+
+    def test_unknown_user(self):
+        response = self.get_free_slots(users=["nobody@example.com"])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("nobody@example.com", str(response.data["users"]))
+
+    def test_movie_without_runtime(self):
+        movie = MovieFactory.create(runtime_minutes=None)
+
+        response = self.get_free_slots(movie=movie.pk)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_end_before_start(self):
+        response = self.get_free_slots(
+            end=(self.start - timezone.timedelta(hours=1)).isoformat()
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class MovieNightCreateAPITest(APITestCase):
     def setUp(self):
         self.movie_nights = MovieNightFactory.create_batch(5)
@@ -170,6 +338,83 @@ class MovieNightCreateAPITest(APITestCase):
         self.assertEqual(MovieNight.objects.count(), len(self.movie_nights))
 
 
+class MovieNightBulkCreateAPITest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test@example.com", password="testpassword"
+        )
+        self.client.force_authenticate(self.user)
+        self.url = reverse("movienight-bulk")
+        self.start_time = timezone.now() + timezone.timedelta(days=7)
+
+    def get_weekly_nights(self, movies):
+        return [
+            {
+                "movie": reverse("movie-detail", args=[movie.id]),
+                "start_time": (
+                    self.start_time + timezone.timedelta(weeks=week)
+                ).isoformat(),
+            }
+            for week, movie in enumerate(movies)
+        ]
+
+    def test_bulk_create(self):
+        movies = MovieFactory.create_batch(20, runtime_minutes=100)
+        data = self.get_weekly_nights(movies)
+        data[1]["movie"] = f"http://testserver{data[1]['movie']}"
+
+        # Finding the movies, then inserting the nights in a savepoint, whatever the number of nights
+        with self.assertNumQueries(4):
+            response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 20)
+        movie_nights = list(MovieNight.objects.order_by("start_time"))
+        self.assertEqual([night.movie for night in movie_nights], movies)
+        self.assertEqual(
+            [night_data["id"] for night_data in response.data],
+            [night.id for night in movie_nights],
+        )
+        for movie_night in movie_nights:
+            self.assertEqual(movie_night.creator, self.user)
+            self.assertEqual(
+                movie_night.end_time,
+                movie_night.start_time + timezone.timedelta(minutes=100),
+            )
+
+    def test_bulk_create_errors(self):
+        data = self.get_weekly_nights(MovieFactory.create_batch(3))
+        data[0]["movie"] = reverse("movie-detail", args=[0])
+        data[2]["start_time"] = (
+            timezone.now() - timezone.timedelta(days=1)
+        ).isoformat()
+
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data[0]), ["movie"])
+        self.assertEqual(response.data[1], {})
+        self.assertEqual(list(response.data[2]), ["start_time"])
+        self.assertEqual(MovieNight.objects.count(), 0)
+
+    def test_bulk_create_not_a_list(self):
+        data = self.get_weekly_nights(MovieFactory.create_batch(1))[0]
+
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(MovieNight.objects.count(), 0)
+
+    def test_bulk_create_too_many(self):
+        data = self.get_weekly_nights(MovieFactory.create_batch(3))
+
+        with self.settings(API_MAX_BULK_SIZE=2):
+            response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(MovieNight.objects.count(), 0)
+
+
 class MovieNightRetrieveAPITest(APITestCase):
     def setUp(self):
         self.movie_nights = MovieNightFactory.create_batch(5)
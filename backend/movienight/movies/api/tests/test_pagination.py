@@ -0,0 +1,175 @@
+import base64
+import json
+from unittest.mock import patch
+
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from movienight.accounts.models import User
+from movienight.movies.api.pagination import KeysetPagination
+from movienight.movies.models import Movie, MovieNight, SearchResult, SearchTerm
+from movienight.movies.tests.factories import MovieFactory, MovieNightFactory
+
+
+@override_settings(API_PAGE_SIZE=3, API_MAX_PAGE_SIZE=5)
+class TestKeysetPagination(APITestCase):
+    def get_all_pages(self, url, params=None):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data["results"])
+            if response.data["next"] is None:
+                return pages
+            response = self.client.get(response.data["next"])
+
+    def test_page_through_composite_ordering(self):
+        # Duplicate titles and years, so the pages have to key on the whole ordering and the pk
+        for title in ["Alien", "Alien", "Heat", "Heat", "Heat", "Up", "Up"]:
+            MovieFactory.create(title=title, year=2000)
+
+        pages = self.get_all_pages(reverse("movie-list"))
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(
+            [movie["id"] for page in pages for movie in page],
+            list(
+                Movie.objects.order_by("title", "year", "id").values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+
+    def test_previous_page(self):
+        MovieFactory.create_batch(7)
+        first_page = self.client.get(reverse("movie-list")).data
+        second_page = self.client.get(first_page["next"]).data
+
+        self.assertIsNone(first_page["previous"])
+        previous_page = self.client.get(second_page["previous"]).data
+
+        self.assertEqual(previous_page["results"], first_page["results"])
+        self.assertEqual(
+            self.client.get(previous_page["next"]).data["results"],
+            second_page["results"],
+        )
+
+    def test_stable_when_rows_inserted(self):
+        for title in ["B", "C", "D", "E"]:
+            MovieFactory.create(title=title)
+        first_page = self.client.get(reverse("movie-list")).data
+
+        MovieFactory.create(title="A")
+        second_page = self.client.get(first_page["next"]).data
+
+        self.assertEqual(
+            [movie["title"] for movie in first_page["results"]], ["B", "C", "D"]
+        )
+        self.assertEqual([movie["title"] for movie in second_page["results"]], ["E"])
+
+    def test_page_size(self):
+        MovieFactory.create_batch(7)
+
+        response = self.client.get(reverse("movie-list"), {"page_size": 2})
+        self.assertEqual(len(response.data["results"]), 2)
+
+        response = self.client.get(reverse("movie-list"), {"page_size": 100})
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("movie-list"), {"cursor": "nonsense"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursors(self):
+        MovieFactory.create_batch(2)
+        user = User.objects.create_user(email="test@example.com", password="password")
+        self.client.force_authenticate(user)
+        MovieNightFactory.create()
+        cases = [
+            ("movie-list", {"p": ["a", "notint", 1], "r": False}),
+            ("movie-list", {"p": [None, None, None], "r": False}),
+            ("movie-list", {"p": ["a", 2000, ["not", "a", "pk"]], "r": False}),
+            ("movienight-list", {"p": [1, "not a date", 1], "r": False}),
+        ]
+        for url_name, data in cases:
+            with self.subTest(url_name=url_name, data=data):
+                cursor = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+                response = self.client.get(reverse(url_name), {"cursor": cursor})
+
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_through_ordering_filter(self):
+        user = User.objects.create_user(email="test@example.com", password="password")
+        self.client.force_authenticate(user)
+        start_time = timezone.now()
+        for days in [3, 1, 1, 2, 5, 4, 1]:
+            MovieNightFactory.create(
+                start_time=start_time + timezone.timedelta(days=days)
+            )
+
+        pages = self.get_all_pages(
+            reverse("movienight-list"), {"ordering": "-start_time"}
+        )
+
+        self.assertEqual(
+            [movie_night["id"] for page in pages for movie_night in page],
+            list(
+                MovieNight.objects.order_by("-start_time", "id").values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+
+    @patch("movienight.movies.api.views.search_and_save")
+    def test_page_through_search_results(self, search_and_save_mock):
+        movies = MovieFactory.create_batch(5)
+        other_search_term = SearchTerm.objects.create(term="other")
+        search_term = SearchTerm.objects.create(term="test")
+        for rank, movie in enumerate(reversed(movies), start=1):
+            SearchResult.objects.create(search_term=search_term, movie=movie, rank=rank)
+            SearchResult.objects.create(
+                search_term=other_search_term, movie=movie, rank=rank
+            )
+
+        pages = self.get_all_pages(reverse("movie-search"), {"term": "test"})
+
+        self.assertEqual(
+            [movie["id"] for page in pages for movie in page],
+            [movie.pk for movie in reversed(movies)],
+        )
+
+    def test_page_through_float_ordering_by_offset(self):
+        for year in [2000, 2000, 2001, 2002, 2002, 2003, 2004]:
+            MovieFactory.create(year=year)
+        # Like a search rank, which can't be compared exactly with the value in a cursor
+        queryset = Movie.objects.annotate(
+            score=Cast(F("year"), FloatField()) / 3
+        ).order_by("-score")
+
+        pages = []
+        url = "/api/movies/"
+        while url is not None:
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(
+                queryset, Request(APIRequestFactory().get(url))
+            )
+            pages.append([movie.pk for movie in page])
+            url = paginator.get_next_link()
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(
+            [pk for page in pages for pk in page],
+            list(queryset.order_by("-score", "id").values_list("id", flat=True)),
+        )
+        previous_request = Request(
+            APIRequestFactory().get(paginator.get_previous_link())
+        )
+        self.assertEqual(paginator.decode_offset_cursor(previous_request), 3)
@@ -0,0 +1,131 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from movienight.movies.models import SearchResult, SearchTerm
+from movienight.movies.omdb_integration import save_search
+from movienight.movies.tests.factories import GenreFactory, MovieFactory
+from movienight.omdb.ratelimit import RateLimitExceeded
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-response-cache",
+        }
+    }
+)
+class TestResponseCache(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def create_search_results(self, term, movies):
+        search_term = SearchTerm.objects.create(term=term)
+        for rank, movie in enumerate(movies, start=1):
+            SearchResult.objects.create(search_term=search_term, movie=movie, rank=rank)
+
+    @patch("movienight.movies.api.views.search_and_save")
+    def test_search_cached(self, search_and_save_mock):
+        self.create_search_results("test", MovieFactory.create_batch(2))
+
+        first = self.client.get(reverse("movie-search"), {"term": "test"})
+        second = self.client.get(reverse("movie-search"), {"term": " TEST "})
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        search_and_save_mock.assert_called_once_with("test", background_refresh=True)
+
+    @patch("movienight.movies.api.views.search_and_save")
+    def test_search_invalidated_by_movie_change(self, search_and_save_mock):
+        movie = MovieFactory.create()
+        self.create_search_results("test", [movie])
+        self.client.get(reverse("movie-search"), {"term": "test"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.title = "Changed"
+            movie.save()
+        response = self.client.get(reverse("movie-search"), {"term": "test"})
+
+        self.assertEqual(response.data["results"][0]["title"], "Changed")
+        self.assertEqual(search_and_save_mock.call_count, 2)
+
+    @patch("movienight.movies.api.views.search_and_save")
+    def test_search_not_invalidated_by_other_movies(self, search_and_save_mock):
+        self.create_search_results("test", MovieFactory.create_batch(2))
+        other_movie = MovieFactory.create()
+        self.create_search_results("other", [other_movie])
+        self.client.get(reverse("movie-search"), {"term": "test"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other_movie.title = "Changed"
+            other_movie.save()
+            # A search that saves nothing new
+            save_search("nothing new", [])
+        self.client.get(reverse("movie-search"), {"term": "test"})
+
+        search_and_save_mock.assert_called_once_with("test", background_refresh=True)
+
+    @patch("movienight.movies.api.views.search_and_save")
+    def test_search_invalidated_by_movie_deletion(self, search_and_save_mock):
+        movies = MovieFactory.create_batch(2)
+        self.create_search_results("test", movies)
+        self.client.get(reverse("movie-search"), {"term": "test"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            movies[0].delete()
+        response = self.client.get(reverse("movie-search"), {"term": "test"})
+
+        self.assertEqual(
+            [movie["id"] for movie in response.data["results"]], [movies[1].pk]
+        )
+
+    @patch("movienight.movies.api.views.search_and_save")
+    def test_rate_limited_search_not_cached(self, search_and_save_mock):
+        search_and_save_mock.side_effect = RateLimitExceeded("Daily budget used up")
+
+        self.client.get(reverse("movie-search"), {"term": "test"})
+        self.client.get(reverse("movie-search"), {"term": "test"})
+
+        self.assertEqual(search_and_save_mock.call_count, 2)
+
+    def test_detail_cached(self):
+        movie = MovieFactory.create(is_full_record=True)
+        url = reverse("movie-detail", kwargs={"pk": movie.pk})
+        first = self.client.get(url)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_detail_invalidated_by_genre_change(self):
+        movie = MovieFactory.create(is_full_record=True)
+        genre = GenreFactory.create(name="Drama")
+        movie.genres.add(genre)
+        url = reverse("movie-detail", kwargs={"pk": movie.pk})
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            genre.name = "Comedy"
+            genre.save()
+        response = self.client.get(url)
+
+        self.assertEqual(response.data["genres"], ["Comedy"])
+
+    @patch("movienight.movies.api.views.fill_movie_details")
+    def test_partial_detail_not_cached(self, fill_movie_details_mock):
+        fill_movie_details_mock.side_effect = RateLimitExceeded("Daily budget used up")
+        movie = MovieFactory.create(is_full_record=False)
+        url = reverse("movie-detail", kwargs={"pk": movie.pk})
+
+        self.client.get(url)
+        self.client.get(url)
+
+        self.assertEqual(fill_movie_details_mock.call_count, 2)
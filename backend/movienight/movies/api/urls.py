@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import MovieViewSet, MovieNightViewSet
+from .async_views import movie_search
+from .views import ChangesView, MovieViewSet, MovieNightViewSet
 
 
 router = DefaultRouter()
@@ -9,4 +11,12 @@ router.register("movie-nights", MovieNightViewSet)
 router.register("", MovieViewSet)
 
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    # Before the router, where it would be taken for the pk of a movie
+    path("changes/", ChangesView.as_view(), name="changes"),
+    path("", include(router.urls)),
+]
+
+if settings.OMDB_ASYNC_SEARCH:
+    # Takes precedence over the `search` action of MovieViewSet
+    urlpatterns.insert(0, path("search/", movie_search, name="movie-search-async"))
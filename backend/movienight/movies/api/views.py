@@ -1,27 +1,136 @@
+import logging
+
+from django.conf import settings
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
+from rest_framework.views import APIView
 
-from ..models import Movie, MovieNight
+from .. import responsecache
+from ..autocomplete import title_index
+from ..models import EnrichmentJob, Movie, MovieNight
+from .changes import get_changes, get_next_token
+from .conditional import ConditionalGetMixin, make_etag
+from .export import ExportMixin
+from .fastserializers import FastMovieNightSerializer, FastMovieSerializer
+from .filters import MovieNightTimeFilter
+from .pagination import KeysetPagination
 from .serializers import (
+    FreeSlotSearchSerializer,
+    FreeSlotSerializer,
+    MovieAutocompleteSerializer,
+    MovieDetailSerializer,
     MovieNightSerializer,
     MovieSerializer,
     MovieSearchSerializer,
     MovieNightWriteSerializer,
 )
-from ..omdb_integration import fill_movie_details, search_and_save
+from ..omdb_integration import (
+    fill_movie_details,
+    get_search_results,
+    normalize_search_term,
+    search_and_save,
+)
+from ..querybudget import with_query_budget
+from ..scheduling import find_free_slots_for_movie
+from movienight.omdb.ratelimit import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+
+def get_search_cache_key(request, term):
+    """The response cache key of a page of search results, shared by `MovieViewSet.search` and the async view."""
+    query_params = request.query_params.copy()
+    query_params.pop("term", None)
+    return responsecache.get_search_key(normalize_search_term(term), query_params)
 
 
-class MovieViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Movie.objects.all()
+def get_search_page(request, term, paginator, fast_serializer=None):
+    """A page of the results of searching for `term`, serialized by `fast_serializer` if there is one."""
+    if fast_serializer is not None:
+        rows = paginator.paginate_queryset(
+            fast_serializer.get_rows(get_search_results(term)), request
+        )
+        data = fast_serializer.serialize(rows)
+    else:
+        movies = paginator.paginate_queryset(
+            get_search_results(term).prefetch_related("genres"), request
+        )
+        data = MovieSerializer(movies, many=True, context={"request": request}).data
+    return paginator.get_paginated_response(data).data
+
+
+class MovieViewSet(ExportMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Movie.objects.prefetch_related("genres")
     serializer_class = MovieSerializer
+    fast_serializer_class = FastMovieSerializer
+    pagination_class = KeysetPagination
+
+    @with_query_budget(2)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return MovieDetailSerializer
+        return MovieSerializer
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Full records are cached, keyed on a version that's bumped whenever the movie changes. Partial records aren't,
+        as `get_object` is what fills them in.
+        """
+        try:
+            cache_key = responsecache.get_movie_detail_key(int(kwargs["pk"]))
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+
+        cached = responsecache.get_cached_response(cache_key)
+        if cached is not None:
+            data, etag, last_modified = cached
+            response = self.get_conditional_response(request, etag, last_modified)
+            if response is not None:
+                return response
+            return self.set_validators(Response(data), etag, last_modified)
+
+        instance = self.get_object()
+        etag = self.get_object_etag(instance)
+        last_modified = self.get_last_modified(instance)
+        response = self.get_conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        data = self.get_serializer(instance).data
+        if instance.is_full_record:
+            responsecache.cache_response(cache_key, (data, etag, last_modified))
+        return self.set_validators(Response(data), etag, last_modified)
+
+    def get_object_etag(self, instance):
+        # Not a column, but a failed enrichment job changes it without changing the movie
+        return make_etag(
+            super().get_object_etag(instance),
+            getattr(instance, "enrichment_pending", False),
+        )
 
     def get_object(self):
         movie_obj = super().get_object()
-        return fill_movie_details(movie_obj)
+        if settings.OMDB_BACKGROUND_ENRICHMENT:
+            # Don't keep the user waiting on OMDb, the enrichment worker will fill the details in
+            # Pending only while a job is queued or running, not once it's failed
+            movie_obj.enrichment_pending = (
+                movie_obj.pk in EnrichmentJob.objects.enqueue([movie_obj])
+            )
+            return movie_obj
+
+        try:
+            return fill_movie_details(movie_obj)
+        except RateLimitExceeded as e:
+            # Better to show what we have than nothing
+            logger.warning("Not filling details of '%s': %s", movie_obj.title, e)
+            return movie_obj
 
     @action(methods=["get"], detail=False)
     def search(self, request):
@@ -30,28 +139,124 @@ class MovieViewSet(viewsets.ReadOnlyModelViewSet):
             return Response(status=status.HTTP_400_BAD_REQUEST)
         term = search_serializer.data["term"]
 
-        search_and_save(term)
+        # The key is taken before searching, so if the search changes anything the response is cached under a version
+        # that's already out of date, rather than the results being cached under the new one
+        cache_key = get_search_cache_key(request, term)
+        data = responsecache.get_cached_response(cache_key)
+        if data is not None:
+            return Response(data)
 
-        movies = self.get_queryset().filter(title__icontains=term)
+        is_complete = True
+        try:
+            search_and_save(term, background_refresh=True)
+        except RateLimitExceeded as e:
+            logger.warning("Not searching OMDb for '%s': %s", term, e)
+            is_complete = False
+
+        data = get_search_page(
+            request, term, self.paginator, self.get_fast_serializer()
+        )
+        if is_complete:
+            responsecache.cache_response(cache_key, data)
+        return Response(data)
+
+    @action(methods=["get"], detail=False)
+    def autocomplete(self, request):
+        """Movies with a word in their title starting with `q`, from the in-memory title index. Never calls OMDb."""
+        autocomplete_serializer = MovieAutocompleteSerializer(data=request.GET)
+        if not autocomplete_serializer.is_valid():
+            return Response(status=status.HTTP_400_BAD_REQUEST)
 
         return Response(
-            MovieSerializer(movies, many=True, context={"request": request}).data
+            title_index.search(
+                autocomplete_serializer.validated_data["q"],
+                limit=autocomplete_serializer.validated_data["limit"],
+            )
         )
 
 
-class MovieNightViewSet(viewsets.ModelViewSet):
-    queryset = MovieNight.objects.all()
+class MovieNightViewSet(ExportMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = MovieNight.objects.select_related("movie", "creator").prefetch_related(
+        "movie__genres"
+    )
     serializer_class = MovieNightSerializer
-    filter_backends = [OrderingFilter]
+    fast_serializer_class = FastMovieNightSerializer
+    pagination_class = KeysetPagination
+    filter_backends = [OrderingFilter, MovieNightTimeFilter]
     ordering_fields = ["start_time"]
     permission_classes = [IsAuthenticated]
+    etag_fields = (
+        "id",
+        "updated_at",
+        "movie__updated_at",
+        "creator__email",
+        "creator__first_name",
+        "creator__last_name",
+    )
+    last_modified_fields = ("updated_at", "movie__updated_at")
+
+    @with_query_budget(2)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.request.method in ["POST", "PUT"]:
             return MovieNightWriteSerializer
         return MovieNightSerializer
 
+    @action(methods=["get"], detail=False, url_path="free-slots")
+    @with_query_budget(3)
+    def free_slots(self, request):
+        """
+        The periods in `?start=` to `?end=` when none of the `?users=` (by email) have created a movie night, that are
+        long enough to watch `?movie=`.
+        """
+        search_serializer = FreeSlotSearchSerializer(data=request.query_params)
+        search_serializer.is_valid(raise_exception=True)
+        params = search_serializer.validated_data
+
+        slots = find_free_slots_for_movie(
+            params["users"], params["movie"], params["start"], params["end"]
+        )
+        return Response(
+            FreeSlotSerializer(
+                [{"start": start, "end": end} for start, end in slots], many=True
+            ).data
+        )
+
+    @action(methods=["post"], detail=False)
+    def bulk(self, request):
+        """Create a list of movie nights, all of them or, if any are invalid, none."""
+        serializer = MovieNightWriteSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.API_MAX_BULK_SIZE,
+            context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     def perform_update(self, serializer):
         if self.request.user != serializer.instance.creator:
             raise PermissionDenied()
         serializer.save()
+
+
+class ChangesView(APIView):
+    """
+    With `?since=<token>`, the movies and movie nights created, updated or deleted since the token was given out, and
+    the token to use next time, so clients can keep their copies current without loading every list again. Changes
+    come in pages, while `has_more` is true clients should ask again straight away with the new token. Without `since`
+    there's just a token, which clients should get before loading the lists they'll keep up to date.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @with_query_budget(5)
+    def get(self, request):
+        token = request.query_params.get("since")
+        if token is None:
+            return Response({"next": get_next_token()})
+        return Response(get_changes(token))
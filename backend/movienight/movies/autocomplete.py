@@ -0,0 +1,321 @@
+import bisect
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import Movie
+
+logger = logging.getLogger(__name__)
+
+# Ends each title in the strings of a `TitleSnapshot`, it sorts before anything in a normalized title
+SEPARATOR = "\0"
+
+
+def normalize_title(title):
+    """Lowercase, with anything that isn't a letter or digit collapsed to a single space."""
+    return re.sub(r"[\W_]+", " ", title.casefold()).strip()
+
+
+def get_word_starts(normalized):
+    """Where each word of a normalized title starts."""
+    return [match.start() for match in re.finditer(r"\b\w", normalized)]
+
+
+def get_index_keys(title):
+    """The normalized title from the start of each of its words, so that "matr" finds "The Matrix"."""
+    normalized = normalize_title(title)
+    return [normalized[start:] for start in get_word_starts(normalized)]
+
+
+class TitleSnapshot:
+    """
+    An immutable prefix index of titles, kept compact so that every process can hold one for all the movies. The titles
+    and their normalized forms are each joined into one string, and everything else is in arrays of numbers. The keys
+    are the normalized title from each of its words onwards, but they aren't stored: an entry is where its word starts
+    in the normalized string, and the entries are sorted by the key running from there to the end of the title.
+    """
+
+    def __init__(self, movies):
+        """`movies` are `(pk, title, year)`."""
+        self.pks = array("q")
+        self.years = array("q")
+        titles = []
+        normalized_titles = []
+        entries = []
+        normalized_length = 0
+        for pk, title, year in movies:
+            normalized = normalize_title(title)
+            self.pks.append(pk)
+            self.years.append(year)
+            titles.append(title)
+            normalized_titles.append(normalized)
+            entries.extend(
+                normalized_length + start for start in get_word_starts(normalized)
+            )
+            normalized_length += len(normalized) + len(SEPARATOR)
+
+        self.titles = SEPARATOR.join(titles) + SEPARATOR
+        self.title_starts = array("q", self.get_starts(titles))
+        self.normalized = SEPARATOR.join(normalized_titles) + SEPARATOR
+        self.normalized_starts = array("q", self.get_starts(normalized_titles))
+        entries.sort(key=lambda entry: (self.get_key(entry), self.get_movie(entry)))
+        self.entries = array("q", entries)
+
+    @staticmethod
+    def get_starts(strings):
+        """Where each of `strings` starts once they're joined, and where one after the last would."""
+        return itertools.accumulate(
+            (len(string) + len(SEPARATOR) for string in strings), initial=0
+        )
+
+    def __len__(self):
+        return len(self.pks)
+
+    def get_key(self, entry):
+        return self.normalized[entry : self.normalized.index(SEPARATOR, entry)]
+
+    def get_movie(self, entry):
+        """The index of the movie whose title has `entry`."""
+        return bisect.bisect_right(self.normalized_starts, entry) - 1
+
+    def get_title(self, index):
+        return self.titles[self.title_starts[index] : self.title_starts[index + 1] - 1]
+
+    def movies(self):
+        """The `(pk, title, year)` of each movie."""
+        for index, pk in enumerate(self.pks):
+            yield pk, self.get_title(index), self.years[index]
+
+    def search(self, prefix):
+        """The `(key, pk, title, year)` of each entry with a key starting with `prefix`, in key order."""
+        # A key's first `len(prefix)` characters are in the same order as the keys, even when they run on into the
+        # next title, as the separator sorts first, so they can be binary searched
+        length = len(prefix)
+        low, high = 0, len(self.entries)
+        while low < high:
+            middle = (low + high) // 2
+            entry = self.entries[middle]
+            if self.normalized[entry : entry + length] < prefix:
+                low = middle + 1
+            else:
+                high = middle
+
+        for entry in itertools.islice(self.entries, low, None):
+            if self.normalized[entry : entry + length] != prefix:
+                return
+            index = self.get_movie(entry)
+            title = self.get_title(index)
+            yield self.get_key(entry), self.pks[index], title, self.years[index]
+
+
+class TitleIndex:
+    """
+    An in-memory prefix index of movie titles, for typeahead. Most of it is a `TitleSnapshot`, which can't be changed,
+    so movies saved or deleted since it was made are kept alongside it: deleted and changed movies are hidden from it,
+    and saved movies are in a sorted list of `(key, pk)` pairs, the same as the snapshot's entries. Both are searched
+    and the results merged.
+
+    The snapshot is built from the DB on a background thread the first time the index is used, searches find nothing
+    but the changes until then. After that the index is kept up to date by the signals for saved and deleted movies,
+    and the changes are folded into a new snapshot, without the DB, once there are `MAX_CHANGES` of them. Movies saved
+    by other processes are only picked up by rebuilding from the DB, which is done every
+    `AUTOCOMPLETE_REBUILD_INTERVAL` seconds if it's set.
+
+    Each change is numbered, so that a new snapshot only replaces the changes made before it started being built.
+    """
+
+    MAX_CHANGES = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._change_numbers = itertools.count(1)
+        self.reset()
+
+    def reset(self):
+        """Forget everything, so the index is rebuilt the next time it's used."""
+        with self._lock:
+            self._snapshot = None
+            self._built_at = 0
+            self._building = False
+            # Movies saved since the snapshot, with the number of the change, and their keys
+            self._saved = {}
+            self._saved_entries = []
+            # Movies changed or deleted since the snapshot, with the number of the change, hidden in the snapshot
+            self._hidden = {}
+
+    def _start_build(self):
+        """Claim the next build, returning the number of the last change it will include, or None if one's running."""
+        if self._building:
+            return None
+        self._building = True
+        return next(self._change_numbers)
+
+    def _replace_snapshot(self, snapshot, change_number):
+        """Use `snapshot`, which includes the changes up to `change_number`, dropping them."""
+        with self._lock:
+            self._snapshot = snapshot
+            for pk, (number, title, year) in list(self._saved.items()):
+                if number <= change_number:
+                    self._remove_saved(pk)
+            self._hidden = {
+                pk: number
+                for pk, number in self._hidden.items()
+                if number > change_number
+            }
+
+    def build(self, change_number=None):
+        """Build a new snapshot from the DB."""
+        if change_number is None:
+            with self._lock:
+                change_number = next(self._change_numbers)
+        try:
+            snapshot = TitleSnapshot(
+                Movie.objects.order_by().values_list("pk", "title", "year").iterator()
+            )
+            self._replace_snapshot(snapshot, change_number)
+            self._built_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._building = False
+        logger.info("Built title index of %d movies", len(snapshot))
+
+    def compact(self, change_number):
+        """Fold the changes up to `change_number` into a new snapshot."""
+        try:
+            with self._lock:
+                old_snapshot = self._snapshot
+                saved = {
+                    pk: (title, year)
+                    for pk, (number, title, year) in self._saved.items()
+                    if number <= change_number
+                }
+                hidden = {
+                    pk for pk, number in self._hidden.items() if number <= change_number
+                }
+            movies = itertools.chain(
+                (
+                    movie
+                    for movie in old_snapshot.movies()
+                    if movie[0] not in hidden and movie[0] not in saved
+                ),
+                ((pk, title, year) for pk, (title, year) in saved.items()),
+            )
+            self._replace_snapshot(TitleSnapshot(movies), change_number)
+        finally:
+            with self._lock:
+                self._building = False
+
+    def run_in_background(self, method, change_number):
+        try:
+            method(change_number)
+        except Exception:
+            logger.exception("Failed to rebuild title index")
+        finally:
+            # The thread outlives the request, so its DB connection has to be closed here
+            connections.close_all()
+
+    def ensure_built(self):
+        """
+        Start building the index in the background if it never has been, or it's due to be rebuilt, or it has too many
+        changes. Only one build runs at a time, and the old index is used until it's done.
+        """
+        with self._lock:
+            if self._snapshot is None:
+                method = self.build
+            elif (
+                settings.AUTOCOMPLETE_REBUILD_INTERVAL
+                and time.monotonic() - self._built_at
+                >= settings.AUTOCOMPLETE_REBUILD_INTERVAL
+            ):
+                method = self.build
+            elif len(self._saved) + len(self._hidden) > self.MAX_CHANGES:
+                method = self.compact
+            else:
+                return
+            change_number = self._start_build()
+        if change_number is not None:
+            rebuild_executor.submit(self.run_in_background, method, change_number)
+
+    def _remove_saved(self, pk):
+        number, title, year = self._saved.pop(pk)
+        for key in get_index_keys(title):
+            index = bisect.bisect_left(self._saved_entries, (key, pk))
+            del self._saved_entries[index]
+
+    def update(self, movies):
+        """Add `movies` to the index, replacing them if they're already in it."""
+        with self._lock:
+            for movie in movies:
+                number = next(self._change_numbers)
+                if movie.pk in self._saved:
+                    self._remove_saved(movie.pk)
+                self._hidden[movie.pk] = number
+                self._saved[movie.pk] = (number, movie.title, movie.year)
+                for key in get_index_keys(movie.title):
+                    bisect.insort(self._saved_entries, (key, movie.pk))
+
+    def remove(self, pks):
+        """Remove the movies with `pks` from the index."""
+        with self._lock:
+            for pk in pks:
+                number = next(self._change_numbers)
+                if pk in self._saved:
+                    self._remove_saved(pk)
+                self._hidden[pk] = number
+
+    def update_on_commit(self, movies):
+        """Update the index with `movies` once the current transaction commits, so rolled back changes never show."""
+        movies = list(movies)
+        transaction.on_commit(lambda: self.update(movies))
+
+    def remove_on_commit(self, pks):
+        """Remove the movies with `pks` from the index once the current transaction commits."""
+        pks = list(pks)
+        transaction.on_commit(lambda: self.remove(pks))
+
+    def _search_saved(self, prefix):
+        index = bisect.bisect_left(self._saved_entries, (prefix,))
+        for key, pk in itertools.islice(self._saved_entries, index, None):
+            if not key.startswith(prefix):
+                return
+            number, title, year = self._saved[pk]
+            yield key, pk, title, year
+
+    def search(self, prefix, limit=10):
+        """Up to `limit` movies with a word in their title starting with `prefix`, as dicts of id, title and year."""
+        self.ensure_built()
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        with self._lock:
+            snapshot_matches = (
+                match
+                for match in (self._snapshot.search(prefix) if self._snapshot else ())
+                if match[1] not in self._hidden
+            )
+            for key, pk, title, year in heapq.merge(
+                snapshot_matches, self._search_saved(prefix)
+            ):
+                if len(results) == limit:
+                    break
+                if pk not in seen:
+                    seen.add(pk)
+                    results.append({"id": pk, "title": title, "year": year})
+        return results
+
+
+# Title indexes are built on this thread, one at a time, so requests don't wait for them
+rebuild_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="title-index")
+
+title_index = TitleIndex()
@@ -0,0 +1,123 @@
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import connections
+from django.db.models import F
+from django.utils.timezone import now
+
+from .models import EnrichmentJob, Movie
+from .omdb_integration import fill_movies_details
+from movienight.omdb.django_client import get_rate_limiter_from_settings
+from movienight.omdb.ratelimit import BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# A job claimed longer ago than this is assumed to belong to a worker that died, and is claimed again
+STALE_AFTER = timedelta(minutes=10)
+
+
+def run_enrichment_jobs(jobs, max_concurrency=None):
+    """
+    Fill the details of the movies of the claimed `jobs` in one go. Jobs whose movie is now a full record are deleted,
+    the rest go back in the queue to be retried after a backoff, or are marked as failed once they've used up their
+    attempts. If the daily OMDb budget ran out, the rest wait until it's reset instead, and the attempt isn't counted.
+    Returns the number of jobs done.
+    """
+    movie_pks = [job.movie_id for job in jobs]
+    try:
+        fill_movies_details(
+            Movie.objects.filter(pk__in=movie_pks), max_concurrency=max_concurrency
+        )
+    except Exception:
+        logger.exception("Failed to fill the details of %d movies", len(movie_pks))
+
+    done_movie_pks = set(
+        Movie.objects.filter(pk__in=movie_pks, is_full_record=True).values_list(
+            "pk", flat=True
+        )
+    )
+    done_jobs = [job for job in jobs if job.movie_id in done_movie_pks]
+    failed_jobs = [job for job in jobs if job.movie_id not in done_movie_pks]
+
+    EnrichmentJob.objects.filter(pk__in=[job.pk for job in done_jobs]).delete()
+    if not failed_jobs:
+        return len(done_jobs)
+
+    rate_limiter = get_rate_limiter_from_settings()
+    if rate_limiter is not None and rate_limiter.remaining(BACKGROUND) == 0:
+        logger.warning(
+            "OMDb budget used up, %d movies will be filled once it's reset",
+            len(failed_jobs),
+        )
+        EnrichmentJob.objects.filter(pk__in=[job.pk for job in failed_jobs]).update(
+            status=EnrichmentJob.Status.PENDING,
+            attempts=F("attempts") - 1,
+            next_attempt_at=rate_limiter.get_reset_time(),
+        )
+        return len(done_jobs)
+
+    logger.warning("Failed to fill the details of %d movies", len(failed_jobs))
+    job_pks_by_attempts = defaultdict(list)
+    for job in failed_jobs:
+        job_pks_by_attempts[job.attempts].append(job.pk)
+    for attempts, job_pks in job_pks_by_attempts.items():
+        if attempts >= EnrichmentJob.MAX_ATTEMPTS:
+            EnrichmentJob.objects.filter(pk__in=job_pks).update(
+                status=EnrichmentJob.Status.FAILED
+            )
+        else:
+            EnrichmentJob.objects.filter(pk__in=job_pks).update(
+                status=EnrichmentJob.Status.PENDING,
+                next_attempt_at=now()
+                + EnrichmentJob.RETRY_BACKOFF * 2 ** (attempts - 1),
+            )
+    return len(done_jobs)
+
+
+def log_rate_limiter_stats():
+    """Log today's use of the OMDb budget, and how long this process has waited on the rate limiter, if there's one."""
+    rate_limiter = get_rate_limiter_from_settings()
+    if rate_limiter is None:
+        return
+    usage = rate_limiter.usage()
+    logger.info(
+        "Used %d of %d OMDb requests today, rate limiter stats of this process: %s",
+        usage["used"],
+        usage["daily_limit"],
+        rate_limiter.stats.as_dict(),
+    )
+
+
+def run_worker(batch_size=10, max_concurrency=None, poll_interval=5, once=False):
+    """
+    Claim and run batches of enrichment jobs until stopped. If `once` is true, stop when the queue is empty instead of
+    polling it every `poll_interval` seconds. Returns the number of jobs done.
+    """
+    done = 0
+    while True:
+        jobs = EnrichmentJob.objects.claim(batch_size, stale_after=STALE_AFTER)
+        if jobs:
+            done += run_enrichment_jobs(jobs, max_concurrency=max_concurrency)
+            log_rate_limiter_stats()
+        elif once:
+            return done
+        else:
+            time.sleep(poll_interval)
+
+
+def run_workers(workers, **kwargs):
+    """Run `workers` copies of `run_worker` in a thread pool, returning the total number of jobs done."""
+
+    def run():
+        try:
+            return run_worker(**kwargs)
+        finally:
+            # Each thread has its own DB connections, which would otherwise be left open
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run) for _ in range(workers)]
+        return sum(future.result() for future in futures)
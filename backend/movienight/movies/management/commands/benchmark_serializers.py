@@ -0,0 +1,125 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from movienight.accounts.models import User
+from movienight.movies.api.fastserializers import (
+    FastMovieNightSerializer,
+    FastMovieSerializer,
+)
+from movienight.movies.api.serializers import MovieNightSerializer, MovieSerializer
+from movienight.movies.models import Genre, Movie, MovieNight
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare serializing movies and movie nights with the API's serializers and the fast serializers, on rows "
+        "created in a transaction that's rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=10000, help="Number of rows of each model"
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of times each is timed, the best time is reported",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.create_rows(options["rows"])
+                self.compare(
+                    "Movies",
+                    Movie.objects.prefetch_related("genres").order_by("id"),
+                    MovieSerializer,
+                    FastMovieSerializer,
+                    options["repeat"],
+                )
+                self.compare(
+                    "Movie nights",
+                    MovieNight.objects.select_related("movie", "creator")
+                    .prefetch_related("movie__genres")
+                    .order_by("id"),
+                    MovieNightSerializer,
+                    FastMovieNightSerializer,
+                    options["repeat"],
+                )
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def create_rows(self, count):
+        genres = Genre.objects.bulk_create(
+            [Genre(name=f"Benchmark genre {i}") for i in range(10)]
+        )
+        movies = Movie.objects.bulk_create(
+            [
+                Movie(
+                    title=f"Benchmark movie {i}",
+                    year=1990 + i % 30,
+                    runtime_minutes=90 + i % 60,
+                    imdb_id=f"benchmark{i}",
+                    plot="A plot." * 20,
+                    is_full_record=True,
+                )
+                for i in range(count)
+            ]
+        )
+        Movie.genres.through.objects.bulk_create(
+            [
+                Movie.genres.through(movie=movie, genre=genres[(i + offset) % 10])
+                for i, movie in enumerate(movies)
+                for offset in range(3)
+            ]
+        )
+        creator = User.objects.create_user(
+            email="benchmark@example.com", first_name="Bench", last_name="Mark"
+        )
+        start_time = timezone.now()
+        MovieNight.objects.bulk_create(
+            [
+                MovieNight(
+                    movie=movie,
+                    creator=creator,
+                    start_time=start_time + timezone.timedelta(hours=i),
+                )
+                for i, movie in enumerate(movies)
+            ]
+        )
+
+    def time(self, serialize, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = serialize()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, data
+
+    def compare(self, name, queryset, serializer_class, fast_serializer_class, repeat):
+        serializer_time, data = self.time(
+            lambda: serializer_class(queryset.all(), many=True).data, repeat
+        )
+
+        def serialize_fast():
+            fast_serializer = fast_serializer_class()
+            return fast_serializer.serialize(fast_serializer.get_rows(queryset.all()))
+
+        fast_time, fast_data = self.time(serialize_fast, repeat)
+
+        if fast_data != data:
+            self.stderr.write(f"{name}: the fast serializer's output is different")
+        self.stdout.write(
+            f"{name}: {len(data)} rows, serializer {serializer_time:.3f}s, "
+            f"fast serializer {fast_time:.3f}s, {serializer_time / fast_time:.1f}x faster"
+        )
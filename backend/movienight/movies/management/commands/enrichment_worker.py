@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from movienight.movies.enrichment import run_worker, run_workers
+
+
+class Command(BaseCommand):
+    help = "Run queued jobs that fetch full details from OMDb for partial records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker threads, each claiming its own batches of jobs",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10,
+            help="Number of jobs claimed and run together",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Number of concurrent requests to OMDb per batch, defaults to OMDB_DETAIL_WORKERS",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Seconds to wait before checking an empty queue again",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty, rather than waiting for more jobs",
+        )
+
+    def handle(self, *args, **options):
+        worker_options = {
+            "batch_size": options["batch_size"],
+            "max_concurrency": options["concurrency"],
+            "poll_interval": options["poll_interval"],
+            "once": options["once"],
+        }
+        if options["workers"] > 1:
+            done = run_workers(options["workers"], **worker_options)
+        else:
+            done = run_worker(**worker_options)
+
+        self.stdout.write(f"Filled details of {done} movies")
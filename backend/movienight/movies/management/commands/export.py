@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from movienight.movies.api.export import EXPORT_FORMATS, iter_export
+from movienight.movies.api.fastserializers import (
+    FastMovieNightSerializer,
+    FastMovieSerializer,
+)
+from movienight.movies.models import Movie, MovieNight
+
+EXPORTS = {
+    "movies": (Movie, FastMovieSerializer),
+    "movie-nights": (MovieNight, FastMovieNightSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = "Export all movies or movie nights, in the API's format, as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("export", choices=EXPORTS)
+        parser.add_argument(
+            "--as", dest="export_format", choices=EXPORT_FORMATS, default="ndjson"
+        )
+        parser.add_argument(
+            "--output", help="File to write the export to, defaults to stdout"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Number of rows read at a time, defaults to EXPORT_CHUNK_SIZE",
+        )
+
+    def handle(self, *args, **options):
+        model, fast_serializer_class = EXPORTS[options["export"]]
+        lines = iter_export(
+            model.objects.order_by("pk"),
+            fast_serializer_class,
+            options["export_format"],
+            chunk_size=options["chunk_size"],
+        )
+
+        if options["output"] is None:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        with open(options["output"], "w", newline="") as output:
+            output.writelines(lines)
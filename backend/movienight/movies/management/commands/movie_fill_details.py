@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from movienight.movies.models import Movie
+from movienight.movies.omdb_integration import fill_movies_details
+
+
+class Command(BaseCommand):
+    help = "Fetch full details from OMDb for movies that are only partial records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of movies fetched and saved together",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Number of concurrent requests to OMDb, defaults to OMDB_DETAIL_WORKERS",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk = 0
+        filled = 0
+
+        while True:
+            pks = list(
+                Movie.objects.filter(is_full_record=False, pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+            filled += len(
+                fill_movies_details(
+                    Movie.objects.filter(pk__in=pks),
+                    max_concurrency=options["concurrency"],
+                )
+            )
+
+        self.stdout.write(f"Filled details of {filled} movies")
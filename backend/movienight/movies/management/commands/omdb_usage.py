@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from movienight.omdb.django_client import get_rate_limiter_from_settings
+from movienight.omdb.ratelimit import BACKGROUND, INTERACTIVE
+
+
+class Command(BaseCommand):
+    help = (
+        "Show how much of today's OMDb budget, shared by every process, has been used"
+    )
+
+    def handle(self, *args, **options):
+        rate_limiter = get_rate_limiter_from_settings()
+        if rate_limiter is None:
+            self.stdout.write(
+                "OMDb requests aren't rate limited, OMDB_RATE_LIMIT_PATH isn't set"
+            )
+            return
+
+        usage = rate_limiter.usage()
+        self.stdout.write(
+            f"Used {usage['used']} of {usage['daily_limit']} OMDb requests today, "
+            f"{rate_limiter.remaining(INTERACTIVE)} left for interactive requests and "
+            f"{rate_limiter.remaining(BACKGROUND)} for background ones, "
+            f"until {rate_limiter.get_reset_time().isoformat()}"
+        )
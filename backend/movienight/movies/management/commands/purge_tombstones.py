@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from movienight.movies.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = "Delete records of deletions older than CHANGES_RETENTION_DAYS, which no client can sync any more"
+
+    def handle(self, *args, **options):
+        deleted, _ = Tombstone.objects.purge(
+            now() - timedelta(days=settings.CHANGES_RETENTION_DAYS)
+        )
+        self.stdout.write(f"Purged {deleted} tombstones")
@@ -4,37 +4,54 @@ from django.db import migrations, models
 
 
 class Migration(migrations.Migration):
-
     initial = True
 
-    dependencies = [
-    ]
+    dependencies = []
 
     operations = [
         migrations.CreateModel(
-            name='Genre',
+            name="Genre",
             fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('name', models.TextField(unique=True)),
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.TextField(unique=True)),
             ],
             options={
-                'ordering': ['name'],
+                "ordering": ["name"],
             },
         ),
         migrations.CreateModel(
-            name='Movie',
+            name="Movie",
             fields=[
-                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
-                ('title', models.TextField()),
-                ('year', models.PositiveIntegerField()),
-                ('runtime_minutes', models.PositiveIntegerField(null=True)),
-                ('imdb_id', models.SlugField(unique=True)),
-                ('plot', models.TextField(blank=True, null=True)),
-                ('is_full_record', models.BooleanField(default=False)),
-                ('genres', models.ManyToManyField(related_name='movies', to='movies.genre')),
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("title", models.TextField()),
+                ("year", models.PositiveIntegerField()),
+                ("runtime_minutes", models.PositiveIntegerField(null=True)),
+                ("imdb_id", models.SlugField(unique=True)),
+                ("plot", models.TextField(blank=True, null=True)),
+                ("is_full_record", models.BooleanField(default=False)),
+                (
+                    "genres",
+                    models.ManyToManyField(related_name="movies", to="movies.genre"),
+                ),
             ],
             options={
-                'ordering': ['title', 'year'],
+                "ordering": ["title", "year"],
             },
         ),
     ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-18 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0004_enrichmentjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="searchterm",
+            name="fresh_for",
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="searchterm",
+            name="stale_for",
+            field=models.DurationField(blank=True, null=True),
+        ),
+    ]
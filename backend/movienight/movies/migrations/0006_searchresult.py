@@ -0,0 +1,75 @@
+# Generated by Django 4.2 on 2026-10-18 02:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def delete_search_terms(apps, schema_editor):
+    """Searches made before results were stored have none, so forget them and they'll be made again."""
+    SearchTerm = apps.get_model("movies", "SearchTerm")
+    SearchTerm.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0005_searchterm_freshness"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveIntegerField()),
+                (
+                    "movie",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_results",
+                        to="movies.movie",
+                    ),
+                ),
+                (
+                    "search_term",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results",
+                        to="movies.searchterm",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["search_term", "rank"],
+            },
+        ),
+        migrations.AddField(
+            model_name="searchterm",
+            name="movies",
+            field=models.ManyToManyField(
+                related_name="search_terms",
+                through="movies.SearchResult",
+                to="movies.movie",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="searchresult",
+            constraint=models.UniqueConstraint(
+                fields=("search_term", "movie"), name="unique_search_result_movie"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="searchresult",
+            constraint=models.UniqueConstraint(
+                fields=("search_term", "rank"), name="unique_search_result_rank"
+            ),
+        ),
+        migrations.RunPython(delete_search_terms, migrations.RunPython.noop),
+    ]
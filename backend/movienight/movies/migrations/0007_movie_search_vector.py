@@ -0,0 +1,107 @@
+# Generated by Django 4.2 on 2026-10-18 02:52
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# The search vector of a row, with `{row}` being where its columns are, e.g. "NEW." in a trigger
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce({row}title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({row}plot, '')), 'B')"
+)
+# Number of movies whose search vector is set in each transaction of the backfill
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_search_vectors(schema_editor):
+    """
+    Set the search vector of the existing movies, in batches by pk. The migration isn't atomic, so each batch is its own
+    transaction, and only locks the rows in it.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT min(id), max(id) FROM movies_movie")
+        min_pk, max_pk = cursor.fetchone()
+    if min_pk is None:
+        return
+
+    for start in range(min_pk, max_pk + 1, BACKFILL_BATCH_SIZE):
+        schema_editor.execute(
+            f"UPDATE movies_movie SET search_vector = {SEARCH_VECTOR_SQL.format(row='')} "
+            "WHERE id >= %s AND id < %s AND search_vector IS NULL",
+            [start, start + BACKFILL_BATCH_SIZE],
+        )
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    Keep `search_vector` up to date with a trigger, so it's also set by bulk_create/bulk_update and raw SQL, then index
+    it and the title's trigrams. The indexes are created concurrently so the table isn't locked while they're built.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION movies_movie_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR_SQL.format(row="NEW.")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    schema_editor.execute(
+        "DROP TRIGGER IF EXISTS movies_movie_search_vector_trigger ON movies_movie"
+    )
+    schema_editor.execute(
+        "CREATE TRIGGER movies_movie_search_vector_trigger "
+        "BEFORE INSERT OR UPDATE OF title, plot ON movies_movie "
+        "FOR EACH ROW EXECUTE FUNCTION movies_movie_search_vector_update()"
+    )
+    # Only after the trigger is created, so movies saved during the backfill aren't missed
+    backfill_search_vectors(schema_editor)
+    schema_editor.execute(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS movies_movie_search_vector_idx "
+        "ON movies_movie USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS movies_movie_title_trgm_idx "
+        "ON movies_movie USING gin (title gin_trgm_ops)"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    schema_editor.execute(
+        "DROP INDEX CONCURRENTLY IF EXISTS movies_movie_title_trgm_idx"
+    )
+    schema_editor.execute(
+        "DROP INDEX CONCURRENTLY IF EXISTS movies_movie_search_vector_idx"
+    )
+    schema_editor.execute(
+        "DROP TRIGGER IF EXISTS movies_movie_search_vector_trigger ON movies_movie"
+    )
+    schema_editor.execute("DROP FUNCTION IF EXISTS movies_movie_search_vector_update()")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't be run in a transaction
+    atomic = False
+
+    dependencies = [
+        ("movies", "0006_searchresult"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="movie",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
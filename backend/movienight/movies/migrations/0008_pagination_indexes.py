@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0007_movie_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="movie",
+            index=models.Index(
+                fields=["title", "year", "id"], name="movies_movi_title_b79d06_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movienight",
+            index=models.Index(
+                fields=["creator", "start_time", "id"],
+                name="movies_movi_creator_17da7b_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movienight",
+            index=models.Index(
+                fields=["start_time", "id"], name="movies_movi_start_t_2002ab_idx"
+            ),
+        ),
+    ]
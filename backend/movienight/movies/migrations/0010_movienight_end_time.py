@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-18 03:14
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def fill_end_times(apps, schema_editor):
+    MovieNight = apps.get_model("movies", "MovieNight")
+    runtimes = (
+        MovieNight.objects.filter(movie__runtime_minutes__gt=0)
+        .order_by()
+        .values_list("movie__runtime_minutes", flat=True)
+        .distinct()
+    )
+    for runtime_minutes in runtimes:
+        MovieNight.objects.filter(movie__runtime_minutes=runtime_minutes).update(
+            end_time=models.F("start_time") + timedelta(minutes=runtime_minutes)
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0009_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movienight",
+            name="end_time",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_end_times, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="movienight",
+            index=models.Index(
+                fields=["end_time", "start_time"], name="movies_movi_end_tim_f42ba0_idx"
+            ),
+        ),
+    ]
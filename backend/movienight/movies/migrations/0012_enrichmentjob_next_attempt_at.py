@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 03:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("movies", "0011_tombstone"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="enrichmentjob",
+            name="next_attempt_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="enrichmentjob",
+            index=models.Index(
+                fields=["status", "next_attempt_at"],
+                name="movies_enri_status_33ab60_idx",
+            ),
+        ),
+    ]
@@ -1,5 +1,10 @@
+import threading
+from collections import defaultdict
 from datetime import timedelta
-from django.db import models
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.utils.timezone import now
 from django.contrib.auth import get_user_model
 
 
@@ -7,19 +12,113 @@ UserModel = get_user_model()
 
 
 class SearchTerm(models.Model):
+    """
+    A search that has been made against OMDb. Its results are fresh for `fresh_for` after `last_search`, then stale for
+    another `stale_for`, when they're still served but refreshed in the background, then expired. Either can be left
+    empty to use the `OMDB_SEARCH_FRESH_FOR`/`OMDB_SEARCH_STALE_FOR` settings.
+    """
+
+    FRESH = "fresh"
+    STALE = "stale"
+    EXPIRED = "expired"
+
     class Meta:
         ordering = ["id"]
 
     term = models.TextField(unique=True)
     last_search = models.DateTimeField(auto_now=True)
+    movies = models.ManyToManyField(
+        "Movie", through="SearchResult", related_name="search_terms"
+    )
+    fresh_for = models.DurationField(null=True, blank=True)
+    stale_for = models.DurationField(null=True, blank=True)
 
     def __str__(self):
         return self.term
 
+    def get_freshness(self, at):
+        """Whether the results of this search are `FRESH`, `STALE` or `EXPIRED` at the time `at`."""
+        fresh_for = self.fresh_for
+        if fresh_for is None:
+            fresh_for = timedelta(seconds=settings.OMDB_SEARCH_FRESH_FOR)
+        stale_for = self.stale_for
+        if stale_for is None:
+            stale_for = timedelta(seconds=settings.OMDB_SEARCH_STALE_FOR)
+
+        age = at - self.last_search
+        if age < fresh_for:
+            return self.FRESH
+        if age < fresh_for + stale_for:
+            return self.STALE
+        return self.EXPIRED
+
+
+class GenreManager(models.Manager):
+    """
+    There are only a few dozen genres and they are rarely added to, so this keeps a process-local cache of the ID of
+    each genre name. It is only filled once a transaction commits, so it never holds a genre that was rolled back, and
+    it's cleared whenever a genre is changed or deleted.
+    """
+
+    _ids_by_name = {}
+    _ids_lock = threading.Lock()
+
+    def clear_cache(self):
+        with self._ids_lock:
+            self._ids_by_name.clear()
+
+    def _update_cache(self, ids_by_name):
+        with self._ids_lock:
+            self._ids_by_name.update(ids_by_name)
+
+    def get_or_create_many(self, names):
+        """
+        Get the genres called `names`, creating any that don't exist, as a dict of name to `Genre` in the order of
+        `names`. Takes at most three queries, however many names there are, and none if they're all cached.
+        """
+        names = list(dict.fromkeys(names))
+
+        with self._ids_lock:
+            ids_by_name = {
+                name: self._ids_by_name[name]
+                for name in names
+                if name in self._ids_by_name
+            }
+
+        missing_names = [name for name in names if name not in ids_by_name]
+        if missing_names:
+            found_ids_by_name = dict(
+                self.filter(name__in=missing_names).values_list("name", "id")
+            )
+            new_names = [
+                name for name in missing_names if name not in found_ids_by_name
+            ]
+            if new_names:
+                # Another process may create the same genre at the same time, so the conflicts are ignored and the
+                # IDs fetched afterwards
+                self.bulk_create(
+                    [self.model(name=name) for name in new_names],
+                    ignore_conflicts=True,
+                )
+                found_ids_by_name.update(
+                    self.filter(name__in=new_names).values_list("name", "id")
+                )
+            transaction.on_commit(
+                lambda: self._update_cache(found_ids_by_name), using=self.db
+            )
+            ids_by_name.update(found_ids_by_name)
+
+        return {
+            name: self.model.from_db(self.db, ["id", "name"], [ids_by_name[name], name])
+            for name in names
+        }
+
 
 class Genre(models.Model):
     name = models.TextField(unique=True)
 
+    objects = GenreManager()
+
     class Meta:
         ordering = ["name"]
 
@@ -35,29 +134,251 @@ class Movie(models.Model):
     genres = models.ManyToManyField(Genre, related_name="movies")
     plot = models.TextField(null=True, blank=True)
     is_full_record = models.BooleanField(default=False)
+    # Kept up to date from title and plot by a trigger on PostgreSQL, which also has GIN indexes on it and on the
+    # title's trigrams. They're created by migration 0007 as they aren't supported on other databases.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # auto_now isn't applied by QuerySet.update or bulk_update, code using them has to set it
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["title", "year"]
+        # Supports paging through the default ordering, see api.pagination
+        indexes = [models.Index(fields=["title", "year", "id"])]
 
     def __str__(self):
         return f"{self.title} ({self.year})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Kept so that saving the movie only recalculates its nights' end times if the runtime has changed, see signals
+        instance._loaded_runtime_minutes = dict(zip(field_names, values)).get(
+            "runtime_minutes", models.DEFERRED
+        )
+        return instance
+
+    def has_runtime_changed(self):
+        """Whether `runtime_minutes` has changed since the movie was loaded, or might have, if it wasn't loaded."""
+        if "runtime_minutes" in self.get_deferred_fields():
+            return False
+        loaded = getattr(self, "_loaded_runtime_minutes", models.DEFERRED)
+        return loaded is models.DEFERRED or loaded != self.runtime_minutes
+
+
+class SearchResult(models.Model):
+    """A movie returned by OMDb for a search, `rank` is its position in OMDb's results starting from 1."""
+
+    search_term = models.ForeignKey(
+        SearchTerm, on_delete=models.CASCADE, related_name="results"
+    )
+    movie = models.ForeignKey(
+        Movie, on_delete=models.CASCADE, related_name="search_results"
+    )
+    rank = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ["search_term", "rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["search_term", "movie"], name="unique_search_result_movie"
+            ),
+            models.UniqueConstraint(
+                fields=["search_term", "rank"], name="unique_search_result_rank"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.search_term} #{self.rank}: {self.movie}"
+
+
+class EnrichmentJobManager(models.Manager):
+    def enqueue(self, movies):
+        """
+        Queue fetching the full details of each partial record in `movies`, unless it is already queued. Jobs that
+        failed more than `EnrichmentJob.RETRY_FAILED_AFTER` ago are queued again. Returns the pks of the movies whose
+        jobs are now pending or running.
+        """
+        partial_movies = [movie for movie in movies if not movie.is_full_record]
+        if not partial_movies:
+            return set()
+
+        self.bulk_create(
+            [self.model(movie=movie) for movie in partial_movies],
+            ignore_conflicts=True,
+        )
+        self.filter(
+            movie__in=partial_movies,
+            status=EnrichmentJob.Status.FAILED,
+            claimed_at__lt=now() - EnrichmentJob.RETRY_FAILED_AFTER,
+        ).update(status=EnrichmentJob.Status.PENDING, attempts=0, next_attempt_at=now())
+        return set(
+            self.filter(
+                movie__in=partial_movies,
+                status__in=[EnrichmentJob.Status.PENDING, EnrichmentJob.Status.RUNNING],
+            ).values_list("movie_id", flat=True)
+        )
+
+    def claim(self, batch_size, stale_after):
+        """
+        Claim up to `batch_size` pending jobs that are due for this worker, oldest first. Jobs claimed by another worker more than
+        `stale_after` ago are assumed to belong to a worker that died, and are claimed again. On PostgreSQL rows locked
+        by a concurrent claim are skipped, so workers never wait on each other.
+        """
+        claimed_at = now()
+        with transaction.atomic(using=self.db):
+            jobs = list(
+                self.select_for_update(skip_locked=True)
+                .filter(
+                    models.Q(
+                        status=EnrichmentJob.Status.PENDING,
+                        next_attempt_at__lte=claimed_at,
+                    )
+                    | models.Q(
+                        status=EnrichmentJob.Status.RUNNING,
+                        claimed_at__lt=claimed_at - stale_after,
+                    )
+                )
+                .order_by("created_at", "pk")[:batch_size]
+            )
+            self.filter(pk__in=[job.pk for job in jobs]).update(
+                status=EnrichmentJob.Status.RUNNING,
+                attempts=models.F("attempts") + 1,
+                claimed_at=claimed_at,
+            )
+        for job in jobs:
+            job.status = EnrichmentJob.Status.RUNNING
+            job.attempts += 1
+            job.claimed_at = claimed_at
+        return jobs
+
+
+class EnrichmentJob(models.Model):
+    """A queued fetch of a partial record's full details from OMDb, the job is deleted once it's done."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        FAILED = "failed"
+
+    # Jobs that haven't succeeded after this many attempts are left as failed
+    MAX_ATTEMPTS = 3
+    # Failed attempts are retried after this, doubled for each attempt made
+    RETRY_BACKOFF = timedelta(minutes=1)
+    # Failed jobs are queued again when their movie is asked for this long after they last ran
+    RETRY_FAILED_AFTER = timedelta(days=1)
+
+    movie = models.OneToOneField(
+        Movie, on_delete=models.CASCADE, related_name="enrichment_job"
+    )
+    status = models.TextField(choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Pending jobs aren't claimed before this, so failures are retried with a backoff
+    next_attempt_at = models.DateTimeField(default=now)
+
+    objects = EnrichmentJobManager()
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.movie} ({self.status})"
+
+
+def get_end_time(start_time, runtime_minutes):
+    """When a movie night starting at `start_time` ends, `start_time` can be an `F` expression."""
+    return start_time + timedelta(minutes=runtime_minutes) if runtime_minutes else None
+
+
+# How long nights of movies without a runtime, which have no `end_time`, are taken to last
+UNKNOWN_RUNTIME = timedelta(hours=2)
+
+
+def ends_after(time):
+    """Nights that end after `time`, taking the nights without an `end_time` to last `UNKNOWN_RUNTIME`."""
+    return models.Q(end_time__gt=time) | models.Q(
+        end_time__isnull=True, start_time__gt=time - UNKNOWN_RUNTIME
+    )
+
+
+class MovieNightManager(models.Manager):
+    def update_end_times(self, movies):
+        """
+        Recalculate the `end_time` of every night of `movies`, after their runtimes have changed. Nights of movies with
+        the same runtime are updated together, so this is a query per runtime rather than per movie.
+        """
+        movie_pks_by_runtime = defaultdict(list)
+        for movie in movies:
+            movie_pks_by_runtime[movie.runtime_minutes].append(movie.pk)
+
+        updated_at = now()
+        for runtime_minutes, movie_pks in movie_pks_by_runtime.items():
+            self.filter(movie__in=movie_pks).update(
+                end_time=get_end_time(models.F("start_time"), runtime_minutes),
+                updated_at=updated_at,
+            )
+
 
 class MovieNight(models.Model):
     movie = models.ForeignKey(Movie, on_delete=models.PROTECT)
     start_time = models.DateTimeField()
+    # The start time plus the movie's runtime, kept here so nights can be filtered on it. It's set when the night is
+    # saved and when its movie's runtime changes, see `MovieNightManager.update_end_times`.
+    end_time = models.DateTimeField(null=True, blank=True, editable=False)
     creator = models.ForeignKey(UserModel, on_delete=models.PROTECT)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = MovieNightManager()
 
     class Meta:
         ordering = ["creator", "start_time"]
+        indexes = [
+            models.Index(fields=["creator", "start_time", "id"]),
+            models.Index(fields=["start_time", "id"]),
+            # For nights overlapping a period, or that haven't ended yet
+            models.Index(fields=["end_time", "start_time"]),
+        ]
 
-    @property
-    def end_time(self):
-        return (
-            self.start_time + timedelta(minutes=self.movie.runtime_minutes)
-            if self.movie.runtime_minutes
-            else None
-        )
+    def update_end_time(self):
+        self.end_time = get_end_time(self.start_time, self.movie.runtime_minutes)
+
+    def save(self, *args, **kwargs):
+        self.update_end_time()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"start_time", "movie"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "end_time"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.movie.title} ({self.movie.year}) - {self.creator.email}"
+
+
+class TombstoneManager(models.Manager):
+    def purge(self, before):
+        """Forget deletions made before `before`, which clients syncing from before then can't get any more."""
+        return self.filter(deleted_at__lt=before).delete()
+
+
+class Tombstone(models.Model):
+    """A record that an object was deleted, so clients syncing changes find out it's gone (see `movies.changes`)."""
+
+    class ModelName(models.TextChoices):
+        MOVIE = "movie"
+        MOVIE_NIGHT = "movienight"
+
+    model = models.TextField(choices=ModelName.choices)
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = TombstoneManager()
+
+    class Meta:
+        ordering = ["deleted_at"]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
@@ -1,25 +1,87 @@
 import logging
 import re
-from datetime import timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
 from django.utils.timezone import now
 
-from .models import Genre, SearchTerm, Movie
-from movienight.omdb.django_client import get_client_from_settings
+from . import responsecache
+from .autocomplete import title_index
+from .models import EnrichmentJob, Genre, SearchResult, SearchTerm, Movie, MovieNight
+from .search import search_movies
+from .singleflight import (
+    AsyncSingleFlight,
+    SingleFlight,
+    aadvisory_lock,
+    advisory_lock,
+)
+from movienight.omdb.django_client import (
+    get_async_client_from_settings,
+    get_client_from_settings,
+)
+from movienight.omdb.ratelimit import BACKGROUND, INTERACTIVE
 
 logger = logging.getLogger(__name__)
 
+# Concurrent requests for the same movie's details, or the same search, share one call to OMDb
+movie_details_flight = SingleFlight()
+async_movie_details_flight = AsyncSingleFlight()
+search_flight = SingleFlight()
+async_search_flight = AsyncSingleFlight()
+
+# Stale searches are refreshed on these threads, after the request that found them stale has been answered
+search_refresh_executor = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix="search-refresh"
+)
+refreshing_searches = set()
+refreshing_searches_lock = threading.Lock()
+
 
 def get_or_create_genres(genre_names):
-    for genre_name in genre_names:
-        genre, created = Genre.objects.get_or_create(name=genre_name)
-        yield genre
+    yield from Genre.objects.get_or_create_many(genre_names).values()
+
+
+def has_required_details(movie_details):
+    """
+    Whether OMDb's details have what a `Movie` needs. OMDb has "N/A" for details it doesn't have, which parse to
+    `None`, and saving a movie without a title or year would fail.
+    """
+    if movie_details.title and movie_details.year is not None:
+        return True
+    logger.warning(
+        "Not saving details of IMDB ID %s without a title or year",
+        movie_details.imdb_id,
+    )
+    return False
+
+
+def save_movie_details(movie, movie_details):
+    """
+    Copy the full details fetched from OMDb onto `movie` and save it as a full record. If they're missing a title or
+    year the movie is left as it was.
+    """
+    if not has_required_details(movie_details):
+        return movie
+    movie.title = movie_details.title
+    movie.year = movie_details.year
+    movie.plot = movie_details.plot
+    movie.runtime_minutes = movie_details.runtime_minutes
+    movie.genres.set(get_or_create_genres(movie_details.genres))
+    movie.is_full_record = True
+    movie.save()
+    return movie
 
 
 def fill_movie_details(movie):
     """
     Fetch a movie's full details from OMDb. Then, save it to the DB. If the movie already has a `full_record` this does
     nothing, so it's safe to call with any `Movie`.
+
+    If the same movie is being filled by another thread, this waits for that to finish rather than fetching it again.
     """
     if movie.is_full_record:
         logger.warning(
@@ -27,55 +89,383 @@ def fill_movie_details(movie):
             movie.title,
         )
         return movie
-    omdb_client = get_client_from_settings()
-    movie_details = omdb_client.get_by_imdb_id(movie.imdb_id)
-    movie.title = movie_details.title
-    movie.year = movie_details.year
-    movie.plot = movie_details.plot
-    movie.runtime_minutes = movie_details.runtime_minutes
-    movie.genres.clear()
-    for genre in get_or_create_genres(movie_details.genres):
-        movie.genres.add(genre)
-    movie.is_full_record = True
-    movie.save()
+
+    filled_movie = movie_details_flight.do(
+        movie.imdb_id, fetch_and_save_movie_details, movie
+    )
+    if filled_movie is not movie:
+        # Filled by a concurrent call, so only needs to be reloaded
+        movie.refresh_from_db()
     return movie
 
 
-def search_and_save(search):
+def fetch_and_save_movie_details(movie):
+    # Serialize with other processes filling the same movie, one of them may have finished while we waited
+    with advisory_lock(f"movie-details:{movie.imdb_id}"):
+        if Movie.objects.filter(pk=movie.pk, is_full_record=True).exists():
+            movie.refresh_from_db()
+            return movie
+
+        omdb_client = get_client_from_settings()
+        movie_details = omdb_client.get_by_imdb_id(movie.imdb_id)
+        return save_movie_details(movie, movie_details)
+
+
+def fill_movies_details(movies, max_concurrency=None):
     """
-    Perform a search for search_term against the API, but only if it hasn't been searched in the past 24 hours. Save
-    each result to the local DB as a partial record.
+    Bulk version of `fill_movie_details`. Fetch the full details of every partial record in `movies` (a `Movie`
+    queryset) from OMDb concurrently, then save them all in a handful of queries. Returns the movies that were updated.
+
+    This is meant for background enrichment, so its requests to OMDb have `BACKGROUND` priority.
     """
-    # Replace multiple spaces with single spaces, and lowercase the search
-    normalized_search_term = re.sub(r"\s+", " ", search.lower()).strip()
+    movies_by_imdb_id = {
+        movie.imdb_id: movie for movie in movies.filter(is_full_record=False)
+    }
+    if not movies_by_imdb_id:
+        return []
+
+    omdb_client = get_client_from_settings()
+
+    updated_movies = []
+    movie_genre_names = {}
+    updated_at = now()
+    for movie_details in omdb_client.get_many(
+        movies_by_imdb_id, max_concurrency=max_concurrency, priority=BACKGROUND
+    ):
+        movie = movies_by_imdb_id.get(movie_details.imdb_id)
+        if movie is None:
+            logger.warning(
+                "Got details for unexpected IMDB ID %s", movie_details.imdb_id
+            )
+            continue
+        # One bad record would fail the whole bulk_update
+        if not has_required_details(movie_details):
+            continue
+        movie.title = movie_details.title
+        movie.year = movie_details.year
+        movie.plot = movie_details.plot
+        movie.runtime_minutes = movie_details.runtime_minutes
+        movie.is_full_record = True
+        movie.updated_at = updated_at
+        movie_genre_names[movie.pk] = movie_details.genres
+        updated_movies.append(movie)
+
+    genres_by_name = Genre.objects.get_or_create_many(
+        sorted({name for names in movie_genre_names.values() for name in names})
+    )
+    MovieGenre = Movie.genres.through
+
+    with transaction.atomic():
+        Movie.objects.bulk_update(
+            updated_movies,
+            [
+                "title",
+                "year",
+                "plot",
+                "runtime_minutes",
+                "is_full_record",
+                "updated_at",
+            ],
+        )
+        MovieGenre.objects.filter(movie__in=updated_movies).delete()
+        MovieGenre.objects.bulk_create(
+            [
+                MovieGenre(movie_id=movie_pk, genre_id=genres_by_name[name].pk)
+                for movie_pk, names in movie_genre_names.items()
+                for name in dict.fromkeys(names)
+            ]
+        )
+        MovieNight.objects.update_end_times(updated_movies)
+        # bulk_update doesn't send post_save
+        title_index.update_on_commit(updated_movies)
+        responsecache.invalidate_movies([movie.pk for movie in updated_movies])
+
+    logger.info("Filled details of %d movies", len(updated_movies))
+    return updated_movies
+
+
+async def afill_movie_details(movie):
+    """Async version of `fill_movie_details`, the OMDb request is made without blocking the event loop."""
+    if movie.is_full_record:
+        logger.warning(
+            "'%s' is already a full record.",
+            movie.title,
+        )
+        return movie
+
+    filled_movie = await async_movie_details_flight.do(
+        movie.imdb_id, afetch_and_save_movie_details, movie
+    )
+    if filled_movie is not movie:
+        await movie.arefresh_from_db()
+    return movie
+
+
+async def afetch_and_save_movie_details(movie):
+    async with aadvisory_lock(f"movie-details:{movie.imdb_id}"):
+        if await Movie.objects.filter(pk=movie.pk, is_full_record=True).aexists():
+            await movie.arefresh_from_db()
+            return movie
+
+        omdb_client = get_async_client_from_settings()
+        movie_details = await omdb_client.get_by_imdb_id(movie.imdb_id)
+        return await sync_to_async(save_movie_details)(movie, movie_details)
+
+
+def normalize_search_term(search):
+    """Replace multiple spaces with single spaces, and lowercase the search"""
+    return re.sub(r"\s+", " ", search.lower()).strip()
+
 
-    search_term, created = SearchTerm.objects.get_or_create(term=normalized_search_term)
+def get_search_freshness(normalized_search_term):
+    """Whether the results of the normalized search are `FRESH`, `STALE` or `EXPIRED`, which they are if never made."""
+    search_term = SearchTerm.objects.filter(term=normalized_search_term).first()
+    if search_term is None:
+        return SearchTerm.EXPIRED
+    return search_term.get_freshness(now())
 
-    if not created and (search_term.last_search > now() - timedelta(days=1)):
+
+def is_recently_searched(normalized_search_term):
+    """Whether the normalized search has been performed against the API recently enough that its results are fresh."""
+    if get_search_freshness(normalized_search_term) == SearchTerm.FRESH:
         # Don't search as it has been searched recently
         logger.warning(
-            "Search for '%s' was performed in the past 24 hours so not searching again.",
+            "Search for '%s' was performed recently so not searching again.",
             normalized_search_term,
         )
-        return
+        return True
 
-    # Add this line to update the last_search field
-    search_term.last_search = now()
-    search_term.save()
+    return False
+
+
+def record_search(normalized_search_term):
+    """
+    Create or update the `SearchTerm` once a search has been saved. Only done at the end, so that a search that fails
+    part way through will be retried.
+    """
+    search_term, created = SearchTerm.objects.update_or_create(
+        term=normalized_search_term, defaults={"last_search": now()}
+    )
+    return search_term
+
+
+def save_search_results(omdb_movies):
+    """
+    Save the `OmdbMovie`s in `omdb_movies` to the local DB as partial records, if they aren't already there. All of them
+    are inserted with one `bulk_create`, existing movies are left as they are since they may be full records. Returns
+    the newly created movies.
+    """
+    omdb_movies_by_imdb_id = {}
+    for omdb_movie in omdb_movies:
+        if omdb_movie.year is None:
+            logger.warning("Skipping '%s' as it has no year", omdb_movie.imdb_id)
+            continue
+        omdb_movies_by_imdb_id.setdefault(omdb_movie.imdb_id, omdb_movie)
+
+    if not omdb_movies_by_imdb_id:
+        return []
+
+    existing_imdb_ids = set(
+        Movie.objects.filter(imdb_id__in=omdb_movies_by_imdb_id).values_list(
+            "imdb_id", flat=True
+        )
+    )
+    new_imdb_ids = [
+        imdb_id
+        for imdb_id in omdb_movies_by_imdb_id
+        if imdb_id not in existing_imdb_ids
+    ]
+
+    # Conflicts are still possible if another process saved the same movie since the query above
+    Movie.objects.bulk_create(
+        [
+            Movie(
+                imdb_id=imdb_id,
+                title=omdb_movies_by_imdb_id[imdb_id].title,
+                year=omdb_movies_by_imdb_id[imdb_id].year,
+            )
+            for imdb_id in new_imdb_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+    movies_by_imdb_id = Movie.objects.in_bulk(new_imdb_ids, field_name="imdb_id")
+    created_movies = [
+        movies_by_imdb_id[imdb_id]
+        for imdb_id in new_imdb_ids
+        if imdb_id in movies_by_imdb_id
+    ]
+    # bulk_create doesn't send post_save
+    title_index.update_on_commit(created_movies)
+    logger.info(
+        "Saved %d movies, %d were new",
+        len(omdb_movies_by_imdb_id),
+        len(created_movies),
+    )
+    return created_movies
+
+
+def save_search_result_ranks(search_term, omdb_movies):
+    """Replace the stored results of `search_term` with the saved movies in `omdb_movies`, in OMDb's order."""
+    imdb_ids = list(dict.fromkeys(omdb_movie.imdb_id for omdb_movie in omdb_movies))
+    movie_ids_by_imdb_id = dict(
+        Movie.objects.filter(imdb_id__in=imdb_ids).values_list("imdb_id", "id")
+    )
+
+    SearchResult.objects.filter(search_term=search_term).delete()
+    SearchResult.objects.bulk_create(
+        [
+            SearchResult(search_term=search_term, movie_id=movie_id, rank=rank)
+            for rank, movie_id in enumerate(
+                (
+                    movie_ids_by_imdb_id[imdb_id]
+                    for imdb_id in imdb_ids
+                    if imdb_id in movie_ids_by_imdb_id
+                ),
+                start=1,
+            )
+        ]
+    )
+
+
+def save_search(normalized_search_term, omdb_movies):
+    """
+    Save the results of a search and record that it was made, in one transaction. With background enrichment the top
+    results are queued to have their details fetched, as they're the ones most likely to be looked at next.
+    """
+    with transaction.atomic():
+        created_movies = save_search_results(omdb_movies)
+        search_term = record_search(normalized_search_term)
+        save_search_result_ranks(search_term, omdb_movies)
+        # New movies can't be in any other search's results or cached details yet, so only this search is invalidated
+        responsecache.invalidate_search(normalized_search_term)
+        if settings.OMDB_BACKGROUND_ENRICHMENT:
+            top_imdb_ids = [
+                omdb_movie.imdb_id
+                for omdb_movie in omdb_movies[: settings.OMDB_ENRICH_SEARCH_RESULTS]
+            ]
+            EnrichmentJob.objects.enqueue(
+                Movie.objects.filter(imdb_id__in=top_imdb_ids, is_full_record=False)
+            )
+    return created_movies
+
+
+def get_search_results(search):
+    """
+    The movies OMDb returned for `search`, in OMDb's order. A search that has never been made has no stored results, so
+    falls back to searching the local movies.
+    """
+    normalized_search_term = normalize_search_term(search)
+    search_term = SearchTerm.objects.filter(term=normalized_search_term).first()
+    if search_term is None:
+        return search_movies(search)
+
+    return (
+        Movie.objects.filter(search_results__search_term=search_term)
+        .annotate(search_rank=F("search_results__rank"))
+        .order_by("search_rank")
+    )
 
-    omdb_client = get_client_from_settings()
 
-    for omdb_movie in omdb_client.search(normalized_search_term):
-        logger.info("Saving movie: '%s' / '%s'", omdb_movie.title, omdb_movie.imdb_id)
-        movie, created = Movie.objects.get_or_create(
-            imdb_id=omdb_movie.imdb_id,
-            defaults={
-                "title": omdb_movie.title,
-                "year": omdb_movie.year,
-            },
+def search_and_save(search, background_refresh=False):
+    """
+    Perform a search for search_term against the API, but only if its results aren't fresh. Save each result to the
+    local DB as a partial record. Returns the movies that were newly created.
+
+    With `background_refresh`, a search whose results are only stale returns straight away, and is refreshed on a
+    background thread.
+
+    Concurrent calls for the same search, in this process or (on PostgreSQL) any other, wait for the first one to finish
+    instead of searching again.
+    """
+    normalized_search_term = normalize_search_term(search)
+
+    if background_refresh:
+        freshness = get_search_freshness(normalized_search_term)
+        if freshness == SearchTerm.FRESH:
+            return []
+        if freshness == SearchTerm.STALE:
+            refresh_search_in_background(normalized_search_term)
+            return []
+
+    return search_flight.do(
+        normalized_search_term, search_and_save_normalized, normalized_search_term
+    )
+
+
+def search_and_save_normalized(normalized_search_term, priority=INTERACTIVE):
+    with advisory_lock(f"search:{normalized_search_term}"):
+        if is_recently_searched(normalized_search_term):
+            return []
+
+        omdb_client = get_client_from_settings()
+
+        # Fetch everything before starting the transaction, so it isn't held open while waiting on OMDb
+        omdb_movies = list(
+            omdb_client.search(normalized_search_term, priority=priority)
         )
 
-        if created:
-            logger.info("Movie created: '%s'", movie.title)
+        return save_search(normalized_search_term, omdb_movies)
+
+
+def refresh_search_in_background(normalized_search_term):
+    """Queue the normalized search to be made on a background thread, unless it already is."""
+    with refreshing_searches_lock:
+        if normalized_search_term in refreshing_searches:
+            return
+        refreshing_searches.add(normalized_search_term)
+
+    logger.info("Refreshing stale search for '%s'", normalized_search_term)
+    search_refresh_executor.submit(refresh_search, normalized_search_term)
+
+
+def refresh_search(normalized_search_term):
+    try:
+        # Nobody is waiting on this search, so it mustn't use the budget kept for interactive requests
+        search_flight.do(
+            normalized_search_term,
+            search_and_save_normalized,
+            normalized_search_term,
+            priority=BACKGROUND,
+        )
+    except Exception:
+        logger.exception("Failed to refresh search for '%s'", normalized_search_term)
+    finally:
+        with refreshing_searches_lock:
+            refreshing_searches.discard(normalized_search_term)
+        # The thread outlives the request, so its DB connection has to be closed here
+        connections.close_all()
+
+
+async def asearch_and_save(search, background_refresh=False):
+    """
+    Async version of `search_and_save`. All the result pages are fetched from OMDb without blocking the event loop, then
+    saved in one go.
+    """
+    normalized_search_term = normalize_search_term(search)
+
+    if background_refresh:
+        freshness = await sync_to_async(get_search_freshness)(normalized_search_term)
+        if freshness == SearchTerm.FRESH:
+            return []
+        if freshness == SearchTerm.STALE:
+            refresh_search_in_background(normalized_search_term)
+            return []
+
+    return await async_search_flight.do(
+        normalized_search_term, asearch_and_save_normalized, normalized_search_term
+    )
+
+
+async def asearch_and_save_normalized(normalized_search_term):
+    async with aadvisory_lock(f"search:{normalized_search_term}"):
+        if await sync_to_async(is_recently_searched)(normalized_search_term):
+            return []
+
+        omdb_client = get_async_client_from_settings()
 
-    search_term.save()
+        omdb_movies = [
+            omdb_movie
+            async for omdb_movie in omdb_client.search(normalized_search_term)
+        ]
+        return await sync_to_async(save_search)(normalized_search_term, omdb_movies)
@@ -0,0 +1,70 @@
+import functools
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a block makes more queries than its budget allows, and `QUERY_BUDGET_STRICT` is on."""
+
+
+class QueryCounter:
+    """A database execute wrapper that counts the queries made through it."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def query_budget(budget, name, using=DEFAULT_DB_ALIAS):
+    """
+    Count the queries made in the block, and if there are more than `budget` log a warning, or raise
+    `QueryBudgetExceeded` if the `QUERY_BUDGET_STRICT` setting is on (as it is when running tests). Unlike
+    `assertNumQueries` this doesn't need `DEBUG`, so it can be left on in production.
+    """
+    counter = QueryCounter()
+    with connections[using].execute_wrapper(counter):
+        yield counter
+
+    if counter.count > budget:
+        message = f"{name} made {counter.count} queries, its budget is {budget}"
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def with_query_budget(budget, using=DEFAULT_DB_ALIAS):
+    """Decorator version of `query_budget`, for views and viewset actions."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with query_budget(budget, fn.__qualname__, using=using):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class QueryBudgetTestMixin:
+    """For `TestCase`s, adds `assertMaxQueries`, a version of `assertNumQueries` that allows fewer queries."""
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS):
+        counter = QueryCounter()
+        with connections[using].execute_wrapper(counter):
+            yield counter
+        self.assertLessEqual(
+            counter.count,
+            budget,
+            f"{counter.count} queries executed, at most {budget} expected",
+        )
@@ -0,0 +1,95 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import SearchResult
+
+# Cached responses are keyed on version tokens, so invalidating them is replacing a token rather than finding and
+# deleting every key. The tokens themselves never expire, but if one is evicted a new one is made, which has the same
+# effect as bumping it.
+GENRES_VERSION = "genres"
+
+
+def get_version_key(name):
+    return f"movies:version:{name}"
+
+
+def get_versions(*names):
+    """The current token of each version in `names`, creating any that don't exist yet."""
+    keys = [get_version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*names):
+    cache.set_many(
+        {get_version_key(name): uuid.uuid4().hex for name in names}, timeout=None
+    )
+
+
+def bump_versions_on_commit(*names):
+    """
+    Bump the versions once the current transaction commits. Bumping straight away would let a concurrent request cache
+    the rows as they were before the transaction, under the new version.
+    """
+    transaction.on_commit(lambda: bump_versions(*names))
+
+
+def invalidate_movies(movie_pks):
+    """
+    Changes to these movies invalidate their detail, and the searches whose stored results include them. Only searches
+    with stored results are cached, so no others can include them.
+    """
+    movie_pks = set(movie_pks)
+    if not movie_pks:
+        return
+    terms = (
+        SearchResult.objects.filter(movie__in=movie_pks)
+        .order_by()
+        .values_list("search_term__term", flat=True)
+        .distinct()
+    )
+    bump_versions_on_commit(
+        *[f"movie:{pk}" for pk in movie_pks], *[f"search:{term}" for term in terms]
+    )
+
+
+def invalidate_search(normalized_search_term):
+    bump_versions_on_commit(f"search:{normalized_search_term}")
+
+
+def invalidate_genres():
+    """Genres are shown by name in every movie, so a renamed or deleted one invalidates everything."""
+    bump_versions_on_commit(GENRES_VERSION)
+
+
+def get_movie_detail_key(pk):
+    movie_version, genres_version = get_versions(f"movie:{pk}", GENRES_VERSION)
+    return f"movies:detail:{pk}:{movie_version}:{genres_version}"
+
+
+def get_search_key(normalized_search_term, query_params):
+    """The key of a page of search results, which depends on the cursor and page size as well as the term."""
+    versions = get_versions(f"search:{normalized_search_term}", GENRES_VERSION)
+    params = sorted(
+        (name, value) for name, values in query_params.lists() for value in values
+    )
+    digest = hashlib.blake2b(
+        repr((normalized_search_term, params)).encode(), digest_size=16
+    ).hexdigest()
+    return f"movies:search:{digest}:{':'.join(versions)}"
+
+
+def get_cached_response(key):
+    return cache.get(key)
+
+
+def cache_response(key, value):
+    cache.set(key, value, timeout=settings.MOVIES_RESPONSE_CACHE_TIMEOUT)
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from .models import UNKNOWN_RUNTIME, MovieNight, ends_after
+
+
+def find_free_slots(busy, window_start, window_end, duration):
+    """
+    The periods in the window from `window_start` to `window_end` that aren't covered by any of the `(start, end)`
+    periods in `busy`, and are at least `duration` long. `busy` must be sorted by start, and can overlap and extend
+    past the window.
+
+    This sweeps over `busy` once, keeping track of when the time covered so far ends, so any gap before the next
+    period starts is free.
+    """
+    slots = []
+    free_from = window_start
+    for start, end in busy:
+        if free_from >= window_end:
+            break
+        start = min(start, window_end)
+        if start - free_from >= duration:
+            slots.append((free_from, start))
+        free_from = max(free_from, end)
+
+    if window_end - free_from >= duration:
+        slots.append((free_from, window_end))
+    return slots
+
+
+def get_busy_periods(users, window_start, window_end):
+    """
+    The periods of the nights `users` have created that overlap the window, in one query, sorted by start. Nights of
+    movies without a runtime are taken to last `UNKNOWN_RUNTIME`, as they are by the API's filters, so they still block
+    the time around their start.
+    """
+    periods = (
+        MovieNight.objects.filter(
+            ends_after(window_start), creator__in=users, start_time__lt=window_end
+        )
+        .order_by("start_time")
+        .values_list("start_time", "end_time")
+    )
+    return [
+        (start, end if end is not None else start + UNKNOWN_RUNTIME)
+        for start, end in periods
+    ]
+
+
+def find_free_slots_for_movie(users, movie, window_start, window_end):
+    """The free slots of all of `users` in the window that are long enough to watch `movie`."""
+    return find_free_slots(
+        get_busy_periods(users, window_start, window_end),
+        window_start,
+        window_end,
+        timedelta(minutes=movie.runtime_minutes),
+    )
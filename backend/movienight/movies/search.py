@@ -0,0 +1,28 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import F, Q
+
+from .models import Movie
+
+
+def search_movies(search, queryset=None):
+    """
+    Search the local movies. On PostgreSQL this is a full-text search over the title and plot, plus titles that are
+    similar to `search` so typos still match, ordered by how well they match. Both use GIN indexes. On other databases
+    it's the movies whose title contains `search`.
+    """
+    if queryset is None:
+        queryset = Movie.objects.all()
+
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.filter(title__icontains=search)
+
+    query = SearchQuery(search, config="english", search_type="websearch")
+    return (
+        queryset.annotate(
+            rank=SearchRank(F("search_vector"), query),
+            similarity=TrigramSimilarity("title", search),
+        )
+        .filter(Q(search_vector=query) | Q(title__trigram_similar=search))
+        .order_by("-rank", "-similarity", "title", "year")
+    )
@@ -0,0 +1,80 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from . import responsecache
+from .autocomplete import title_index
+from .models import Genre, Movie, MovieNight, Tombstone
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def clear_genre_cache(sender, **kwargs):
+    """A genre has been renamed or deleted, so the cached IDs may be wrong."""
+    Genre.objects.clear_cache()
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_responses(sender, **kwargs):
+    responsecache.invalidate_genres()
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def touch_genre_movies(sender, instance, created=False, **kwargs):
+    """
+    The genre's movies are serialized with its name, so they've changed when it's renamed or deleted. Their
+    `updated_at` is bumped for their ETags and the changes endpoint. Deletion is handled before the genre is deleted,
+    while it still has its movies.
+    """
+    if not created:
+        Movie.objects.filter(genres=instance).update(updated_at=now())
+
+
+@receiver(post_save, sender=Movie)
+# Before the movie's search results are deleted with it, so the searches including it can still be found
+@receiver(pre_delete, sender=Movie)
+def invalidate_movie_responses(sender, instance, **kwargs):
+    responsecache.invalidate_movies([instance.pk])
+
+
+@receiver(post_save, sender=Movie)
+def update_title_index(sender, instance, **kwargs):
+    title_index.update_on_commit([instance])
+
+
+@receiver(post_delete, sender=Movie)
+def remove_from_title_index(sender, instance, **kwargs):
+    title_index.remove_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Movie)
+def update_movie_night_end_times(sender, instance, created, update_fields, **kwargs):
+    """The movie's nights end at their start time plus its runtime, so they're updated when it changes."""
+    if update_fields is not None and "runtime_minutes" not in update_fields:
+        return
+    if not created and instance.has_runtime_changed():
+        MovieNight.objects.update_end_times([instance])
+    instance._loaded_runtime_minutes = instance.runtime_minutes
+
+
+@receiver(m2m_changed, sender=Movie.genres.through)
+def invalidate_movie_genre_responses(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        responsecache.invalidate_movies([instance.pk])
+    elif pk_set:
+        responsecache.invalidate_movies(pk_set)
+    else:
+        # All of a genre's movies were cleared, and which they were isn't known any more
+        responsecache.invalidate_genres()
+
+
+@receiver(post_delete, sender=Movie)
+@receiver(post_delete, sender=MovieNight)
+def record_deletion(sender, instance, **kwargs):
+    Tombstone.objects.create(model=sender._meta.model_name, object_id=instance.pk)
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one. While a call for a key is running in one thread, any other
+    thread calling `do` with the same key waits for it to finish and gets the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.exception is not None:
+                raise call.exception
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.exception = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """The asyncio equivalent of `SingleFlight`, for coroutines running in the same event loop."""
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()
+
+    async def do(self, key, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        calls = self._calls.setdefault(loop, {})
+
+        future = calls.get(key)
+        if future is not None:
+            # Shielded so a cancelled waiter doesn't cancel the call for everyone else
+            return await asyncio.shield(future)
+
+        future = calls[key] = loop.create_future()
+        try:
+            result = await fn(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved, in case there was nobody waiting for it
+            future.exception()
+            raise
+        finally:
+            del calls[key]
+
+
+def get_advisory_lock_id(name):
+    """Advisory locks are identified by a 64-bit integer, so hash the name to one that's the same in every process."""
+    digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+@contextmanager
+def advisory_lock(name, using=DEFAULT_DB_ALIAS):
+    """
+    Hold a PostgreSQL session level advisory lock called `name`, so only one process at a time runs the block. On other
+    databases there's no equivalent, so this does nothing.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        yield
+        return
+
+    lock_id = get_advisory_lock_id(name)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [lock_id])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id])
+
+
+@asynccontextmanager
+async def aadvisory_lock(name, using=DEFAULT_DB_ALIAS):
+    """
+    Async version of `advisory_lock`. The lock is taken and released with `sync_to_async`, so on the same thread, and
+    DB connection, as the ORM calls made with it in between.
+    """
+    lock = advisory_lock(name, using)
+    await sync_to_async(lock.__enter__)()
+    try:
+        yield
+    finally:
+        await sync_to_async(lock.__exit__)(None, None, None)
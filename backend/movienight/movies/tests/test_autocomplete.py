@@ -0,0 +1,188 @@
+from unittest.mock import ANY, patch
+
+from django.test import TestCase, override_settings
+
+from ..autocomplete import TitleIndex, TitleSnapshot, get_index_keys, title_index
+from .factories import MovieFactory
+
+
+class TestGetIndexKeys(TestCase):
+    def test_key_from_each_word(self):
+        self.assertEqual(
+            get_index_keys("The Matrix: Reloaded"),
+            ["the matrix reloaded", "matrix reloaded", "reloaded"],
+        )
+
+
+class TestTitleSnapshot(TestCase):
+    def test_search(self):
+        snapshot = TitleSnapshot(
+            [(1, "Alien", 1979), (2, "Aliens", 1986), (3, "The Alien Factor", 1978)]
+        )
+
+        self.assertEqual(
+            list(snapshot.search("alien")),
+            [
+                ("alien", 1, "Alien", 1979),
+                ("alien factor", 3, "The Alien Factor", 1978),
+                ("aliens", 2, "Aliens", 1986),
+            ],
+        )
+        self.assertEqual(
+            list(snapshot.search("aliens")), [("aliens", 2, "Aliens", 1986)]
+        )
+        self.assertEqual(list(snapshot.search("aliensx")), [])
+
+    def test_movies(self):
+        movies = [(1, "Alien", 1979), (2, "Blade Runner", 1982)]
+
+        self.assertEqual(list(TitleSnapshot(movies).movies()), movies)
+
+
+class TestTitleIndex(TestCase):
+    def setUp(self):
+        title_index.reset()
+        self.addCleanup(title_index.reset)
+
+    def test_search_by_word_prefix(self):
+        matrix = MovieFactory.create(title="The Matrix", year=1999)
+        reloaded = MovieFactory.create(title="Matrix Reloaded", year=2003)
+        MovieFactory.create(title="Inception")
+        title_index.build()
+
+        self.assertEqual(
+            title_index.search("MATR"),
+            [
+                {"id": matrix.pk, "title": "The Matrix", "year": 1999},
+                {"id": reloaded.pk, "title": "Matrix Reloaded", "year": 2003},
+            ],
+        )
+
+    def test_search_limit(self):
+        MovieFactory.create_batch(5, title="Alien")
+        title_index.build()
+
+        self.assertEqual(len(title_index.search("alien", limit=3)), 3)
+
+    def test_search_without_queries_once_built(self):
+        MovieFactory.create(title="The Matrix")
+        title_index.build()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(len(title_index.search("matrix")), 1)
+
+    @patch("movienight.movies.autocomplete.rebuild_executor")
+    def test_build_in_background(self, mock_rebuild_executor):
+        MovieFactory.create(title="The Matrix")
+
+        # Nothing is found until the build is done
+        with self.assertNumQueries(0):
+            self.assertEqual(title_index.search("matrix"), [])
+        mock_rebuild_executor.submit.assert_called_once_with(
+            title_index.run_in_background, title_index.build, ANY
+        )
+
+        title_index.build()
+        self.assertEqual(len(title_index.search("matrix")), 1)
+
+    @patch("movienight.movies.autocomplete.rebuild_executor")
+    def test_one_build_at_a_time(self, mock_rebuild_executor):
+        title_index.search("matrix")
+        title_index.search("matrix")
+
+        mock_rebuild_executor.submit.assert_called_once()
+
+    @patch("movienight.movies.autocomplete.rebuild_executor")
+    def test_not_rebuilt_by_default(self, mock_rebuild_executor):
+        title_index.build()
+
+        with patch("movienight.movies.autocomplete.time.monotonic", return_value=1e9):
+            title_index.search("matrix")
+
+        mock_rebuild_executor.submit.assert_not_called()
+
+    @override_settings(AUTOCOMPLETE_REBUILD_INTERVAL=60)
+    @patch("movienight.movies.autocomplete.rebuild_executor")
+    def test_rebuilt_after_interval(self, mock_rebuild_executor):
+        title_index.build()
+        title_index.search("matrix")
+        mock_rebuild_executor.submit.assert_not_called()
+
+        with patch("movienight.movies.autocomplete.time.monotonic", return_value=1e9):
+            title_index.search("matrix")
+
+        mock_rebuild_executor.submit.assert_called_once_with(
+            title_index.run_in_background, title_index.build, ANY
+        )
+
+    def test_saved_movies_added_once_committed(self):
+        title_index.build()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            movie = MovieFactory.create(title="The Matrix")
+            self.assertEqual(title_index.search("matrix"), [])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                title_index.search("matrix"),
+                [{"id": movie.pk, "title": "The Matrix", "year": movie.year}],
+            )
+
+    def test_renamed_movies_updated(self):
+        movie = MovieFactory.create(title="The Matrix")
+        title_index.build()
+
+        movie.title = "Inception"
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.save()
+
+        self.assertEqual(title_index.search("matrix"), [])
+        self.assertEqual(
+            title_index.search("incep"),
+            [{"id": movie.pk, "title": "Inception", "year": movie.year}],
+        )
+
+    def test_deleted_movies_removed(self):
+        movie = MovieFactory.create(title="The Matrix")
+        saved_movie = MovieFactory.create(title="Matrix Reloaded")
+        title_index.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            saved_movie.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.delete()
+            saved_movie.delete()
+
+        self.assertEqual(title_index.search("matrix"), [])
+
+    @patch.object(TitleIndex, "MAX_CHANGES", 1)
+    @patch("movienight.movies.autocomplete.rebuild_executor")
+    def test_compact_changes(self, mock_rebuild_executor):
+        matrix = MovieFactory.create(title="The Matrix", year=1999)
+        deleted = MovieFactory.create(title="Matrix Revolutions")
+        title_index.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            reloaded = MovieFactory.create(title="Matrix Reloaded", year=2003)
+            deleted.delete()
+
+        title_index.search("matrix")
+        mock_rebuild_executor.submit.assert_called_once_with(
+            title_index.run_in_background, title_index.compact, ANY
+        )
+        change_number = mock_rebuild_executor.submit.call_args.args[2]
+        # Changes made while the new snapshot is built are kept
+        matrix.title = "The Matrix Resurrections"
+        with self.captureOnCommitCallbacks(execute=True):
+            matrix.save()
+
+        with self.assertNumQueries(0):
+            title_index.compact(change_number)
+
+        self.assertEqual(
+            title_index.search("matrix"),
+            [
+                {"id": reloaded.pk, "title": "Matrix Reloaded", "year": 2003},
+                {"id": matrix.pk, "title": "The Matrix Resurrections", "year": 1999},
+            ],
+        )
+        self.assertEqual(list(title_index._saved), [matrix.pk])
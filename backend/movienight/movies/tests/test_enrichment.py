@@ -0,0 +1,229 @@
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..enrichment import log_rate_limiter_stats, run_enrichment_jobs, run_worker
+from ..models import EnrichmentJob, Movie
+from .factories import MovieFactory
+from movienight.omdb.django_client import get_rate_limiter_from_settings
+
+
+def make_movie_details(imdb_id):
+    return MagicMock(
+        imdb_id=imdb_id,
+        title=f"Full {imdb_id}",
+        year=1999,
+        plot="just a test movie",
+        runtime_minutes=120,
+        genres=["Action"],
+    )
+
+
+class TestEnqueue(TestCase):
+    def test_enqueue_partial_records_once(self):
+        partial_movie = MovieFactory.create(is_full_record=False)
+        full_movie = MovieFactory.create(is_full_record=True)
+
+        EnrichmentJob.objects.enqueue([partial_movie, full_movie])
+        EnrichmentJob.objects.enqueue([partial_movie])
+
+        self.assertEqual(
+            list(EnrichmentJob.objects.values_list("movie_id", flat=True)),
+            [partial_movie.pk],
+        )
+
+    def test_requeue_failed_jobs_after_a_while(self):
+        recently_failed, long_failed = MovieFactory.create_batch(
+            2, is_full_record=False
+        )
+        for movie, claimed_at in [
+            (recently_failed, timezone.now()),
+            (long_failed, timezone.now() - EnrichmentJob.RETRY_FAILED_AFTER * 2),
+        ]:
+            EnrichmentJob.objects.create(
+                movie=movie,
+                status=EnrichmentJob.Status.FAILED,
+                attempts=EnrichmentJob.MAX_ATTEMPTS,
+                claimed_at=claimed_at,
+            )
+
+        pending = EnrichmentJob.objects.enqueue([recently_failed, long_failed])
+
+        self.assertEqual(pending, {long_failed.pk})
+        job = EnrichmentJob.objects.get(movie=long_failed)
+        self.assertEqual(job.status, EnrichmentJob.Status.PENDING)
+        self.assertEqual(job.attempts, 0)
+
+
+class TestClaim(TestCase):
+    def test_claim_oldest_pending_jobs(self):
+        movies = MovieFactory.create_batch(3, is_full_record=False)
+        EnrichmentJob.objects.enqueue(movies)
+
+        jobs = EnrichmentJob.objects.claim(2, stale_after=timedelta(minutes=10))
+
+        self.assertEqual([job.movie_id for job in jobs], [m.pk for m in movies[:2]])
+        self.assertEqual(
+            EnrichmentJob.objects.filter(status=EnrichmentJob.Status.RUNNING).count(),
+            2,
+        )
+        self.assertEqual(
+            [
+                job.movie_id
+                for job in EnrichmentJob.objects.claim(
+                    2, stale_after=timedelta(minutes=10)
+                )
+            ],
+            [movies[2].pk],
+        )
+
+    def test_dont_claim_jobs_before_next_attempt(self):
+        movie = MovieFactory.create(is_full_record=False)
+        EnrichmentJob.objects.create(
+            movie=movie, next_attempt_at=timezone.now() + timedelta(minutes=1)
+        )
+
+        self.assertEqual(
+            EnrichmentJob.objects.claim(10, stale_after=timedelta(minutes=10)), []
+        )
+
+    def test_claim_stale_running_jobs(self):
+        movie = MovieFactory.create(is_full_record=False)
+        EnrichmentJob.objects.create(
+            movie=movie,
+            status=EnrichmentJob.Status.RUNNING,
+            attempts=1,
+            claimed_at=timezone.now() - timedelta(hours=1),
+        )
+
+        [job] = EnrichmentJob.objects.claim(10, stale_after=timedelta(minutes=10))
+
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+
+
+class TestRunEnrichmentJobs(TestCase):
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_delete_done_jobs_and_retry_failed(self, mock_get_client_from_settings):
+        filled_movie, missed_movie, given_up_movie = MovieFactory.create_batch(
+            3, is_full_record=False
+        )
+        EnrichmentJob.objects.enqueue([filled_movie, missed_movie])
+        EnrichmentJob.objects.create(
+            movie=given_up_movie, attempts=EnrichmentJob.MAX_ATTEMPTS - 1
+        )
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.get_many.return_value = [
+            make_movie_details(filled_movie.imdb_id)
+        ]
+        mock_get_client_from_settings.return_value = omdb_client_mock
+        jobs = EnrichmentJob.objects.claim(10, stale_after=timedelta(minutes=10))
+
+        done = run_enrichment_jobs(jobs)
+
+        self.assertEqual(done, 1)
+        self.assertTrue(Movie.objects.get(pk=filled_movie.pk).is_full_record)
+        self.assertEqual(
+            dict(EnrichmentJob.objects.values_list("movie_id", "status")),
+            {
+                missed_movie.pk: EnrichmentJob.Status.PENDING,
+                given_up_movie.pk: EnrichmentJob.Status.FAILED,
+            },
+        )
+
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_retry_with_backoff(self, mock_get_client_from_settings):
+        movie = MovieFactory.create(is_full_record=False)
+        EnrichmentJob.objects.create(movie=movie, attempts=1)
+        mock_get_client_from_settings.return_value.get_many.return_value = []
+        jobs = EnrichmentJob.objects.claim(10, stale_after=timedelta(minutes=10))
+
+        run_enrichment_jobs(jobs)
+
+        job = EnrichmentJob.objects.get()
+        self.assertEqual(job.status, EnrichmentJob.Status.PENDING)
+        self.assertEqual(job.attempts, 2)
+        self.assertGreater(
+            job.next_attempt_at,
+            timezone.now() + EnrichmentJob.RETRY_BACKOFF * 2 - timedelta(seconds=10),
+        )
+        self.assertEqual(
+            EnrichmentJob.objects.claim(10, stale_after=timedelta(minutes=10)), []
+        )
+
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_wait_for_budget_without_using_attempts(
+        self, mock_get_client_from_settings
+    ):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        movies = MovieFactory.create_batch(2, is_full_record=False)
+        EnrichmentJob.objects.enqueue(movies)
+        # get_many stops fetching when the rate limiter refuses a request
+        mock_get_client_from_settings.return_value.get_many.return_value = []
+
+        with override_settings(
+            OMDB_RATE_LIMIT_PATH=str(Path(directory.name) / "ratelimit.sqlite3")
+        ):
+            rate_limiter = get_rate_limiter_from_settings()
+            rate_limiter.exhaust()
+            for _ in range(EnrichmentJob.MAX_ATTEMPTS + 1):
+                jobs = EnrichmentJob.objects.claim(
+                    10, stale_after=timedelta(minutes=10)
+                )
+                run_enrichment_jobs(jobs)
+            reset_time = rate_limiter.get_reset_time()
+
+        self.assertEqual(
+            list(
+                EnrichmentJob.objects.values_list(
+                    "status", "attempts", "next_attempt_at"
+                )
+            ),
+            [(EnrichmentJob.Status.PENDING, 0, reset_time)] * 2,
+        )
+        self.assertEqual(EnrichmentJob.objects.enqueue(movies), {m.pk for m in movies})
+
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_run_worker_until_queue_empty(self, mock_get_client_from_settings):
+        movies = MovieFactory.create_batch(5, is_full_record=False)
+        EnrichmentJob.objects.enqueue(movies)
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.get_many.side_effect = lambda imdb_ids, **kwargs: [
+            make_movie_details(imdb_id) for imdb_id in imdb_ids
+        ]
+        mock_get_client_from_settings.return_value = omdb_client_mock
+
+        done = run_worker(batch_size=2, once=True)
+
+        self.assertEqual(done, 5)
+        self.assertEqual(omdb_client_mock.get_many.call_count, 3)
+        self.assertFalse(EnrichmentJob.objects.exists())
+        self.assertFalse(Movie.objects.filter(is_full_record=False).exists())
+
+
+class TestRateLimiterStats(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            OMDB_RATE_LIMIT_PATH=str(Path(directory.name) / "ratelimit.sqlite3"),
+            OMDB_DAILY_LIMIT=100,
+            OMDB_BACKGROUND_RESERVE=0.2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.rate_limiter = get_rate_limiter_from_settings()
+        for _ in range(3):
+            self.rate_limiter.acquire()
+
+    def test_log_rate_limiter_stats(self):
+        with self.assertLogs("movienight.movies.enrichment", "INFO") as logs:
+            log_rate_limiter_stats()
+
+        self.assertIn("Used 3 of 100 OMDb requests today", logs.output[0])
+        self.assertIn("'requests': 3", logs.output[0])
@@ -1,9 +1,9 @@
 from datetime import timedelta
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
-from ..models import Movie, MovieNight
+from ..models import Movie, MovieNight, SearchTerm
 from .factories import MovieFactory, GenreFactory, MovieNightFactory
 from movienight.accounts.tests.factories import UserFactory
 
@@ -80,9 +80,102 @@ class TestMovieNight(TestCase):
         )
         self.assertIsNone(movie_night.end_time)
 
+    def test_movie_night_end_time_updated_with_start_time(self):
+        movie_night = MovieNightFactory(movie=self.movie, creator=self.user)
+        movie_night.start_time = timezone.now()
+        movie_night.save(update_fields=["start_time"])
+
+        movie_night.refresh_from_db()
+        self.assertEqual(
+            movie_night.end_time, movie_night.start_time + timedelta(minutes=142)
+        )
+
+    def test_movie_night_end_time_updated_with_runtime(self):
+        movie_night = MovieNightFactory(movie=self.movie, creator=self.user)
+        movie = Movie.objects.get(pk=self.movie.pk)
+
+        movie.runtime_minutes = 90
+        movie.save()
+
+        movie_night.refresh_from_db()
+        self.assertEqual(
+            movie_night.end_time, movie_night.start_time + timedelta(minutes=90)
+        )
+
+    def test_movie_night_end_time_not_updated_without_runtime_change(self):
+        MovieNightFactory(movie=self.movie, creator=self.user)
+        movie = Movie.objects.get(pk=self.movie.pk)
+        movie.title = "Shawshank"
+
+        # The movie's UPDATE and finding the cached searches to invalidate, but no UPDATE of its nights
+        with self.assertNumQueries(2):
+            movie.save()
+        with self.assertNumQueries(2):
+            movie.save(update_fields=["title"])
+
+    def test_update_end_times(self):
+        other_movie = MovieFactory(runtime_minutes=90)
+        movie_nights = [
+            MovieNightFactory(movie=movie, creator=self.user)
+            for movie in [self.movie, self.movie, other_movie]
+        ]
+        Movie.objects.filter(pk=self.movie.pk).update(runtime_minutes=100)
+        self.movie.runtime_minutes = 100
+        other_movie.runtime_minutes = None
+
+        with self.assertNumQueries(2):
+            MovieNight.objects.update_end_times([self.movie, other_movie])
+
+        for movie_night in movie_nights:
+            movie_night.refresh_from_db()
+        self.assertEqual(
+            movie_nights[0].end_time,
+            movie_nights[0].start_time + timedelta(minutes=100),
+        )
+        self.assertEqual(
+            movie_nights[1].end_time,
+            movie_nights[1].start_time + timedelta(minutes=100),
+        )
+        self.assertIsNone(movie_nights[2].end_time)
+
     def test_movie_night_str_representation(self):
         movie_night = MovieNightFactory(movie=self.movie, creator=self.user)
         expected_str_representation = (
             f"{self.movie.title} ({self.movie.year}) - {self.user.email}"
         )
         self.assertEqual(str(movie_night), expected_str_representation)
+
+
+@override_settings(OMDB_SEARCH_FRESH_FOR=60 * 60, OMDB_SEARCH_STALE_FOR=60 * 60)
+class TestSearchTermModel(TestCase):
+    def test_get_freshness_from_settings(self):
+        search_term = SearchTerm.objects.create(term="test")
+        last_search = search_term.last_search
+
+        self.assertEqual(
+            search_term.get_freshness(last_search + timedelta(minutes=59)),
+            SearchTerm.FRESH,
+        )
+        self.assertEqual(
+            search_term.get_freshness(last_search + timedelta(minutes=61)),
+            SearchTerm.STALE,
+        )
+        self.assertEqual(
+            search_term.get_freshness(last_search + timedelta(minutes=121)),
+            SearchTerm.EXPIRED,
+        )
+
+    def test_get_freshness_per_term(self):
+        search_term = SearchTerm.objects.create(
+            term="test", fresh_for=timedelta(days=7), stale_for=timedelta(0)
+        )
+        last_search = search_term.last_search
+
+        self.assertEqual(
+            search_term.get_freshness(last_search + timedelta(days=6)),
+            SearchTerm.FRESH,
+        )
+        self.assertEqual(
+            search_term.get_freshness(last_search + timedelta(days=7)),
+            SearchTerm.EXPIRED,
+        )
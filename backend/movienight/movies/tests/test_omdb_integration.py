@@ -1,11 +1,24 @@
-from unittest.mock import patch, MagicMock
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import patch, AsyncMock, MagicMock
+from django.test import TestCase, override_settings
 from django.utils import timezone
 
 
-from ..models import Genre, SearchTerm, Movie
-from ..omdb_integration import get_or_create_genres, fill_movie_details, search_and_save
-from .factories import MovieFactory
+from ..models import EnrichmentJob, Genre, SearchTerm, Movie
+from ..omdb_integration import (
+    get_or_create_genres,
+    fill_movie_details,
+    fill_movies_details,
+    get_search_results,
+    search_and_save,
+    refresh_search,
+    refreshing_searches,
+    afill_movie_details,
+    asearch_and_save,
+)
+from .factories import MovieFactory, MovieNightFactory
+from movienight.omdb.client import OmdbMovie
+from movienight.omdb.ratelimit import BACKGROUND, INTERACTIVE
 
 
 class TestGetOrCreateGenres(TestCase):
@@ -51,6 +64,42 @@ class TestGetOrCreateGenres(TestCase):
             self.assertTrue(Genre.objects.filter(pk=genre.pk).exists())
             self.assertIn(genre.name, genre_names)
 
+    def test_get_or_create_genres_in_bulk(self):
+        Genre.objects.create(name="Comedy")
+        genre_names = ["Action", "Comedy", "Sci-Fi", "Action"]
+
+        # One lookup, one insert and one lookup of the new IDs
+        with self.assertNumQueries(3):
+            genres = list(get_or_create_genres(genre_names))
+
+        self.assertEqual(
+            [genre.name for genre in genres], ["Action", "Comedy", "Sci-Fi"]
+        )
+        self.assertEqual(
+            {genre.pk for genre in genres},
+            set(Genre.objects.values_list("pk", flat=True)),
+        )
+
+    def test_cache_genre_ids_once_committed(self):
+        self.addCleanup(Genre.objects.clear_cache)
+        with self.captureOnCommitCallbacks(execute=True):
+            genres = list(get_or_create_genres(["Action", "Sci-Fi"]))
+
+        with self.assertNumQueries(0):
+            cached_genres = list(get_or_create_genres(["Action", "Sci-Fi"]))
+
+        self.assertEqual(cached_genres, genres)
+
+    def test_clear_genre_cache_when_genre_deleted(self):
+        self.addCleanup(Genre.objects.clear_cache)
+        with self.captureOnCommitCallbacks(execute=True):
+            [genre] = get_or_create_genres(["Action"])
+
+        genre.delete()
+        [new_genre] = get_or_create_genres(["Action"])
+
+        self.assertTrue(Genre.objects.filter(pk=new_genre.pk).exists())
+
 
 class TestFillMovieDetails(TestCase):
     @patch("movienight.movies.omdb_integration.get_client_from_settings")
@@ -107,6 +156,129 @@ class TestFillMovieDetails(TestCase):
         for genre in movie.genres.all():
             self.assertIn(genre.name, ["Action", "Sci-Fi"])
 
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_fill_movie_details_without_year(self, mock_get_client_from_settings):
+        movie = MovieFactory.create(is_full_record=False, title="Old", year=1998)
+        mock_get_client_from_settings.return_value.get_by_imdb_id.return_value = (
+            OmdbMovie(
+                {
+                    "Title": "The Matrix",
+                    "Year": "N/A",
+                    "Runtime": "136 min",
+                    "Genre": "Action",
+                    "Plot": "N/A",
+                    "imdbID": movie.imdb_id,
+                }
+            )
+        )
+
+        fill_movie_details(movie)
+
+        movie.refresh_from_db()
+        self.assertFalse(movie.is_full_record)
+        self.assertEqual((movie.title, movie.year), ("Old", 1998))
+
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_no_fetch_when_filled_by_another_process(
+        self, mock_get_client_from_settings
+    ):
+        movie = MovieFactory.create(is_full_record=False)
+        Movie.objects.filter(pk=movie.pk).update(
+            is_full_record=True, title="The Matrix"
+        )
+
+        returned_movie = fill_movie_details(movie)
+
+        mock_get_client_from_settings.assert_not_called()
+        self.assertEqual(returned_movie.title, "The Matrix")
+        self.assertTrue(returned_movie.is_full_record)
+
+
+class TestFillMoviesDetails(TestCase):
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_fill_movies_details(self, mock_get_client_from_settings):
+        partial_movies = MovieFactory.create_batch(3, is_full_record=False)
+        full_movie = MovieFactory.create(is_full_record=True)
+        partial_movies[0].genres.add(Genre.objects.create(name="Old"))
+        movie_night = MovieNightFactory.create(movie=partial_movies[0])
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.get_many.side_effect = lambda imdb_ids, **kwargs: [
+            MagicMock(
+                imdb_id=imdb_id,
+                title=f"Full {imdb_id}",
+                year=1999,
+                plot="just a test movie",
+                runtime_minutes=120,
+                genres=["Action", "Sci-Fi"],
+            )
+            for imdb_id in imdb_ids
+        ]
+        mock_get_client_from_settings.return_value = omdb_client_mock
+
+        # One more for the searches whose cached responses include the movies
+        with self.assertNumQueries(11):
+            updated_movies = fill_movies_details(Movie.objects.all())
+
+        self.assertEqual(
+            {movie.pk for movie in updated_movies},
+            {movie.pk for movie in partial_movies},
+        )
+        self.assertEqual(
+            set(omdb_client_mock.get_many.call_args.args[0]),
+            {movie.imdb_id for movie in partial_movies},
+        )
+        for movie in partial_movies:
+            movie.refresh_from_db()
+            self.assertTrue(movie.is_full_record)
+            self.assertEqual(movie.title, f"Full {movie.imdb_id}")
+            self.assertEqual(movie.runtime_minutes, 120)
+            self.assertEqual(
+                [genre.name for genre in movie.genres.all()], ["Action", "Sci-Fi"]
+            )
+        self.assertEqual(full_movie.genres.count(), 0)
+        movie_night.refresh_from_db()
+        self.assertEqual(
+            movie_night.end_time, movie_night.start_time + timedelta(minutes=120)
+        )
+
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_fill_movies_details_skips_details_without_year(
+        self, mock_get_client_from_settings
+    ):
+        good_movie, bad_movie = MovieFactory.create_batch(2, is_full_record=False)
+        mock_get_client_from_settings.return_value.get_many.return_value = [
+            OmdbMovie(
+                {
+                    "Title": title,
+                    "Year": year,
+                    "Runtime": "100 min",
+                    "Genre": "Drama",
+                    "Plot": "N/A",
+                    "imdbID": movie.imdb_id,
+                }
+            )
+            for movie, title, year in [
+                (good_movie, "Good", "2001"),
+                (bad_movie, "Bad", "N/A"),
+            ]
+        ]
+
+        updated_movies = fill_movies_details(Movie.objects.all())
+
+        self.assertEqual(updated_movies, [good_movie])
+        good_movie.refresh_from_db()
+        bad_movie.refresh_from_db()
+        self.assertTrue(good_movie.is_full_record)
+        self.assertEqual((good_movie.title, good_movie.year), ("Good", 2001))
+        self.assertFalse(bad_movie.is_full_record)
+
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_no_fetch_when_all_full_records(self, mock_get_client_from_settings):
+        MovieFactory.create_batch(2, is_full_record=True)
+
+        self.assertEqual(fill_movies_details(Movie.objects.all()), [])
+        mock_get_client_from_settings.assert_not_called()
+
 
 class TestSearchAndSave(TestCase):
     @patch("movienight.movies.omdb_integration.get_client_from_settings")
@@ -123,7 +295,9 @@ class TestSearchAndSave(TestCase):
         self.assertTrue(
             SearchTerm.objects.filter(term=expected_normalized_search_term).exists()
         )
-        omdb_client_mock.search.assert_called_once_with(expected_normalized_search_term)
+        omdb_client_mock.search.assert_called_once_with(
+            expected_normalized_search_term, priority=INTERACTIVE
+        )
 
     @patch("movienight.movies.omdb_integration.get_client_from_settings")
     def test_save_search_term(self, mock_get_client_from_settings):
@@ -172,6 +346,165 @@ class TestSearchAndSave(TestCase):
 
         mock_get_client_from_settings.assert_not_called()
 
+    @patch("movienight.movies.omdb_integration.search_refresh_executor")
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_refresh_stale_search_in_background(
+        self, mock_get_client_from_settings, mock_search_refresh_executor
+    ):
+        self.addCleanup(refreshing_searches.clear)
+        SearchTerm.objects.create(term="test")
+        SearchTerm.objects.update(last_search=timezone.now() - timedelta(days=2))
+
+        created_movies = search_and_save("test", background_refresh=True)
+
+        self.assertEqual(created_movies, [])
+        mock_get_client_from_settings.assert_not_called()
+        mock_search_refresh_executor.submit.assert_called_once_with(
+            refresh_search, "test"
+        )
+
+    @patch("movienight.movies.omdb_integration.connections")
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_refresh_search_with_background_priority(
+        self, mock_get_client_from_settings, mock_connections
+    ):
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.search.return_value = []
+        mock_get_client_from_settings.return_value = omdb_client_mock
+        refreshing_searches.add("test")
+        self.addCleanup(refreshing_searches.clear)
+
+        refresh_search("test")
+
+        omdb_client_mock.search.assert_called_once_with("test", priority=BACKGROUND)
+        self.assertNotIn("test", refreshing_searches)
+
+    @patch("movienight.movies.omdb_integration.search_refresh_executor")
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_search_expired_search_while_waiting(
+        self, mock_get_client_from_settings, mock_search_refresh_executor
+    ):
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.search.return_value = []
+        mock_get_client_from_settings.return_value = omdb_client_mock
+        SearchTerm.objects.create(term="test")
+        SearchTerm.objects.update(last_search=timezone.now() - timedelta(days=30))
+
+        search_and_save("test", background_refresh=True)
+
+        omdb_client_mock.search.assert_called_once_with("test", priority=INTERACTIVE)
+        mock_search_refresh_executor.submit.assert_not_called()
+
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_search_stale_search_while_waiting_without_background_refresh(
+        self, mock_get_client_from_settings
+    ):
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.search.return_value = []
+        mock_get_client_from_settings.return_value = omdb_client_mock
+        SearchTerm.objects.create(term="test")
+        SearchTerm.objects.update(last_search=timezone.now() - timedelta(days=2))
+
+        search_and_save("test")
+
+        omdb_client_mock.search.assert_called_once_with("test", priority=INTERACTIVE)
+
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_failed_search_not_recorded(self, mock_get_client_from_settings):
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.search.side_effect = ValueError("OMDb is down")
+        mock_get_client_from_settings.return_value = omdb_client_mock
+
+        with self.assertRaises(ValueError):
+            search_and_save("test")
+
+        self.assertFalse(SearchTerm.objects.filter(term="test").exists())
+
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_replace_search_results_on_refresh(self, mock_get_client_from_settings):
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.search.return_value = [
+            MagicMock(title="Test Movie 1", imdb_id="tt1111111", year=2020),
+            MagicMock(title="Test Movie 2", imdb_id="tt2222222", year=2021),
+        ]
+        mock_get_client_from_settings.return_value = omdb_client_mock
+        search_and_save("test")
+        SearchTerm.objects.update(last_search=timezone.now() - timedelta(days=30))
+
+        omdb_client_mock.search.return_value = [
+            MagicMock(title="Test Movie 3", imdb_id="tt3333333", year=2022),
+            MagicMock(title="Test Movie 1", imdb_id="tt1111111", year=2020),
+        ]
+        search_and_save("test")
+
+        self.assertEqual(
+            list(get_search_results("test").values_list("imdb_id", flat=True)),
+            ["tt3333333", "tt1111111"],
+        )
+
+    @override_settings(OMDB_BACKGROUND_ENRICHMENT=True, OMDB_ENRICH_SEARCH_RESULTS=2)
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_enqueue_top_search_results(self, mock_get_client_from_settings):
+        full_movie = MovieFactory.create(imdb_id="tt0000000", is_full_record=True)
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.search.return_value = [
+            MagicMock(title=f"Test Movie {n}", imdb_id=f"tt{n:07d}", year=2000)
+            for n in range(4)
+        ]
+        mock_get_client_from_settings.return_value = omdb_client_mock
+
+        search_and_save("test")
+
+        # The full record is one of the top two results, but doesn't need its details fetched
+        self.assertFalse(EnrichmentJob.objects.filter(movie=full_movie).exists())
+        self.assertEqual(
+            list(EnrichmentJob.objects.values_list("movie__imdb_id", flat=True)),
+            ["tt0000001"],
+        )
+
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_save_search_results_in_bulk(self, mock_get_client_from_settings):
+        existing_movie = MovieFactory.create(
+            imdb_id="tt0000000", title="The Full Record", is_full_record=True
+        )
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.search.return_value = [
+            MagicMock(title=f"Test Movie {n}", imdb_id=f"tt{n:07d}", year=2000)
+            for n in range(100)
+        ] + [MagicMock(title="Test Movie 1", imdb_id="tt0000001", year=2000)]
+        mock_get_client_from_settings.return_value = omdb_client_mock
+
+        # The same no matter how many results, rather than a few per result
+        with self.assertNumQueries(15):
+            created_movies = search_and_save("test")
+
+        self.assertEqual(len(created_movies), 99)
+        self.assertNotIn(existing_movie.imdb_id, {m.imdb_id for m in created_movies})
+        self.assertTrue(all(movie.pk for movie in created_movies))
+        self.assertEqual(Movie.objects.count(), 100)
+        self.assertEqual(
+            list(get_search_results("test").values_list("imdb_id", flat=True)),
+            [f"tt{n:07d}" for n in range(100)],
+        )
+        existing_movie.refresh_from_db()
+        self.assertEqual(existing_movie.title, "The Full Record")
+        self.assertTrue(existing_movie.is_full_record)
+
+    @patch("movienight.movies.omdb_integration.get_client_from_settings")
+    def test_skip_search_results_without_year(self, mock_get_client_from_settings):
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.search.return_value = [
+            MagicMock(title="Test Movie 1", imdb_id="tt1111111", year=None),
+            MagicMock(title="Test Movie 2", imdb_id="tt2222222", year=2021),
+        ]
+        mock_get_client_from_settings.return_value = omdb_client_mock
+
+        search_and_save("test")
+
+        self.assertEqual(
+            list(Movie.objects.values_list("imdb_id", flat=True)), ["tt2222222"]
+        )
+
     @patch("movienight.movies.omdb_integration.get_client_from_settings")
     def test_save_search_results(self, mock_get_client_from_settings):
         omdb_client_mock = MagicMock()
@@ -190,3 +523,80 @@ class TestSearchAndSave(TestCase):
         movie2 = Movie.objects.get(imdb_id="tt2222222")
         self.assertFalse(movie1.is_full_record)
         self.assertFalse(movie2.is_full_record)
+
+
+async def async_iter(items):
+    for item in items:
+        yield item
+
+
+class TestAsyncOmdbIntegration(TestCase):
+    @patch("movienight.movies.omdb_integration.get_async_client_from_settings")
+    async def test_afill_movie_details(self, mock_get_async_client_from_settings):
+        movie = await Movie.objects.acreate(
+            title="Matrix", year=1999, imdb_id="tt0133093", is_full_record=False
+        )
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.get_by_imdb_id = AsyncMock(
+            return_value=MagicMock(
+                title="The Matrix",
+                year=1999,
+                plot="just a test movie",
+                runtime_minutes=120,
+                genres=["Action", "Sci-Fi"],
+            )
+        )
+        mock_get_async_client_from_settings.return_value = omdb_client_mock
+
+        returned_movie = await afill_movie_details(movie)
+
+        await returned_movie.arefresh_from_db()
+        self.assertTrue(returned_movie.is_full_record)
+        self.assertEqual(returned_movie.title, "The Matrix")
+        self.assertEqual(returned_movie.runtime_minutes, 120)
+        self.assertEqual(
+            [genre.name async for genre in returned_movie.genres.all()],
+            ["Action", "Sci-Fi"],
+        )
+
+    @patch("movienight.movies.omdb_integration.get_async_client_from_settings")
+    async def test_asearch_and_save(self, mock_get_async_client_from_settings):
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.search.return_value = async_iter(
+            [
+                MagicMock(title="Test Movie 1", imdb_id="tt1111111", year=2020),
+                MagicMock(title="Test Movie 2", imdb_id="tt2222222", year=2021),
+            ]
+        )
+        mock_get_async_client_from_settings.return_value = omdb_client_mock
+
+        await asearch_and_save("  Test  ")
+
+        omdb_client_mock.search.assert_called_once_with("test")
+        self.assertEqual(await Movie.objects.acount(), 2)
+        self.assertTrue(await SearchTerm.objects.filter(term="test").aexists())
+
+    @patch("movienight.movies.singleflight.advisory_lock")
+    @patch("movienight.movies.omdb_integration.get_async_client_from_settings")
+    async def test_asearch_and_save_holds_advisory_lock(
+        self, mock_get_async_client_from_settings, mock_advisory_lock
+    ):
+        omdb_client_mock = MagicMock()
+        omdb_client_mock.search.return_value = async_iter([])
+        mock_get_async_client_from_settings.return_value = omdb_client_mock
+
+        await asearch_and_save("test")
+
+        mock_advisory_lock.assert_called_once_with("search:test", "default")
+        mock_advisory_lock.return_value.__enter__.assert_called_once()
+        mock_advisory_lock.return_value.__exit__.assert_called_once()
+
+    @patch("movienight.movies.omdb_integration.get_async_client_from_settings")
+    async def test_asearch_and_save_skip_if_searched_recently(
+        self, mock_get_async_client_from_settings
+    ):
+        await SearchTerm.objects.acreate(term="test", last_search=timezone.now())
+
+        await asearch_and_save("test")
+
+        mock_get_async_client_from_settings.assert_not_called()
@@ -0,0 +1,43 @@
+from django.test import TestCase, override_settings
+
+from ..models import Genre
+from ..querybudget import (
+    QueryBudgetExceeded,
+    QueryBudgetTestMixin,
+    query_budget,
+    with_query_budget,
+)
+
+
+@with_query_budget(1)
+def count_genres_twice():
+    return Genre.objects.count() + Genre.objects.count()
+
+
+class TestQueryBudget(QueryBudgetTestMixin, TestCase):
+    def test_count_queries(self):
+        with query_budget(2, "test") as counter:
+            list(Genre.objects.all())
+
+        self.assertEqual(counter.count, 1)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_raise_when_over_budget_and_strict(self):
+        with self.assertRaisesMessage(
+            QueryBudgetExceeded,
+            "count_genres_twice made 2 queries, its budget is 1",
+        ):
+            count_genres_twice()
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_log_when_over_budget(self):
+        with self.assertLogs("movienight.movies.querybudget", "WARNING"):
+            self.assertEqual(count_genres_twice(), 0)
+
+    def test_assert_max_queries(self):
+        with self.assertMaxQueries(2):
+            Genre.objects.count()
+
+        with self.assertRaises(AssertionError):
+            with self.assertMaxQueries(1):
+                count_genres_twice.__wrapped__()
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+
+from django.test import SimpleTestCase, TestCase
+
+from movienight.accounts.tests.factories import UserFactory
+from ..scheduling import UNKNOWN_RUNTIME, find_free_slots, find_free_slots_for_movie
+from .factories import MovieFactory, MovieNightFactory
+
+
+def at(hour):
+    return datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(hours=hour)
+
+
+class TestFindFreeSlots(SimpleTestCase):
+    def test_no_busy_periods(self):
+        self.assertEqual(
+            find_free_slots([], at(0), at(10), timedelta(hours=2)), [(at(0), at(10))]
+        )
+
+    def test_gaps_between_overlapping_periods(self):
+        busy = [(at(1), at(3)), (at(2), at(4)), (at(2), at(3)), (at(6), at(7))]
+
+        self.assertEqual(
+            find_free_slots(busy, at(0), at(10), timedelta(hours=1)),
+            [(at(0), at(1)), (at(4), at(6)), (at(7), at(10))],
+        )
+
+    def test_skip_short_gaps(self):
+        busy = [(at(1), at(3)), (at(4), at(5))]
+
+        self.assertEqual(
+            find_free_slots(busy, at(0), at(10), timedelta(hours=2)),
+            [(at(5), at(10))],
+        )
+
+    def test_periods_past_window(self):
+        busy = [(at(-2), at(1)), (at(8), at(12))]
+
+        self.assertEqual(
+            find_free_slots(busy, at(0), at(10), timedelta(hours=1)),
+            [(at(1), at(8))],
+        )
+
+    def test_window_covered(self):
+        self.assertEqual(
+            find_free_slots([(at(-1), at(11))], at(0), at(10), timedelta(hours=1)), []
+        )
+
+
+class TestFindFreeSlotsForMovie(TestCase):
+    def test_nights_of_all_users(self):
+        users = UserFactory.create_batch(2)
+        other_user = UserFactory.create()
+        movie = MovieFactory.create(runtime_minutes=90)
+        MovieNightFactory.create(
+            creator=users[0], movie=MovieFactory(runtime_minutes=60), start_time=at(1)
+        )
+        MovieNightFactory.create(
+            creator=users[1], movie=MovieFactory(runtime_minutes=None), start_time=at(3)
+        )
+        MovieNightFactory.create(creator=other_user, movie=movie, start_time=at(6))
+
+        with self.assertNumQueries(1):
+            slots = find_free_slots_for_movie(users, movie, at(0), at(10))
+
+        self.assertEqual(slots, [(at(3) + UNKNOWN_RUNTIME, at(10))])
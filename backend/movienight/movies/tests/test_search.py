@@ -0,0 +1,52 @@
+from unittest import skipIf, skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from ..models import Movie
+from ..search import search_movies
+from .factories import MovieFactory
+
+
+@skipIf(connection.vendor == "postgresql", "Uses full-text search on PostgreSQL")
+class TestSearchMovies(TestCase):
+    def test_title_contains_search(self):
+        MovieFactory.create(title="The Matrix")
+        MovieFactory.create(title="Matrix Reloaded")
+        MovieFactory.create(title="Inception")
+
+        movies = search_movies("matrix")
+
+        self.assertEqual(
+            {movie.title for movie in movies}, {"The Matrix", "Matrix Reloaded"}
+        )
+
+    def test_search_within_queryset(self):
+        MovieFactory.create(title="The Matrix", is_full_record=True)
+        MovieFactory.create(title="Matrix Reloaded", is_full_record=False)
+
+        movies = search_movies(
+            "matrix", queryset=Movie.objects.filter(is_full_record=True)
+        )
+
+        self.assertEqual([movie.title for movie in movies], ["The Matrix"])
+
+
+@skipUnless(connection.vendor == "postgresql", "Needs PostgreSQL")
+class TestPostgresSearchMovies(TestCase):
+    def test_rank_title_matches_above_plot_matches(self):
+        MovieFactory.create(title="Inception", plot="A thief enters dreams")
+        MovieFactory.create(title="Dreams", plot="Eight short stories")
+        MovieFactory.create(title="The Matrix", plot="A hacker wakes up")
+
+        movies = search_movies("dreams")
+
+        self.assertEqual([movie.title for movie in movies], ["Dreams", "Inception"])
+
+    def test_match_titles_with_typos(self):
+        MovieFactory.create(title="The Matrix")
+        MovieFactory.create(title="Inception")
+
+        movies = search_movies("the matrx")
+
+        self.assertEqual([movie.title for movie in movies], ["The Matrix"])
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.test import SimpleTestCase
+
+from ..singleflight import AsyncSingleFlight, SingleFlight, get_advisory_lock_id
+
+
+class TestSingleFlight(SimpleTestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fetch(key):
+            calls.append(key)
+            started.set()
+            release.wait(5)
+            return f"result for {key}"
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            leader = executor.submit(flight.do, "tt1", fetch, "tt1")
+            started.wait(5)
+            followers = [
+                executor.submit(flight.do, "tt1", fetch, "tt1") for _ in range(4)
+            ]
+            release.set()
+            results = [leader.result()] + [follower.result() for follower in followers]
+
+        self.assertEqual(calls, ["tt1"])
+        self.assertEqual(results, ["result for tt1"] * 5)
+
+    def test_exception_is_shared(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError("OMDb is down")
+
+        with self.assertRaises(ValueError):
+            flight.do("tt1", fail)
+
+        # Nothing is left behind, so the next call runs again
+        self.assertEqual(flight.do("tt1", lambda: "ok"), "ok")
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight()
+
+        self.assertEqual(flight.do("a", lambda: 1), 1)
+        self.assertEqual(flight.do("b", lambda: 2), 2)
+
+
+class TestAsyncSingleFlight(SimpleTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return f"result for {key}"
+
+        results = await asyncio.gather(
+            *[flight.do("tt1", fetch, "tt1") for _ in range(5)]
+        )
+
+        self.assertEqual(calls, ["tt1"])
+        self.assertEqual(results, ["result for tt1"] * 5)
+
+
+class TestAdvisoryLockId(SimpleTestCase):
+    def test_stable_signed_64_bit(self):
+        lock_id = get_advisory_lock_id("search:star wars")
+
+        self.assertEqual(lock_id, get_advisory_lock_id("search:star wars"))
+        self.assertNotEqual(lock_id, get_advisory_lock_id("search:star trek"))
+        self.assertTrue(-(2**63) <= lock_id < 2**63)
@@ -0,0 +1,219 @@
+import asyncio
+import itertools
+import logging
+import math
+from collections import deque
+
+import httpx
+from asgiref.sync import sync_to_async
+
+from .client import (
+    OMDB_API_URL,
+    RESULTS_PER_PAGE,
+    RETRY_STATUS_CODES,
+    OmdbMovie,
+    get_retry_delay,
+    is_request_limit_response,
+)
+from .ratelimit import INTERACTIVE, RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOmdbClient:
+    """An asyncio version of `OmdbClient`, with the same methods as coroutines/async generators."""
+
+    def __init__(
+        self,
+        api_key,
+        pool_size=10,
+        connect_timeout=3.05,
+        read_timeout=10,
+        max_retries=3,
+        backoff_factor=0.5,
+        max_retry_wait=10,
+        search_workers=1,
+        detail_workers=1,
+        cache=None,
+        rate_limiter=None,
+        transport=None,
+    ):
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_retry_wait = max_retry_wait
+        self.search_workers = search_workers
+        self.detail_workers = detail_workers
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            transport=transport,
+        )
+
+    async def close(self):
+        """Close all the pooled connections."""
+        await self.http.aclose()
+
+    async def make_request(self, params, priority=INTERACTIVE):
+        """
+        Make a GET request to the API, automatically adding the `apikey` to parameters. As with
+        `OmdbClient.make_request`, rate limiting and server errors are retried, waiting for the `rate_limiter` before
+        every attempt.
+        """
+        params["apikey"] = self.api_key
+
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(priority)
+            resp = await self.http.get(OMDB_API_URL, params=params)
+            if (
+                resp.status_code not in RETRY_STATUS_CODES
+                or attempt >= self.max_retries
+            ):
+                break
+            delay = get_retry_delay(
+                resp, attempt, self.backoff_factor, self.max_retry_wait
+            )
+            if delay is None:
+                logger.warning(
+                    "OMDb responded with %d and asked to wait longer than %ss, not retrying",
+                    resp.status_code,
+                    self.max_retry_wait,
+                )
+                break
+            logger.warning(
+                "OMDb responded with %d, retrying in %.2fs", resp.status_code, delay
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        if is_request_limit_response(resp) and self.rate_limiter is not None:
+            logger.error("OMDb daily request limit reached")
+            await sync_to_async(self.rate_limiter.exhaust, thread_sensitive=False)()
+        resp.raise_for_status()
+        return resp
+
+    async def get_json(self, params, priority=INTERACTIVE):
+        """
+        Get the decoded response body for a request to the API. If the client has a `cache` a fresh copy is served from
+        there instead, successful responses are added to it. The cache is SQLite, so it's used from another thread
+        rather than blocking the event loop.
+        """
+        if self.cache is not None:
+            body = await sync_to_async(self.cache.get, thread_sensitive=False)(params)
+            if body is not None:
+                return body
+
+        resp = await self.make_request(params, priority=priority)
+        body = resp.json()
+
+        if self.cache is not None and body.get("Response") == "True":
+            await sync_to_async(self.cache.set, thread_sensitive=False)(params, body)
+        return body
+
+    async def get_by_imdb_id(self, imdb_id, priority=INTERACTIVE):
+        """Get a movie by its IMDB ID"""
+        logger.info("Fetching detail for IMDB ID %s", imdb_id)
+        return OmdbMovie(await self.get_json({"i": imdb_id}, priority=priority))
+
+    async def get_many(self, imdb_ids, max_concurrency=None, priority=INTERACTIVE):
+        """
+        Get many movies by their IMDB IDs, with up to `max_concurrency` requests in flight. As with
+        `OmdbClient.get_many`, movies are yielded as they're fetched and failures are logged and skipped.
+        """
+        if max_concurrency is None:
+            max_concurrency = self.detail_workers
+
+        semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+
+        async def fetch(imdb_id):
+            async with semaphore:
+                try:
+                    return await self.get_by_imdb_id(imdb_id, priority=priority)
+                except httpx.HTTPError:
+                    logger.exception("Failed to fetch detail for IMDB ID %s", imdb_id)
+                    return None
+                except RateLimitExceeded as e:
+                    logger.warning("Skipped detail for IMDB ID %s: %s", imdb_id, e)
+                    return None
+
+        tasks = [
+            asyncio.ensure_future(fetch(imdb_id)) for imdb_id in dict.fromkeys(imdb_ids)
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                movie = await task
+                if movie is not None:
+                    yield movie
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def fetch_search_page(self, search, page, priority=INTERACTIVE):
+        """Fetch a single page of search results, returning the decoded response body."""
+        logger.info("Fetching page %d", page)
+        return await self.get_json(
+            {"s": search, "type": "movie", "page": str(page)}, priority=priority
+        )
+
+    async def search(self, search, max_workers=None, priority=INTERACTIVE):
+        """
+        Search for movies by title. This is an async generator, all results from all pages will be iterated across.
+
+        As with `OmdbClient.search`, after the first page up to `max_workers` pages are fetched concurrently and results
+        are yielded in page order.
+        """
+        if max_workers is None:
+            max_workers = self.search_workers
+
+        logger.info("Performing a search for '%s'", search)
+
+        resp_body = await self.fetch_search_page(search, 1, priority=priority)
+        if resp_body.get("Response") == "False":
+            logger.warning(
+                "No results for '%s': %s", search, resp_body.get("Error", "unknown")
+            )
+            return
+
+        page_count = math.ceil(int(resp_body["totalResults"]) / RESULTS_PER_PAGE)
+
+        for movie in OmdbMovie.from_search_page(resp_body):
+            yield movie
+
+        def fetch_page(page):
+            return asyncio.ensure_future(
+                self.fetch_search_page(search, page, priority=priority)
+            )
+
+        pages = iter(range(2, page_count + 1))
+        # As with `OmdbClient.search`, `max_workers` pages are fetched at a time, with the next one started as each is
+        # read
+        tasks = deque(
+            fetch_page(page) for page in itertools.islice(pages, max(max_workers, 1))
+        )
+        try:
+            while tasks:
+                resp_body = await tasks.popleft()
+                movies = OmdbMovie.from_search_page(resp_body)
+                if not movies:
+                    # As with `OmdbClient.search`, the later pages won't have any either
+                    logger.warning(
+                        "Stopped searching for '%s' at an empty page: %s",
+                        search,
+                        resp_body.get("Error", "no results"),
+                    )
+                    break
+                page = next(pages, None)
+                if page is not None:
+                    tasks.append(fetch_page(page))
+                for movie in movies:
+                    yield movie
+        finally:
+            # If the caller stops iterating early, or a page was empty, don't go on to fetch pages nobody will look at
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,118 @@
+import json
+import logging
+import sqlite3
+import time
+
+from .sqlite import ThreadLocalConnection
+
+logger = logging.getLogger(__name__)
+
+# Refreshing `last_used` is a write, so it's skipped if the entry was used recently. LRU order only needs to be rough.
+TOUCH_INTERVAL = 60
+
+# Eviction needs to scan the `last_used` index, so it's done every so many writes rather than on each one
+EVICT_EVERY = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY, body TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+class OmdbResponseCache:
+    """
+    Stores OMDb response bodies in a SQLite database, so they are shared by every process on the machine and survive
+    restarts. Search pages and detail records have separate TTLs, and once there are more than `max_entries` the least
+    recently used are evicted.
+
+    Any error from SQLite is logged and treated as a cache miss, the cache should never stop a request being made.
+    """
+
+    def __init__(
+        self, path, search_ttl=86400, detail_ttl=86400 * 30, max_entries=100000
+    ):
+        self.path = str(path)
+        self.search_ttl = search_ttl
+        self.detail_ttl = detail_ttl
+        self.max_entries = max_entries
+        self._connections = ThreadLocalConnection(self.path, SCHEMA, timeout=5)
+        self._writes = 0
+
+    @property
+    def connection(self):
+        return self._connections.get()
+
+    @staticmethod
+    def make_key(params):
+        """The request parameters, without the `apikey`, in a stable order."""
+        return json.dumps(
+            {name: str(value) for name, value in params.items() if name != "apikey"},
+            sort_keys=True,
+        )
+
+    def get_ttl(self, params):
+        return self.search_ttl if "s" in params else self.detail_ttl
+
+    def get(self, params):
+        """Get the cached response body for `params`, or `None` if there isn't one or it has expired."""
+        key = self.make_key(params)
+        now = time.time()
+
+        try:
+            row = self.connection.execute(
+                "SELECT body, expires_at, last_used FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            body, expires_at, last_used = row
+            if expires_at <= now:
+                self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+
+            if last_used < now - TOUCH_INTERVAL:
+                self.connection.execute(
+                    "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+                )
+        except sqlite3.Error:
+            logger.exception("Failed to read from the OMDb response cache")
+            return None
+
+        return json.loads(body)
+
+    def set(self, params, body):
+        """Store the response body for `params`."""
+        now = time.time()
+
+        try:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, body, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (
+                    self.make_key(params),
+                    json.dumps(body),
+                    now + self.get_ttl(params),
+                    now,
+                ),
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self.evict()
+        except sqlite3.Error:
+            logger.exception("Failed to write to the OMDb response cache")
+
+    def evict(self):
+        """Delete expired entries, then the least recently used until there are at most `max_entries`."""
+        self.connection.execute(
+            "DELETE FROM responses WHERE expires_at <= ?", (time.time(),)
+        )
+        self.connection.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        self.connection.execute("DELETE FROM responses")
@@ -1,101 +1,386 @@
+import itertools
 import logging
+import math
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .ratelimit import INTERACTIVE, RateLimitExceeded
 
 logger = logging.getLogger(__name__)
 
 OMDB_API_URL = "https://www.omdbapi.com/"
 
+# OMDb answers 401 once the daily quota is used up, retrying that doesn't help so only rate limiting and server errors
+# are retried.
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+RESULTS_PER_PAGE = 10
+
+
+# OMDb uses this for any value it doesn't know
+NOT_AVAILABLE = "N/A"
+
+YEAR_RE = re.compile(r"\d{4}")
+
+# Marks keys that are only in a detail response, so they can't be read from a search result
+_DETAIL_ONLY = object()
+
+
+def parse_year(value):
+    """Parse a year, for a series this is a range like "2010–2014" or "2010–" so the first year is used."""
+    match = YEAR_RE.match(value or "")
+    return int(match.group()) if match else None
+
+
+def parse_runtime_minutes(value):
+    if not value or value == NOT_AVAILABLE:
+        return None
+
+    try:
+        rt, units = value.split(" ")
+    except ValueError:
+        return None
+
+    if units != "min":
+        logger.warning("Expected units 'min' for runtime. Got '%s'", units)
+        return None
+
+    return int(rt)
+
+
+def parse_genres(value):
+    if not value or value == NOT_AVAILABLE:
+        return []
+    return value.split(", ")
+
+
+def parse_text(value):
+    return None if value == NOT_AVAILABLE else value
+
 
 class OmdbMovie:
-    """A simple class to represent movie data coming back from OMDb and transform to Python types."""
+    """
+    A simple class to represent movie data coming back from OMDb and transform to Python types. Only the fields that are
+    used are kept, and they're parsed when it's created. Values OMDb doesn't know ("N/A") become `None`, or `[]` for
+    genres.
+    """
+
+    # Bulk imports hold a lot of these at once, so no per-instance __dict__
+    __slots__ = ("imdb_id", "title", "year", "_runtime_minutes", "_genres", "_plot")
 
     def __init__(self, data):
         """Data is the raw JSON/dict returned from OMDb"""
-        self.data = data
+        self.imdb_id = data.get("imdbID")
+        self.title = parse_text(data.get("Title"))
+        self.year = parse_year(data.get("Year"))
+        self._runtime_minutes = (
+            parse_runtime_minutes(data["Runtime"])
+            if "Runtime" in data
+            else _DETAIL_ONLY
+        )
+        self._genres = parse_genres(data["Genre"]) if "Genre" in data else _DETAIL_ONLY
+        self._plot = parse_text(data["Plot"]) if "Plot" in data else _DETAIL_ONLY
+
+    @classmethod
+    def from_search_page(cls, resp_body):
+        """Create an `OmdbMovie` for each result in a page of search results."""
+        return [cls(movie) for movie in resp_body.get("Search", [])]
 
-    def check_for_detail_data_key(self, key):
+    @staticmethod
+    def check_for_detail_data_key(key, value):
         """Some keys are only in the detail response, raise an exception if the key is not found."""
-        if key not in self.data:
+        if value is _DETAIL_ONLY:
             raise AttributeError(
                 f"{key} is not in data, please make sure this is a detail response."
             )
+        return value
 
     @property
-    def imdb_id(self):
-        return self.data["imdbID"]
-
-    @property
-    def title(self):
-        return self.data["Title"]
+    def runtime_minutes(self):
+        return self.check_for_detail_data_key("Runtime", self._runtime_minutes)
 
     @property
-    def year(self):
-        return int(self.data["Year"])
+    def genres(self):
+        return self.check_for_detail_data_key("Genre", self._genres)
 
     @property
-    def runtime_minutes(self):
-        self.check_for_detail_data_key("Runtime")
-
-        try:
-            rt, units = self.data["Runtime"].split(" ")
-        except ValueError:
-            return None
+    def plot(self):
+        return self.check_for_detail_data_key("Plot", self._plot)
 
-        if units != "min":
-            raise ValueError(f"Expected units 'min' for runtime. Got '{units}")
+    def __repr__(self):
+        return f"<OmdbMovie {self.imdb_id}: {self.title} ({self.year})>"
 
-        return int(rt)
 
-    @property
-    def genres(self):
-        self.check_for_detail_data_key("Genre")
+def is_request_limit_response(resp):
+    """OMDb responds with a 401 and this error once the API key's daily limit has been reached."""
+    if resp.status_code != 401:
+        return False
+    try:
+        return "limit" in resp.json().get("Error", "").lower()
+    except ValueError:
+        return False
 
-        return self.data["Genre"].split(", ")
 
-    @property
-    def plot(self):
-        self.check_for_detail_data_key("Plot")
-        return self.data["Plot"]
+def get_retry_delay(resp, attempt, backoff_factor, max_wait):
+    """
+    Seconds to wait before retrying `resp`, honouring a numeric `Retry-After` header if OMDb sends one. If that's longer
+    than `max_wait` it isn't worth retrying, so `None` is returned, rather than hold the caller up for as long as OMDb
+    says.
+    """
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        retry_after = int(retry_after)
+        return retry_after if retry_after <= max_wait else None
+    return backoff_factor * (2**attempt)
 
 
 class OmdbClient:
-    def __init__(self, api_key):
+    def __init__(
+        self,
+        api_key,
+        pool_size=10,
+        connect_timeout=3.05,
+        read_timeout=10,
+        max_retries=3,
+        backoff_factor=0.5,
+        max_retry_wait=10,
+        search_workers=1,
+        detail_workers=1,
+        cache=None,
+        rate_limiter=None,
+    ):
         self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_retry_wait = max_retry_wait
+        self.search_workers = search_workers
+        self.detail_workers = detail_workers
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = self.build_session(pool_size, max_retries, backoff_factor)
+
+    @staticmethod
+    def build_session(pool_size, max_retries, backoff_factor):
+        """
+        Build a `requests.Session` that keeps up to `pool_size` connections to OMDb alive, so that consecutive requests
+        don't pay for a new TCP and TLS handshake. It only retries failed connections, with exponential backoff, as
+        they never reach OMDb. Anything that might have been counted by OMDb is retried by `make_request`, through the
+        rate limiter.
+        """
+        retry = Retry(
+            total=max_retries,
+            read=0,
+            status=0,
+            backoff_factor=backoff_factor,
+            allowed_methods=frozenset(["GET"]),
+            # Hand back the response rather than raising, `make_request` decides whether to retry it
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
 
-    def make_request(self, params):
-        """Make a GET request to the API, automatically adding the `apikey` to parameters."""
+    def close(self):
+        """Close all the pooled connections."""
+        self.session.close()
+
+    def make_request(self, params, priority=INTERACTIVE):
+        """
+        Make a GET request to the API, automatically adding the `apikey` to parameters. Rate limiting and server errors
+        are retried up to `max_retries` times with exponential backoff. If the client has a `rate_limiter`, waits for
+        it to allow a request of `priority` before every attempt, as each one counts against the quota.
+        """
         params["apikey"] = self.api_key
 
-        resp = requests.get(OMDB_API_URL, params=params)
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(priority)
+            resp = self.session.get(OMDB_API_URL, params=params, timeout=self.timeout)
+            if (
+                resp.status_code not in RETRY_STATUS_CODES
+                or attempt >= self.max_retries
+            ):
+                break
+            delay = get_retry_delay(
+                resp, attempt, self.backoff_factor, self.max_retry_wait
+            )
+            if delay is None:
+                logger.warning(
+                    "OMDb responded with %d and asked to wait longer than %ss, not retrying",
+                    resp.status_code,
+                    self.max_retry_wait,
+                )
+                break
+            logger.warning(
+                "OMDb responded with %d, retrying in %.2fs", resp.status_code, delay
+            )
+            time.sleep(delay)
+            attempt += 1
+
+        if is_request_limit_response(resp) and self.rate_limiter is not None:
+            logger.error("OMDb daily request limit reached")
+            self.rate_limiter.exhaust()
         resp.raise_for_status()
         return resp
 
-    def get_by_imdb_id(self, imdb_id):
+    def get_json(self, params, priority=INTERACTIVE):
+        """
+        Get the decoded response body for a request to the API. If the client has a `cache` a fresh copy is served from
+        there instead, successful responses are added to it.
+        """
+        if self.cache is not None:
+            body = self.cache.get(params)
+            if body is not None:
+                return body
+
+        resp = self.make_request(params, priority=priority)
+        body = resp.json()
+
+        if self.cache is not None and body.get("Response") == "True":
+            self.cache.set(params, body)
+        return body
+
+    def get_by_imdb_id(self, imdb_id, priority=INTERACTIVE):
         """Get a movie by its IMDB ID"""
         logger.info("Fetching detail for IMDB ID %s", imdb_id)
-        resp = self.make_request({"i": imdb_id})
-        return OmdbMovie(resp.json())
+        return OmdbMovie(self.get_json({"i": imdb_id}, priority=priority))
+
+    def get_many(self, imdb_ids, max_concurrency=None, priority=INTERACTIVE):
+        """
+        Get many movies by their IMDB IDs, fetching up to `max_concurrency` (defaults to the client's `detail_workers`) at
+        once. This is a generator that yields each movie as soon as it has been fetched, so not necessarily in the order
+        of `imdb_ids`. IDs that fail to fetch are logged and skipped, if the rate limiter refuses a request the rest are
+        abandoned.
+        """
+        if max_concurrency is None:
+            max_concurrency = self.detail_workers
 
-    def search(self, search):
-        """Search for movies by title. This is a generator so all results from all pages will be iterated across."""
-        page = 1
-        seen_results = 0
-        total_results = None
+        imdb_ids = list(dict.fromkeys(imdb_ids))
+        if not imdb_ids:
+            return
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(max_concurrency, len(imdb_ids)),
+            thread_name_prefix="omdb-detail",
+        )
+        try:
+            futures = {
+                executor.submit(self.get_by_imdb_id, imdb_id, priority): imdb_id
+                for imdb_id in imdb_ids
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except requests.RequestException:
+                    logger.exception(
+                        "Failed to fetch detail for IMDB ID %s", futures[future]
+                    )
+                except RateLimitExceeded as e:
+                    logger.warning("Stopped fetching details: %s", e)
+                    break
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def fetch_search_page(self, search, page, priority=INTERACTIVE):
+        """Fetch a single page of search results, returning the decoded response body."""
+        logger.info("Fetching page %d", page)
+        return self.get_json(
+            {"s": search, "type": "movie", "page": str(page)}, priority=priority
+        )
+
+    def search(self, search, max_workers=None, priority=INTERACTIVE):
+        """
+        Search for movies by title. This is a generator so all results from all pages will be iterated across.
+
+        The first page says how many results there are in total, so with `max_workers` greater than 1 (defaults to the
+        client's `search_workers`) the remaining pages are fetched concurrently. Results are still yielded in page order.
+        """
+        if max_workers is None:
+            max_workers = self.search_workers
 
         logger.info("Performing a search for '%s'", search)
 
-        while True:
-            logger.info("Fetching page %d", page)
-            resp = self.make_request({"s": search, "type": "movie", "page": str(page)})
-            resp_body = resp.json()
-            if total_results is None:
-                total_results = int(resp_body["totalResults"])
+        resp_body = self.fetch_search_page(search, 1, priority=priority)
+        if resp_body.get("Response") == "False":
+            logger.warning(
+                "No results for '%s': %s", search, resp_body.get("Error", "unknown")
+            )
+            return
+
+        total_results = int(resp_body["totalResults"])
+        page_count = math.ceil(total_results / RESULTS_PER_PAGE)
 
-            for movie in resp_body["Search"]:
-                seen_results += 1
-                yield OmdbMovie(movie)
+        yield from OmdbMovie.from_search_page(resp_body)
 
-            if seen_results >= total_results:
+        if page_count <= 1:
+            return
+
+        if max_workers > 1:
+            yield from self._search_remaining_pages_concurrently(
+                search, page_count, max_workers, priority
+            )
+            return
+
+        seen_results = len(resp_body["Search"])
+        page = 2
+
+        while seen_results < total_results:
+            resp_body = self.fetch_search_page(search, page, priority=priority)
+            movies = OmdbMovie.from_search_page(resp_body)
+            if not movies:
                 break
 
+            seen_results += len(movies)
+            yield from movies
+
             page += 1
+
+    def _search_remaining_pages_concurrently(
+        self, search, page_count, max_workers, priority
+    ):
+        executor = ThreadPoolExecutor(
+            max_workers=min(max_workers, page_count - 1),
+            thread_name_prefix="omdb-search",
+        )
+        pages = iter(range(2, page_count + 1))
+        # Pages being fetched, in page order. Only `max_workers` are submitted at a time, with the next one submitted as
+        # each is read, so the search can stop at an empty page without having asked for the rest.
+        futures = deque(
+            executor.submit(self.fetch_search_page, search, page, priority=priority)
+            for page in itertools.islice(pages, max_workers)
+        )
+        try:
+            while futures:
+                resp_body = futures.popleft().result()
+                movies = OmdbMovie.from_search_page(resp_body)
+                if not movies:
+                    # An error, or past the end if the total was wrong, the later pages won't have any either
+                    logger.warning(
+                        "Stopped searching for '%s' at an empty page: %s",
+                        search,
+                        resp_body.get("Error", "no results"),
+                    )
+                    break
+                page = next(pages, None)
+                if page is not None:
+                    futures.append(
+                        executor.submit(
+                            self.fetch_search_page, search, page, priority=priority
+                        )
+                    )
+                yield from movies
+        finally:
+            # If the caller stops iterating early, or a page was empty, don't go on to fetch pages nobody will look at
+            executor.shutdown(cancel_futures=True)
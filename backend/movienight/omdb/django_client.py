@@ -1,8 +1,119 @@
+import asyncio
+import threading
+import weakref
+
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
+from .async_client import AsyncOmdbClient
+from .cache import OmdbResponseCache
 from .client import OmdbClient
+from .ratelimit import RateLimiter
+
+_client = None
+_cache = None
+_rate_limiter = None
+# An httpx client can only be used from the event loop it was created in, so there's one per loop
+_async_clients = weakref.WeakKeyDictionary()
+_client_lock = threading.RLock()
+
+
+def get_cache_from_settings():
+    """The process-wide OmdbResponseCache, or `None` if OMDB_CACHE_PATH isn't set."""
+    global _cache
+
+    if _cache is None and settings.OMDB_CACHE_PATH:
+        with _client_lock:
+            if _cache is None:
+                _cache = OmdbResponseCache(
+                    settings.OMDB_CACHE_PATH,
+                    search_ttl=settings.OMDB_CACHE_SEARCH_TTL,
+                    detail_ttl=settings.OMDB_CACHE_DETAIL_TTL,
+                    max_entries=settings.OMDB_CACHE_MAX_ENTRIES,
+                )
+    return _cache
+
+
+def get_rate_limiter_from_settings():
+    """The process-wide RateLimiter, or `None` if OMDB_RATE_LIMIT_PATH isn't set."""
+    global _rate_limiter
+
+    if _rate_limiter is None and settings.OMDB_RATE_LIMIT_PATH:
+        with _client_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(
+                    settings.OMDB_RATE_LIMIT_PATH,
+                    rate=settings.OMDB_RATE_LIMIT_PER_SECOND,
+                    burst=settings.OMDB_RATE_LIMIT_BURST,
+                    daily_limit=settings.OMDB_DAILY_LIMIT,
+                    background_reserve=settings.OMDB_BACKGROUND_RESERVE,
+                    max_wait=settings.OMDB_RATE_LIMIT_MAX_WAIT,
+                )
+    return _rate_limiter
+
+
+def get_client_options_from_settings():
+    """The keyword arguments shared by `OmdbClient` and `AsyncOmdbClient`, read from the OMDB_* Django settings."""
+    return {
+        "cache": get_cache_from_settings(),
+        "rate_limiter": get_rate_limiter_from_settings(),
+        "pool_size": settings.OMDB_POOL_SIZE,
+        "connect_timeout": settings.OMDB_CONNECT_TIMEOUT,
+        "read_timeout": settings.OMDB_READ_TIMEOUT,
+        "max_retries": settings.OMDB_MAX_RETRIES,
+        "backoff_factor": settings.OMDB_RETRY_BACKOFF,
+        "max_retry_wait": settings.OMDB_RATE_LIMIT_MAX_WAIT,
+        "search_workers": settings.OMDB_SEARCH_WORKERS,
+        "detail_workers": settings.OMDB_DETAIL_WORKERS,
+    }
 
 
 def get_client_from_settings():
-    """Create an instance of an OmdbClient using the OMDB_KEY from the Django settings."""
-    return OmdbClient(settings.OMDB_KEY)
+    """
+    Get the process-wide OmdbClient, created on first use from the OMDB_* Django settings. The client (and its pool of
+    keep-alive connections) is shared by all threads in the process.
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OmdbClient(
+                    settings.OMDB_KEY, **get_client_options_from_settings()
+                )
+    return _client
+
+
+def get_async_client_from_settings():
+    """Get the AsyncOmdbClient for the running event loop, created on first use from the OMDB_* Django settings."""
+    loop = asyncio.get_running_loop()
+
+    with _client_lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = AsyncOmdbClient(
+                settings.OMDB_KEY, **get_client_options_from_settings()
+            )
+            _async_clients[loop] = client
+    return client
+
+
+def reset_client():
+    """Close and discard the shared clients, the next call to `get_client_from_settings` creates a new one."""
+    global _client, _cache, _rate_limiter
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _cache = None
+        _rate_limiter = None
+        # Async clients can only be closed from their own loop, so they're just dropped
+        _async_clients.clear()
+
+
+@receiver(setting_changed)
+def reset_client_on_setting_changed(setting, **kwargs):
+    if setting.startswith("OMDB_"):
+        reset_client()
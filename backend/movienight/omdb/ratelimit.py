@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from asgiref.sync import sync_to_async
+
+from .sqlite import ThreadLocalConnection
+
+logger = logging.getLogger(__name__)
+
+# Request priorities. Interactive requests (a user waiting on a search) may use the whole budget, background ones (like
+# filling in movie details) leave a reserve so they can't starve interactive requests.
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    id INTEGER PRIMARY KEY CHECK (id = 1), tokens REAL NOT NULL, updated_at REAL NOT NULL, day TEXT NOT NULL,
+    used INTEGER NOT NULL
+);
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request can't be made, because the daily budget is used up or it would have to wait too long."""
+
+
+class RateLimiterStats:
+    """Counters of how much time this process has spent waiting on the rate limiter."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.rejected = 0
+
+    def record(self, waited):
+        with self._lock:
+            self.requests += 1
+            if waited > 0:
+                self.waits += 1
+                self.wait_seconds += waited
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+                "rejected": self.rejected,
+            }
+
+
+class RateLimiter:
+    """
+    A token bucket rate limiter with a daily budget, whose state is kept in a SQLite database so that it is shared by
+    every process (web workers, management commands) using the same file. Refills at `rate` requests per second, up to a
+    burst of `burst` requests.
+
+    `BACKGROUND` requests can't use the last `background_reserve` fraction of the bucket or of the daily budget.
+    """
+
+    def __init__(
+        self,
+        path,
+        rate=5.0,
+        burst=10,
+        daily_limit=1000,
+        background_reserve=0.2,
+        max_wait=10,
+    ):
+        self.path = str(path)
+        self.rate = rate
+        self.burst = burst
+        self.daily_limit = daily_limit
+        self.background_reserve = background_reserve
+        self.max_wait = max_wait
+        self.stats = RateLimiterStats()
+        self._connections = ThreadLocalConnection(self.path, SCHEMA, timeout=10)
+
+    @property
+    def connection(self):
+        return self._connections.get()
+
+    @staticmethod
+    def get_day(now):
+        """OMDb budgets are per day, the day is taken to be in UTC."""
+        return datetime.fromtimestamp(now, tz=timezone.utc).date().isoformat()
+
+    def get_daily_limit(self, priority=INTERACTIVE):
+        if priority == BACKGROUND:
+            return int(self.daily_limit * (1 - self.background_reserve))
+        return self.daily_limit
+
+    def reserve(self, priority=INTERACTIVE):
+        """
+        Try to take a token for one request. Returns 0 if a token was taken, otherwise the number of seconds to wait
+        before trying again. Raises `RateLimitExceeded` if the daily budget for `priority` is used up.
+        """
+        daily_limit = self.get_daily_limit(priority)
+        floor = self.burst * self.background_reserve if priority == BACKGROUND else 0
+
+        now = time.time()
+        today = self.get_day(now)
+        connection = self.connection
+
+        # IMMEDIATE takes the write lock straight away, so no other process can read the bucket until we're done
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT tokens, updated_at, day, used FROM bucket WHERE id = 1"
+            ).fetchone()
+            if row is None:
+                tokens, used = self.burst, 0
+            else:
+                tokens, updated_at, day, used = row
+                tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+                if day != today:
+                    used = 0
+
+            if used >= daily_limit:
+                raise RateLimitExceeded(
+                    f"Daily OMDb budget of {daily_limit} {priority} requests is used up."
+                )
+
+            if tokens - 1 >= floor:
+                tokens -= 1
+                used += 1
+                wait = 0
+            else:
+                wait = (floor + 1 - tokens) / self.rate
+
+            connection.execute(
+                "INSERT OR REPLACE INTO bucket (id, tokens, updated_at, day, used) VALUES (1, ?, ?, ?, ?)",
+                (tokens, now, today, used),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        return wait
+
+    def _check_wait(self, waited, wait):
+        if waited + wait > self.max_wait:
+            raise RateLimitExceeded(
+                f"Would have to wait more than {self.max_wait}s for an OMDb request."
+            )
+
+    def acquire(self, priority=INTERACTIVE):
+        """Block until a request with `priority` can be made."""
+        waited = 0
+        try:
+            while wait := self.reserve(priority):
+                self._check_wait(waited, wait)
+                time.sleep(wait)
+                waited += wait
+        except RateLimitExceeded:
+            self.stats.record_rejected()
+            raise
+        self.stats.record(waited)
+        if waited:
+            logger.info("Waited %.2fs for a %s OMDb request", waited, priority)
+
+    async def acquire_async(self, priority=INTERACTIVE):
+        """
+        Like `acquire`, but waits without blocking the event loop. The bucket is read and written on another thread, as
+        that can block on other processes holding the SQLite lock.
+        """
+        reserve = sync_to_async(self.reserve, thread_sensitive=False)
+        waited = 0
+        try:
+            while wait := await reserve(priority):
+                self._check_wait(waited, wait)
+                await asyncio.sleep(wait)
+                waited += wait
+        except RateLimitExceeded:
+            self.stats.record_rejected()
+            raise
+        self.stats.record(waited)
+        if waited:
+            logger.info("Waited %.2fs for a %s OMDb request", waited, priority)
+
+    def exhaust(self):
+        """Mark today's budget as used up, e.g. because OMDb has said so even though our count disagrees."""
+        now = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO bucket (id, tokens, updated_at, day, used) VALUES (1, 0, ?, ?, ?)",
+            (now, self.get_day(now), self.daily_limit),
+        )
+
+    def usage(self):
+        """How many requests have been made today, out of the daily budget."""
+        row = self.connection.execute(
+            "SELECT day, used FROM bucket WHERE id = 1"
+        ).fetchone()
+        used = row[1] if row and row[0] == self.get_day(time.time()) else 0
+        return {"used": used, "daily_limit": self.daily_limit}
+
+    def remaining(self, priority=INTERACTIVE):
+        """How many more requests with `priority` the daily budget allows today."""
+        return max(0, self.get_daily_limit(priority) - self.usage()["used"])
+
+    def get_reset_time(self):
+        """When the daily budget is next reset, the start of the next day in UTC."""
+        tomorrow = datetime.now(timezone.utc).date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time(), tzinfo=timezone.utc)
@@ -0,0 +1,28 @@
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """
+    A connection to the SQLite database at `path` for each thread, as SQLite connections can't be shared between them.
+    They're in autocommit mode, so transactions have to be begun explicitly, and use WAL so readers don't block the
+    writer. `schema` is run on each new connection, so it should only create things if they don't exist.
+    """
+
+    def __init__(self, path, schema, timeout=5):
+        self.path = str(path)
+        self.schema = schema
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self):
+        """This thread's connection, opened the first time it's needed."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(self.schema)
+            self._local.connection = connection
+        return connection
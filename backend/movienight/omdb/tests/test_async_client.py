@@ -0,0 +1,131 @@
+import threading
+
+import httpx
+from unittest.mock import AsyncMock, MagicMock, patch
+from django.test import SimpleTestCase
+
+from ..async_client import AsyncOmdbClient
+from .test_client import make_search_page
+
+
+class TestAsyncOmdbClient(SimpleTestCase):
+    def make_client(self, handler, **kwargs):
+        return AsyncOmdbClient(
+            "abc123", transport=httpx.MockTransport(handler), **kwargs
+        )
+
+    async def test_get_by_imdb_id(self):
+        def handler(request):
+            self.assertEqual(request.url.params["i"], "tt0133093")
+            self.assertEqual(request.url.params["apikey"], "abc123")
+            return httpx.Response(
+                200, json={"imdbID": "tt0133093", "Title": "The Matrix"}
+            )
+
+        client = self.make_client(handler)
+
+        movie = await client.get_by_imdb_id("tt0133093")
+
+        self.assertEqual(movie.imdb_id, "tt0133093")
+        self.assertEqual(movie.title, "The Matrix")
+
+    async def test_cache_used_off_the_event_loop(self):
+        def handler(request):
+            return httpx.Response(
+                200,
+                json={"imdbID": "tt0133093", "Title": "The Matrix", "Response": "True"},
+            )
+
+        cache_threads = []
+        cache = MagicMock()
+        cache.get.side_effect = lambda params: cache_threads.append(
+            threading.get_ident()
+        )
+        cache.set.side_effect = lambda params, body: cache_threads.append(
+            threading.get_ident()
+        )
+        client = self.make_client(handler, cache=cache)
+
+        await client.get_by_imdb_id("tt0133093")
+
+        cache.set.assert_called_once()
+        self.assertEqual(len(cache_threads), 2)
+        self.assertNotIn(threading.get_ident(), cache_threads)
+
+    async def test_search_concurrent_keeps_page_order(self):
+        def handler(request):
+            return httpx.Response(
+                200, json=make_search_page(int(request.url.params["page"]), 45)
+            )
+
+        client = self.make_client(handler, search_workers=3)
+
+        movies = [movie async for movie in client.search("movie")]
+
+        self.assertEqual(
+            [movie.imdb_id for movie in movies], [f"tt{n:07d}" for n in range(45)]
+        )
+
+    async def test_search_concurrent_stops_at_empty_page(self):
+        pages = []
+
+        def handler(request):
+            page = int(request.url.params["page"])
+            pages.append(page)
+            if page == 3:
+                return httpx.Response(
+                    200, json={"Response": "False", "Error": "Too many results."}
+                )
+            return httpx.Response(200, json=make_search_page(page, 95))
+
+        client = self.make_client(handler, search_workers=2)
+
+        movies = [movie async for movie in client.search("movie")]
+
+        self.assertEqual(
+            [movie.imdb_id for movie in movies], [f"tt{n:07d}" for n in range(20)]
+        )
+        # Page 4 was started when page 2 was read, nothing after it
+        self.assertLessEqual(len(pages), 4)
+
+    @patch("movienight.omdb.async_client.asyncio.sleep")
+    async def test_retry_on_server_error(self, mock_sleep):
+        responses = [httpx.Response(503), httpx.Response(200, json={"imdbID": "tt1"})]
+
+        client = self.make_client(lambda request: responses.pop(0), backoff_factor=1)
+
+        movie = await client.get_by_imdb_id("tt1")
+
+        self.assertEqual(movie.imdb_id, "tt1")
+        mock_sleep.assert_called_once_with(1)
+
+    @patch("movienight.omdb.async_client.asyncio.sleep")
+    async def test_acquire_before_every_attempt(self, mock_sleep):
+        responses = [httpx.Response(429), httpx.Response(200, json={"imdbID": "tt1"})]
+        rate_limiter = MagicMock(acquire_async=AsyncMock())
+
+        client = self.make_client(
+            lambda request: responses.pop(0), rate_limiter=rate_limiter
+        )
+
+        await client.get_by_imdb_id("tt1")
+
+        self.assertEqual(rate_limiter.acquire_async.await_count, 2)
+
+    @patch("movienight.omdb.async_client.asyncio.sleep")
+    async def test_no_retry_when_retry_after_too_long(self, mock_sleep):
+        client = self.make_client(
+            lambda request: httpx.Response(429, headers={"Retry-After": "3600"}),
+            max_retry_wait=10,
+        )
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await client.get_by_imdb_id("tt1")
+
+        mock_sleep.assert_not_called()
+
+    async def test_raise_when_retries_exhausted(self):
+        client = self.make_client(lambda request: httpx.Response(401), max_retries=0)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await client.get_by_imdb_id("tt1")
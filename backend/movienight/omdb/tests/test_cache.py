@@ -0,0 +1,83 @@
+import tempfile
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from django.test import SimpleTestCase
+
+from ..cache import OmdbResponseCache
+from ..client import OmdbClient
+
+
+class TestOmdbResponseCache(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache = OmdbResponseCache(
+            Path(tmp_dir.name) / "cache.sqlite3",
+            search_ttl=60,
+            detail_ttl=600,
+            max_entries=3,
+        )
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get({"i": "tt1"}))
+
+    def test_set_and_get_ignores_apikey(self):
+        self.cache.set({"i": "tt1", "apikey": "abc123"}, {"Title": "The Matrix"})
+
+        self.assertEqual(
+            self.cache.get({"apikey": "other", "i": "tt1"}), {"Title": "The Matrix"}
+        )
+
+    @patch("movienight.omdb.cache.time.time")
+    def test_search_and_detail_ttls(self, mock_time):
+        mock_time.return_value = 1000
+        self.cache.set({"s": "matrix", "page": "1"}, {"Search": []})
+        self.cache.set({"i": "tt1"}, {"Title": "The Matrix"})
+
+        mock_time.return_value = 1100
+
+        self.assertIsNone(self.cache.get({"s": "matrix", "page": "1"}))
+        self.assertEqual(self.cache.get({"i": "tt1"}), {"Title": "The Matrix"})
+
+    @patch("movienight.omdb.cache.time.time")
+    def test_evict_least_recently_used(self, mock_time):
+        for n in range(5):
+            mock_time.return_value = 1000 + n * 100
+            self.cache.set({"i": f"tt{n}"}, {"imdbID": f"tt{n}"})
+        # Using tt0 makes tt1 and tt2 the least recently used
+        self.cache.get({"i": "tt0"})
+
+        self.cache.evict()
+
+        self.assertEqual(
+            [n for n in range(5) if self.cache.get({"i": f"tt{n}"}) is not None],
+            [0, 3, 4],
+        )
+
+    def test_client_uses_cache(self):
+        client = OmdbClient("abc123", cache=self.cache)
+        client.make_request = MagicMock()
+        client.make_request.return_value.json.return_value = {
+            "imdbID": "tt0133093",
+            "Title": "The Matrix",
+            "Response": "True",
+        }
+
+        first = client.get_by_imdb_id("tt0133093")
+        second = client.get_by_imdb_id("tt0133093")
+
+        client.make_request.assert_called_once()
+        self.assertEqual(first.title, second.title)
+
+    def test_client_does_not_cache_errors(self):
+        client = OmdbClient("abc123", cache=self.cache)
+        client.make_request = MagicMock()
+        client.make_request.return_value.json.return_value = {
+            "Response": "False",
+            "Error": "Movie not found!",
+        }
+
+        list(client.search("not a movie"))
+        list(client.search("not a movie"))
+
+        self.assertEqual(client.make_request.call_count, 2)
@@ -0,0 +1,290 @@
+import requests
+from unittest.mock import patch, MagicMock
+from django.test import SimpleTestCase
+
+from ..client import OmdbClient, OmdbMovie, OMDB_API_URL
+from ..ratelimit import INTERACTIVE, BACKGROUND, RateLimitExceeded
+
+
+class TestOmdbMovie(SimpleTestCase):
+    def test_detail_response(self):
+        movie = OmdbMovie(
+            {
+                "Title": "The Matrix",
+                "Year": "1999",
+                "Runtime": "136 min",
+                "Genre": "Action, Sci-Fi",
+                "Plot": "A computer hacker learns about the true nature of reality.",
+                "imdbID": "tt0133093",
+                "Response": "True",
+            }
+        )
+
+        self.assertEqual(movie.imdb_id, "tt0133093")
+        self.assertEqual(movie.title, "The Matrix")
+        self.assertEqual(movie.year, 1999)
+        self.assertEqual(movie.runtime_minutes, 136)
+        self.assertEqual(movie.genres, ["Action", "Sci-Fi"])
+        self.assertEqual(
+            movie.plot, "A computer hacker learns about the true nature of reality."
+        )
+        self.assertFalse(hasattr(movie, "__dict__"))
+
+    def test_not_available_values(self):
+        movie = OmdbMovie(
+            {
+                "Title": "Unknown",
+                "Year": "N/A",
+                "Runtime": "N/A",
+                "Genre": "N/A",
+                "Plot": "N/A",
+                "imdbID": "tt1",
+            }
+        )
+
+        self.assertIsNone(movie.year)
+        self.assertIsNone(movie.runtime_minutes)
+        self.assertEqual(movie.genres, [])
+        self.assertIsNone(movie.plot)
+
+    def test_year_range(self):
+        self.assertEqual(OmdbMovie({"Year": "2010–2014"}).year, 2010)
+        self.assertEqual(OmdbMovie({"Year": "2010–"}).year, 2010)
+
+    def test_unexpected_runtime_units(self):
+        self.assertIsNone(OmdbMovie({"Runtime": "2 h"}).runtime_minutes)
+
+    def test_detail_only_keys_missing_from_search_result(self):
+        movie = OmdbMovie({"Title": "The Matrix", "Year": "1999", "imdbID": "tt1"})
+
+        for attribute in ("runtime_minutes", "genres", "plot"):
+            with self.assertRaises(AttributeError):
+                getattr(movie, attribute)
+
+    def test_from_search_page(self):
+        movies = OmdbMovie.from_search_page(make_search_page(1, 3))
+
+        self.assertEqual(
+            [movie.imdb_id for movie in movies], ["tt0000000", "tt0000001", "tt0000002"]
+        )
+        self.assertEqual(OmdbMovie.from_search_page({"Response": "False"}), [])
+
+
+class TestOmdbClientSession(SimpleTestCase):
+    def test_session_is_pooled_and_retries(self):
+        client = OmdbClient("abc123", pool_size=7, max_retries=4, backoff_factor=0.25)
+
+        adapter = client.session.get_adapter(OMDB_API_URL)
+
+        self.assertEqual(adapter._pool_maxsize, 7)
+        self.assertEqual(adapter.max_retries.total, 4)
+        self.assertEqual(adapter.max_retries.backoff_factor, 0.25)
+        # Only connection errors, the rest are retried by `make_request` through the rate limiter
+        self.assertEqual(adapter.max_retries.read, 0)
+        self.assertEqual(adapter.max_retries.status, 0)
+
+    def test_make_request_uses_session_with_timeouts(self):
+        client = OmdbClient("abc123", connect_timeout=1, read_timeout=2)
+        client.session = MagicMock()
+
+        resp = client.make_request({"i": "tt0133093"})
+
+        client.session.get.assert_called_once_with(
+            OMDB_API_URL,
+            params={"i": "tt0133093", "apikey": "abc123"},
+            timeout=(1, 2),
+        )
+        resp.raise_for_status.assert_called_once()
+        self.assertEqual(resp, client.session.get.return_value)
+
+
+def make_search_page(page, total_results):
+    """Build an OMDb search response body for `page`, with 10 results per page."""
+    first = (page - 1) * 10
+    last = min(first + 10, total_results)
+    return {
+        "Search": [
+            {"Title": f"Movie {n}", "Year": "2000", "imdbID": f"tt{n:07d}"}
+            for n in range(first, last)
+        ],
+        "totalResults": str(total_results),
+        "Response": "True",
+    }
+
+
+class TestOmdbClientSearch(SimpleTestCase):
+    def setUp(self):
+        self.client = OmdbClient("abc123")
+
+    def fake_pages(self, total_results):
+        def fetch_search_page(search, page, priority):
+            return make_search_page(page, total_results)
+
+        return patch.object(
+            self.client, "fetch_search_page", side_effect=fetch_search_page
+        )
+
+    def test_search_sequential(self):
+        with self.fake_pages(25) as mock_fetch_search_page:
+            movies = list(self.client.search("movie", max_workers=1))
+
+        self.assertEqual(
+            [movie.imdb_id for movie in movies], [f"tt{n:07d}" for n in range(25)]
+        )
+        self.assertEqual(mock_fetch_search_page.call_count, 3)
+
+    def test_search_concurrent_keeps_page_order(self):
+        with self.fake_pages(95) as mock_fetch_search_page:
+            movies = list(self.client.search("movie", max_workers=4))
+
+        self.assertEqual(
+            [movie.imdb_id for movie in movies], [f"tt{n:07d}" for n in range(95)]
+        )
+        self.assertEqual(mock_fetch_search_page.call_count, 10)
+
+    def test_search_concurrent_stops_at_empty_page(self):
+        def fetch_search_page(search, page, priority):
+            if page == 3:
+                return {"Response": "False", "Error": "Too many results."}
+            return make_search_page(page, 95)
+
+        with patch.object(
+            self.client, "fetch_search_page", side_effect=fetch_search_page
+        ) as mock_fetch_search_page:
+            movies = list(self.client.search("movie", max_workers=2))
+
+        self.assertEqual(
+            [movie.imdb_id for movie in movies], [f"tt{n:07d}" for n in range(20)]
+        )
+        # Page 4 was submitted when page 2 was read, nothing after it
+        self.assertLessEqual(mock_fetch_search_page.call_count, 4)
+
+    def test_search_single_page(self):
+        with self.fake_pages(3) as mock_fetch_search_page:
+            movies = list(self.client.search("movie", max_workers=4))
+
+        self.assertEqual(len(movies), 3)
+        mock_fetch_search_page.assert_called_once_with("movie", 1, priority=INTERACTIVE)
+
+    def test_search_no_results(self):
+        with patch.object(
+            self.client,
+            "fetch_search_page",
+            return_value={"Response": "False", "Error": "Movie not found!"},
+        ):
+            movies = list(self.client.search("not a movie"))
+
+        self.assertEqual(movies, [])
+
+
+class TestOmdbClientGetMany(SimpleTestCase):
+    def test_get_many(self):
+        client = OmdbClient("abc123")
+
+        def get_by_imdb_id(imdb_id, priority):
+            if imdb_id == "tt3":
+                raise requests.HTTPError("401 Client Error")
+            return OmdbMovie({"imdbID": imdb_id})
+
+        with patch.object(
+            client, "get_by_imdb_id", side_effect=get_by_imdb_id
+        ) as mock_get_by_imdb_id:
+            movies = list(
+                client.get_many(["tt1", "tt2", "tt3", "tt4", "tt1"], max_concurrency=3)
+            )
+
+        self.assertEqual(
+            sorted(movie.imdb_id for movie in movies), ["tt1", "tt2", "tt4"]
+        )
+        self.assertEqual(mock_get_by_imdb_id.call_count, 4)
+
+    def test_get_many_stops_when_rate_limited(self):
+        client = OmdbClient("abc123")
+
+        with patch.object(
+            client,
+            "get_by_imdb_id",
+            side_effect=RateLimitExceeded("Daily OMDb budget is used up."),
+        ):
+            movies = list(client.get_many(["tt1", "tt2"], priority=BACKGROUND))
+
+        self.assertEqual(movies, [])
+
+
+class TestOmdbClientRateLimit(SimpleTestCase):
+    def setUp(self):
+        self.rate_limiter = MagicMock()
+        self.client = OmdbClient("abc123", rate_limiter=self.rate_limiter)
+        self.client.session = MagicMock()
+
+    def test_make_request_acquires_with_priority(self):
+        self.client.session.get.return_value.status_code = 200
+
+        self.client.make_request({"i": "tt1"}, priority=BACKGROUND)
+
+        self.rate_limiter.acquire.assert_called_once_with(BACKGROUND)
+        self.rate_limiter.exhaust.assert_not_called()
+
+    @patch("movienight.omdb.client.time.sleep")
+    def test_acquire_before_every_attempt(self, mock_sleep):
+        retry_resp = MagicMock(status_code=503, headers={})
+        ok_resp = MagicMock(status_code=200)
+        self.client.session.get.side_effect = [retry_resp, retry_resp, ok_resp]
+        self.client.backoff_factor = 1
+
+        resp = self.client.make_request({"i": "tt1"}, priority=BACKGROUND)
+
+        self.assertEqual(resp, ok_resp)
+        self.assertEqual(self.rate_limiter.acquire.call_count, 3)
+        self.rate_limiter.acquire.assert_called_with(BACKGROUND)
+        self.assertEqual([c.args for c in mock_sleep.call_args_list], [(1,), (2,)])
+
+    @patch("movienight.omdb.client.time.sleep")
+    def test_retries_stop_when_rate_limited(self, mock_sleep):
+        self.client.session.get.return_value = MagicMock(status_code=429, headers={})
+        self.rate_limiter.acquire.side_effect = [
+            None,
+            RateLimitExceeded("Daily OMDb budget is used up."),
+        ]
+
+        with self.assertRaises(RateLimitExceeded):
+            self.client.make_request({"i": "tt1"})
+
+        self.client.session.get.assert_called_once()
+
+    @patch("movienight.omdb.client.time.sleep")
+    def test_retry_after(self, mock_sleep):
+        retry_resp = MagicMock(status_code=429, headers={"Retry-After": "3"})
+        ok_resp = MagicMock(status_code=200)
+        self.client.session.get.side_effect = [retry_resp, ok_resp]
+
+        self.assertEqual(self.client.make_request({"i": "tt1"}), ok_resp)
+
+        mock_sleep.assert_called_once_with(3)
+
+    @patch("movienight.omdb.client.time.sleep")
+    def test_no_retry_when_retry_after_too_long(self, mock_sleep):
+        resp = MagicMock(status_code=429, headers={"Retry-After": "3600"})
+        resp.raise_for_status.side_effect = requests.HTTPError("429 Client Error")
+        self.client.session.get.return_value = resp
+        self.client.max_retry_wait = 10
+
+        with self.assertRaises(requests.HTTPError):
+            self.client.make_request({"i": "tt1"})
+
+        self.client.session.get.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_request_limit_response_exhausts_budget(self):
+        resp = self.client.session.get.return_value
+        resp.status_code = 401
+        resp.json.return_value = {
+            "Response": "False",
+            "Error": "Request limit reached!",
+        }
+        resp.raise_for_status.side_effect = requests.HTTPError("401 Client Error")
+
+        with self.assertRaises(requests.HTTPError):
+            self.client.make_request({"i": "tt1"})
+
+        self.rate_limiter.exhaust.assert_called_once()
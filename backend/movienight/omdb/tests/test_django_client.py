@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.test import SimpleTestCase, override_settings
+
+from ..client import OmdbClient
+from ..django_client import get_client_from_settings, reset_client
+
+
+class TestGetClientFromSettings(SimpleTestCase):
+    def setUp(self):
+        reset_client()
+        self.addCleanup(reset_client)
+
+    @override_settings(OMDB_KEY="abc123", OMDB_CONNECT_TIMEOUT=1, OMDB_READ_TIMEOUT=2)
+    def test_client_created_from_settings(self):
+        client = get_client_from_settings()
+
+        self.assertIsInstance(client, OmdbClient)
+        self.assertEqual(client.api_key, "abc123")
+        self.assertEqual(client.timeout, (1, 2))
+
+    def test_client_is_shared_between_threads(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(
+                executor.map(lambda _: get_client_from_settings(), range(32))
+            )
+
+        self.assertEqual(len({id(client) for client in clients}), 1)
+
+    def test_client_recreated_when_settings_change(self):
+        client = get_client_from_settings()
+
+        with override_settings(OMDB_KEY="other"):
+            self.assertIsNot(get_client_from_settings(), client)
+            self.assertEqual(get_client_from_settings().api_key, "other")
@@ -0,0 +1,165 @@
+import io
+import tempfile
+import threading
+from pathlib import Path
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from ..django_client import get_rate_limiter_from_settings
+from ..ratelimit import BACKGROUND, INTERACTIVE, RateLimiter, RateLimitExceeded
+
+
+@patch("movienight.omdb.ratelimit.time.time", return_value=1_700_000_000)
+class TestRateLimiter(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = Path(tmp_dir.name) / "ratelimit.sqlite3"
+
+    def make_limiter(self, **kwargs):
+        options = {
+            "rate": 1,
+            "burst": 5,
+            "daily_limit": 10,
+            "background_reserve": 0.2,
+            "max_wait": 2,
+        }
+        options.update(kwargs)
+        return RateLimiter(self.path, **options)
+
+    def test_burst_then_wait(self, mock_time):
+        limiter = self.make_limiter()
+
+        waits = [limiter.reserve(INTERACTIVE) for _ in range(6)]
+
+        self.assertEqual(waits, [0, 0, 0, 0, 0, 1])
+
+    def test_refill(self, mock_time):
+        limiter = self.make_limiter()
+        for _ in range(5):
+            limiter.reserve(INTERACTIVE)
+
+        mock_time.return_value += 2
+
+        self.assertEqual(limiter.reserve(INTERACTIVE), 0)
+        self.assertEqual(limiter.reserve(INTERACTIVE), 0)
+        self.assertGreater(limiter.reserve(INTERACTIVE), 0)
+
+    def test_background_leaves_reserve(self, mock_time):
+        limiter = self.make_limiter()
+
+        waits = [limiter.reserve(BACKGROUND) for _ in range(5)]
+
+        # One token of the burst of five is kept for interactive requests
+        self.assertEqual(waits[:4], [0, 0, 0, 0])
+        self.assertGreater(waits[4], 0)
+        self.assertEqual(limiter.reserve(INTERACTIVE), 0)
+
+    def test_state_shared_between_instances(self, mock_time):
+        for _ in range(5):
+            self.make_limiter().reserve(INTERACTIVE)
+
+        self.assertGreater(self.make_limiter().reserve(INTERACTIVE), 0)
+
+    def test_daily_limit(self, mock_time):
+        limiter = self.make_limiter(burst=100)
+        for _ in range(8):
+            limiter.reserve(INTERACTIVE)
+
+        with self.assertRaises(RateLimitExceeded):
+            limiter.reserve(BACKGROUND)
+        limiter.reserve(INTERACTIVE)
+        limiter.reserve(INTERACTIVE)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.reserve(INTERACTIVE)
+        self.assertEqual(limiter.usage(), {"used": 10, "daily_limit": 10})
+
+        # A new day
+        mock_time.return_value += 86400
+        self.assertEqual(limiter.reserve(INTERACTIVE), 0)
+
+    def test_exhaust(self, mock_time):
+        limiter = self.make_limiter()
+
+        limiter.exhaust()
+
+        with self.assertRaises(RateLimitExceeded):
+            limiter.reserve(INTERACTIVE)
+
+    @patch("movienight.omdb.ratelimit.time.sleep")
+    def test_acquire_waits_and_records_stats(self, mock_sleep, mock_time):
+        limiter = self.make_limiter(burst=1)
+        limiter.acquire()
+
+        def sleep(seconds):
+            mock_time.return_value += seconds
+
+        mock_sleep.side_effect = sleep
+
+        limiter.acquire()
+
+        mock_sleep.assert_called_once_with(1)
+        self.assertEqual(
+            limiter.stats.as_dict(),
+            {"requests": 2, "waits": 1, "wait_seconds": 1, "rejected": 0},
+        )
+
+    @patch("movienight.omdb.ratelimit.time.sleep")
+    def test_acquire_gives_up_after_max_wait(self, mock_sleep, mock_time):
+        limiter = self.make_limiter(burst=1, rate=0.1)
+        limiter.acquire()
+
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire()
+
+        mock_sleep.assert_not_called()
+        self.assertEqual(limiter.stats.rejected, 1)
+
+    async def test_acquire_async_reserves_off_the_event_loop(self, mock_time):
+        limiter = self.make_limiter()
+        reserve_threads = []
+        reserve = limiter.reserve
+
+        def record_thread(priority):
+            reserve_threads.append(threading.get_ident())
+            return reserve(priority)
+
+        with patch.object(limiter, "reserve", side_effect=record_thread):
+            await limiter.acquire_async()
+
+        self.assertEqual(len(reserve_threads), 1)
+        self.assertNotEqual(reserve_threads[0], threading.get_ident())
+        self.assertEqual(limiter.usage()["used"], 1)
+
+
+class TestOmdbUsageCommand(SimpleTestCase):
+    def test_omdb_usage(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(
+            OMDB_RATE_LIMIT_PATH=str(Path(tmp_dir.name) / "ratelimit.sqlite3"),
+            OMDB_DAILY_LIMIT=100,
+            OMDB_BACKGROUND_RESERVE=0.2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        rate_limiter = get_rate_limiter_from_settings()
+        for _ in range(3):
+            rate_limiter.acquire()
+        stdout = io.StringIO()
+
+        call_command("omdb_usage", stdout=stdout)
+
+        self.assertIn(
+            "Used 3 of 100 OMDb requests today, 97 left for interactive requests and 77 for background ones",
+            stdout.getvalue(),
+        )
+
+    @override_settings(OMDB_RATE_LIMIT_PATH="")
+    def test_omdb_usage_without_rate_limit(self):
+        stdout = io.StringIO()
+
+        call_command("omdb_usage", stdout=stdout)
+
+        self.assertIn("aren't rate limited", stdout.getvalue())
@@ -0,0 +1,40 @@
+import tempfile
+import threading
+from pathlib import Path
+from django.test import SimpleTestCase
+
+from ..sqlite import ThreadLocalConnection
+
+
+class TestThreadLocalConnection(SimpleTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.connections = ThreadLocalConnection(
+            Path(tmp_dir.name) / "test.sqlite3",
+            "CREATE TABLE IF NOT EXISTS things (name TEXT);"
+            "CREATE INDEX IF NOT EXISTS things_name ON things (name);",
+        )
+
+    def test_connection_per_thread(self):
+        connection = self.connections.get()
+        other_connections = []
+        thread = threading.Thread(
+            target=lambda: other_connections.append(self.connections.get())
+        )
+        thread.start()
+        thread.join()
+
+        self.assertIs(self.connections.get(), connection)
+        self.assertIsNot(other_connections[0], connection)
+
+    def test_schema_and_wal(self):
+        connection = self.connections.get()
+
+        self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+        self.assertEqual(
+            connection.execute(
+                "SELECT name FROM sqlite_master ORDER BY name"
+            ).fetchall(),
+            [("things",), ("things_name",)],
+        )